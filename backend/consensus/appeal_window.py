@@ -0,0 +1,90 @@
+import heapq
+
+
+class AppealWindowSchedule:
+    """
+    Schedule of the ACCEPTED transactions in their appeal window.
+
+    Transactions waiting for finalization are kept in a min-heap ordered by acceptance time. The finality
+    window is the same for every transaction, so the order holds when the window changes and only the
+    deadline of the head of the heap has to be computed.
+    Appealed transactions, and transactions that have to be looked at again later (e.g. claimed by another
+    worker), are kept in a second min-heap ordered by due time.
+
+    Entries are not removed when a transaction changes, they are discarded lazily when they reach the head
+    of the heap. The schedule only says when to look at a transaction: the caller must check its current
+    state before acting on it.
+    """
+
+    def __init__(self):
+        self.finalizations: list[tuple[int, str]] = []
+        self.timestamps_accepted: dict[str, int] = {}
+        self.due: list[tuple[float, str]] = []
+
+    def reset(self, entries: list[dict]):
+        """Rebuild the schedule from `TransactionsProcessor.get_appeal_window_entries`."""
+        self.finalizations = []
+        self.timestamps_accepted = {}
+        self.due = []
+        for entry in entries:
+            self.update(entry)
+
+    def update(self, entry: dict):
+        """Schedule an ACCEPTED transaction, replacing its previous entry."""
+        transaction_hash = entry["hash"]
+        if entry["appealed"]:
+            self.timestamps_accepted.pop(transaction_hash, None)
+            heapq.heappush(self.due, (0, transaction_hash))
+            return
+        timestamp_accepted = entry["timestamp_accepted"]
+        if self.timestamps_accepted.get(transaction_hash) == timestamp_accepted:
+            return
+        self.timestamps_accepted[transaction_hash] = timestamp_accepted
+        heapq.heappush(self.finalizations, (timestamp_accepted, transaction_hash))
+
+    def remove(self, transaction_hash: str):
+        """Forget a transaction that left the ACCEPTED status."""
+        self.timestamps_accepted.pop(transaction_hash, None)
+
+    def defer(self, transaction_hash: str, due_time: float):
+        """Look at a transaction again at `due_time`, whatever its acceptance time."""
+        heapq.heappush(self.due, (due_time, transaction_hash))
+
+    def _discard_stale_finalizations(self):
+        while self.finalizations:
+            timestamp_accepted, transaction_hash = self.finalizations[0]
+            if self.timestamps_accepted.get(transaction_hash) == timestamp_accepted:
+                return
+            heapq.heappop(self.finalizations)
+
+    def pop_due(self, now: float, finality_window_time: int) -> list[str]:
+        """
+        Remove and return the hashes of the transactions to look at, i.e. the appealed or deferred ones that
+        are due, and the ones whose finality window elapsed at `now`.
+        """
+        transaction_hashes = []
+        while self.due and self.due[0][0] <= now:
+            transaction_hashes.append(heapq.heappop(self.due)[1])
+
+        self._discard_stale_finalizations()
+        while (
+            self.finalizations
+            and int(now) - self.finalizations[0][0] > finality_window_time
+        ):
+            _, transaction_hash = heapq.heappop(self.finalizations)
+            del self.timestamps_accepted[transaction_hash]
+            transaction_hashes.append(transaction_hash)
+            self._discard_stale_finalizations()
+
+        return list(dict.fromkeys(transaction_hashes))
+
+    def next_due_time(self, finality_window_time: int) -> float | None:
+        """Return the time at which `pop_due` returns something next, or None if nothing is scheduled."""
+        due_times = []
+        if self.due:
+            due_times.append(self.due[0][0])
+        self._discard_stale_finalizations()
+        if self.finalizations:
+            # Same condition as in `pop_due`: the window must be exceeded by a whole second
+            due_times.append(self.finalizations[0][0] + finality_window_time + 1)
+        return min(due_times, default=None)
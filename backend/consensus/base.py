@@ -2,17 +2,31 @@
 
 DEFAULT_VALIDATORS_COUNT = 5
 DEFAULT_CONSENSUS_SLEEP_TIME = 5
+# Safety scan for pending transactions when database notifications are working
+DEFAULT_RECONCILIATION_SCAN_TIME = 60
+# Time after which a worker with no transactions for its contract is stopped
+DEFAULT_WORKER_IDLE_TIME = 60
+# Time after which the claims and contract leases of a worker that stopped sending heartbeats expire
+DEFAULT_CLAIM_LEASE_TIME = 30
+DEFAULT_HEARTBEAT_TIME = 10
+# Time before looking again at a transaction of the appeal window that could not be handled,
+# and between scans of the appeal window when database notifications are not available
+DEFAULT_APPEAL_WINDOW_SLEEP_TIME = 1
 
 import os
 import asyncio
 from collections import deque
 import traceback
-from typing import Callable, Iterator, List
+import threading
+import uuid
+from typing import Awaitable, Callable, Iterator, List
 import time
 from abc import ABC, abstractmethod
 
 from sqlalchemy.orm import Session
-from backend.consensus.vrf import get_validators_for_transaction
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.consensus.vrf import get_stake_index, get_validators_for_transaction
+from backend.consensus.appeal_window import AppealWindowSchedule
 from backend.database_handler.chain_snapshot import ChainSnapshot
 from backend.database_handler.contract_snapshot import ContractSnapshot
 from backend.database_handler.transactions_processor import (
@@ -20,6 +34,18 @@ from backend.database_handler.transactions_processor import (
     TransactionStatus,
 )
 from backend.database_handler.accounts_manager import AccountsManager
+from backend.database_handler.async_repository import AsyncRepository, run_sync
+from backend.database_handler.consensus_workers import (
+    ConsensusWorkersRegistry,
+    get_shard_owner,
+)
+from backend.database_handler.notifications import (
+    ACCEPTED_TRANSACTIONS_CHANNEL,
+    NotificationListener,
+    PENDING_TRANSACTIONS_CHANNEL,
+    VALIDATORS_CHANNEL,
+)
+from backend.database_handler.validators_registry import validators_cache
 from backend.database_handler.types import ConsensusData
 from backend.domain.types import (
     Transaction,
@@ -29,6 +55,7 @@ from backend.domain.types import (
 )
 from backend.node.base import Node
 from backend.node.types import ExecutionMode, Receipt, Vote, ExecutionResultStatus
+from backend.node.genvm.base import LeaderResultsChannel
 from backend.protocol_rpc.message_handler.base import MessageHandler
 from backend.protocol_rpc.message_handler.types import (
     LogEvent,
@@ -36,6 +63,10 @@ from backend.protocol_rpc.message_handler.types import (
     EventScope,
 )
 
+# Validations still running after the consensus decision, see `CommittingState.exec_until_decided`.
+# They are referenced until they finish, so they are not garbage collected
+late_validations: set[asyncio.Future] = set()
+
 
 def node_factory(
     validator: dict,
@@ -44,6 +75,7 @@ def node_factory(
     leader_receipt: Receipt | None,
     msg_handler: MessageHandler,
     contract_snapshot_factory: Callable[[str], ContractSnapshot],
+    leader_results: LeaderResultsChannel | None = None,
 ) -> Node:
     """
     Factory function to create a Node instance.
@@ -55,6 +87,7 @@ def node_factory(
         leader_receipt (Receipt | None): Receipt of the leader node.
         msg_handler (MessageHandler): Handler for messaging.
         contract_snapshot_factory (Callable[[str], ContractSnapshot]): Factory function to create contract snapshots.
+        leader_results (LeaderResultsChannel | None): Channel of the leader results, when validators run at the same time as the leader.
 
     Returns:
         Node: A new Node instance.
@@ -77,6 +110,7 @@ def node_factory(
             ),
         ),
         contract_snapshot_factory=contract_snapshot_factory,
+        leader_results=leader_results,
     )
 
 
@@ -104,13 +138,18 @@ class ConsensusAlgorithm:
     Attributes:
         get_session (Callable[[], Session]): Function to get a database session.
         msg_handler (MessageHandler): Handler for messaging.
+        get_async_session (Callable[[], AsyncSession] | None): Function to get an async database session for the consensus workers.
         queues (dict[str, asyncio.Queue]): Dictionary of queues for transactions.
+        workers (dict[str, asyncio.Task]): Dictionary of workers consuming the queues, by address.
+        worker_id (str): Identifier used to claim transactions in the database.
+        in_flight (set[str]): Hashes of the transactions queued or being executed by this instance.
     """
 
     def __init__(
         self,
         get_session: Callable[[], Session],
         msg_handler: MessageHandler,
+        get_async_session: Callable[[], AsyncSession] | None = None,
     ):
         """
         Initialize the ConsensusAlgorithm.
@@ -118,11 +157,28 @@ class ConsensusAlgorithm:
         Args:
             get_session (Callable[[], Session]): Function to get a database session.
             msg_handler (MessageHandler): Handler for messaging.
+            get_async_session (Callable[[], AsyncSession] | None): Function to get an async database session for the consensus workers.
+                Without it, the workers use synchronous sessions.
         """
         self.get_session = get_session
         self.msg_handler = msg_handler
+        self.get_async_session = get_async_session
         self.queues: dict[str, asyncio.Queue] = {}
+        self.workers: dict[str, asyncio.Task] = {}
+        self.worker_id = str(uuid.uuid4())
+        # The appeal window runs in its own thread, it takes the contract leases under its own id so that
+        # it doesn't run a contract at the same time as the workers of this instance
+        self.appeal_worker_id = f"{self.worker_id}-appeal"
+        self.in_flight: set[str] = set()
         self.finality_window_time = int(os.getenv("VITE_FINALITY_WINDOW"))
+        self.early_decision = os.getenv("CONSENSUS_EARLY_DECISION", "false") == "true"
+        self.pipelined_validation = (
+            os.getenv("CONSENSUS_PIPELINED_VALIDATION", "false") == "true"
+        )
+        self.consensus_loop: asyncio.AbstractEventLoop | None = None
+        self.consensus_loop_ready = threading.Event()
+        self.appeal_window_loop: asyncio.AbstractEventLoop | None = None
+        self.appeal_window_listener: NotificationListener | None = None
 
     def run_crawl_snapshot_loop(self):
         """
@@ -137,19 +193,101 @@ class ConsensusAlgorithm:
     async def _crawl_snapshot(self):
         """
         Crawl snapshots and process pending transactions.
+        The crawl is triggered by database notifications sent when a transaction becomes PENDING,
+        and falls back to a periodic reconciliation scan in case a notification is missed.
+        Pending transactions are claimed in the database, so that each of them is executed exactly once,
+        and handed over to the consensus loop, which runs in another thread.
+
+        When several instances run (e.g. `JSONRPC_REPLICAS` > 1), contract addresses are sharded across them,
+        see `ConsensusWorkersRegistry`.
+        """
+        # The consensus loop must be running before transactions can be handed over
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.consensus_loop_ready.wait
+        )
+
+        self._send_heartbeat()
+        heartbeat_task = asyncio.create_task(self._run_heartbeat())
+
+        with self.get_session() as session:
+            engine = session.get_bind()
+        listener = NotificationListener(
+            engine, [PENDING_TRANSACTIONS_CHANNEL, VALIDATORS_CHANNEL]
+        )
+        try:
+            while True:
+                try:
+                    claimed_transactions = self._claim_pending_transactions()
+                except Exception as e:
+                    print("Error claiming pending transactions", e)
+                    print(traceback.format_exc())
+                    claimed_transactions = []
+
+                for transaction in claimed_transactions:
+                    self.consensus_loop.call_soon_threadsafe(
+                        self.enqueue_transaction, Transaction.from_dict(transaction)
+                    )
+
+                received = await listener.wait(
+                    DEFAULT_RECONCILIATION_SCAN_TIME
+                    if listener.connected
+                    else DEFAULT_CONSENSUS_SLEEP_TIME
+                )
+                if VALIDATORS_CHANNEL in received:
+                    # Validators changed in another process. Transactions that found no validators
+                    # are claimed again in the next iteration
+                    validators_cache.invalidate()
+        finally:
+            listener.close()
+            heartbeat_task.cancel()
+
+    def _claim_pending_transactions(self) -> list[dict]:
+        """
+        Lease the addresses of this instance's shard that have pending transactions, and claim the pending
+        transactions of every address leased to this instance.
+        """
+        with self.get_session() as session:
+            transactions_processor = TransactionsProcessor(session)
+            workers_registry = ConsensusWorkersRegistry(session)
+
+            live_workers = workers_registry.get_live_workers(DEFAULT_CLAIM_LEASE_TIME)
+            if self.worker_id not in live_workers:
+                live_workers = sorted(live_workers + [self.worker_id])
+
+            shard_addresses = [
+                address
+                for address in transactions_processor.get_claimable_addresses(
+                    DEFAULT_CLAIM_LEASE_TIME
+                )
+                if get_shard_owner(address, live_workers) == self.worker_id
+            ]
+            leased_addresses = workers_registry.acquire_leases(
+                self.worker_id, shard_addresses, DEFAULT_CLAIM_LEASE_TIME
+            )
+            return transactions_processor.claim_pending_transactions(
+                self.worker_id, DEFAULT_CLAIM_LEASE_TIME, addresses=leased_addresses
+            )
+
+    async def _run_heartbeat(self):
+        """
+        Periodically renew the liveness of this instance, its contract leases and its transaction claims.
         """
         while True:
-            with self.get_session() as session:
-                chain_snapshot = ChainSnapshot(session)
-                pending_transactions = chain_snapshot.get_pending_transactions()
-                for transaction in pending_transactions:
-                    transaction = Transaction.from_dict(transaction)
-                    address = transaction.to_address or transaction.from_address
+            await asyncio.sleep(DEFAULT_HEARTBEAT_TIME)
+            self._send_heartbeat()
 
-                    if address not in self.queues:
-                        self.queues[address] = asyncio.Queue()
-                    await self.queues[address].put(transaction)
-            await asyncio.sleep(DEFAULT_CONSENSUS_SLEEP_TIME)
+    def _send_heartbeat(self):
+        try:
+            with self.get_session() as session:
+                workers_registry = ConsensusWorkersRegistry(session)
+                workers_registry.heartbeat(self.worker_id)
+                workers_registry.renew_leases(self.appeal_worker_id)
+                workers_registry.remove_dead_workers(10 * DEFAULT_CLAIM_LEASE_TIME)
+                TransactionsProcessor(session).renew_claims(self.worker_id)
+                session.commit()
+        except Exception as e:
+            print("Error sending consensus worker heartbeat", e)
+            print(traceback.format_exc())
 
     def run_consensus_loop(self):
         """
@@ -164,51 +302,179 @@ class ConsensusAlgorithm:
     async def _run_consensus(self):
         """
         Run the consensus process.
+        Transactions are executed by one worker per contract address, see `enqueue_transaction`.
+        """
+        self.consensus_loop = asyncio.get_running_loop()
+        self.consensus_loop_ready.set()
+        # Workers run until the loop is stopped
+        await asyncio.Event().wait()
+
+    def enqueue_transaction(self, transaction: Transaction):
+        """
+        Queue a transaction for execution, starting a worker for its address if there is none.
+        Transactions already queued or being executed are ignored.
+        Must be called from the consensus loop.
+
+        Args:
+            transaction (Transaction): The transaction to execute.
+        """
+        if transaction.hash in self.in_flight:
+            return
+        self.in_flight.add(transaction.hash)
+
+        address = transaction.to_address or transaction.from_address
+
+        if address not in self.queues:
+            self.queues[address] = asyncio.Queue()
+        self.queues[address].put_nowait(transaction)
+
+        if address not in self.workers:
+            self.workers[address] = asyncio.create_task(self._run_worker(address))
+
+    async def _run_worker(self, address: str):
         """
-        # Set a new event loop for the consensus process
-        asyncio.set_event_loop(asyncio.new_event_loop())
+        Execute the transactions of an address one after the other, so that transactions
+        of different contracts don't wait on each other.
+        The worker stops, and releases its queue, after being idle for `DEFAULT_WORKER_IDLE_TIME` seconds.
+
+        Args:
+            address (str): The address whose queue the worker consumes.
+        """
+        queue = self.queues[address]
         # Note: ollama uses GPU resources and webrequest aka selenium uses RAM
-        # TODO: Consider using async sessions to avoid blocking the current thread
         while True:
             try:
-                async with asyncio.TaskGroup() as tg:
-                    for queue in [q for q in self.queues.values() if not q.empty()]:
-                        # Sessions cannot be shared between coroutines; create a new session for each coroutine
-                        # Reference: https://docs.sqlalchemy.org/en/20/orm/session_basics.html#is-the-session-thread-safe-is-asyncsession-safe-to-share-in-concurrent-tasks
-                        transaction: Transaction = await queue.get()
-                        with self.get_session() as session:
-
-                            async def exec_transaction_with_session_handling(
-                                session: Session, transaction: Transaction
-                            ):
-                                await self.exec_transaction(
-                                    transaction,
-                                    TransactionsProcessor(session),
-                                    ChainSnapshot(session),
-                                    AccountsManager(session),
-                                    lambda contract_address: contract_snapshot_factory(
-                                        contract_address, session, transaction
-                                    ),
-                                )
-                                session.commit()
+                transaction: Transaction = await asyncio.wait_for(
+                    queue.get(), DEFAULT_WORKER_IDLE_TIME
+                )
+            except TimeoutError:
+                if queue.empty():
+                    del self.queues[address]
+                    del self.workers[address]
+                    await self._release_lease(address)
+                    return
+                continue
 
-                            tg.create_task(
-                                exec_transaction_with_session_handling(
-                                    session, transaction
-                                )
+            try:
+                if self.get_async_session is not None:
+                    await self._exec_transaction_with_async_session(transaction)
+                else:
+                    # Sessions cannot be shared between coroutines; create a new session for each coroutine
+                    # Reference: https://docs.sqlalchemy.org/en/20/orm/session_basics.html#is-the-session-thread-safe-is-asyncsession-safe-to-share-in-concurrent-tasks
+                    with self.get_session() as session:
+                        transactions_processor = TransactionsProcessor(session)
+                        with transactions_processor.write_behind():
+                            await self.exec_transaction(
+                                transaction,
+                                transactions_processor,
+                                ChainSnapshot(session),
+                                AccountsManager(session),
+                                lambda contract_address: contract_snapshot_factory(
+                                    contract_address, session, transaction
+                                ),
                             )
-
+                        session.commit()
             except Exception as e:
                 print("Error running consensus", e)
                 print(traceback.format_exc())
-            await asyncio.sleep(DEFAULT_CONSENSUS_SLEEP_TIME)
+            finally:
+                await self._release_transaction(transaction.hash, transaction.status)
+
+    async def _exec_transaction_with_async_session(self, transaction: Transaction):
+        """
+        Execute a transaction on an async session, so that its queries don't block the other workers of
+        the consensus loop, see `run_sync`. The transactions processor, the accounts manager, the chain snapshot
+        and the contract snapshots share the session: the execution holds one connection, and its writes are
+        committed at once.
+
+        Args:
+            transaction (Transaction): The transaction to execute.
+        """
+        async with self.get_async_session() as async_session:
+            session = async_session.sync_session
+            transactions_processor = TransactionsProcessor(session)
+            async with transactions_processor.async_write_behind():
+                await self.exec_transaction(
+                    transaction,
+                    transactions_processor,
+                    await run_sync(session, ChainSnapshot, session),
+                    AccountsManager(session),
+                    lambda contract_address: contract_snapshot_factory(
+                        contract_address, session, transaction
+                    ),
+                )
+            await async_session.commit()
+
+    async def _run_in_session(self, function: Callable[[Session], None]):
+        """
+        Run `function` with a new session, and commit it.
+        On the consensus loop with async sessions, it runs through `run_sync`, so that it doesn't block the
+        workers. The connections of the async sessions belong to the consensus loop, other loops (e.g. the
+        appeal window) use a synchronous session.
+
+        Args:
+            function (Callable[[Session], None]): The function to run with the session.
+        """
+        if (
+            self.get_async_session is None
+            or asyncio.get_running_loop() is not self.consensus_loop
+        ):
+            with self.get_session() as session:
+                function(session)
+                session.commit()
+            return
+        async with self.get_async_session() as async_session:
+            session = async_session.sync_session
+            await run_sync(session, function, session)
+            await async_session.commit()
+
+    async def _release_lease(self, address: str, worker_id: str | None = None):
+        """
+        Release the lease of an address without pending work, so that its shard owner can take it.
+
+        Args:
+            address (str): The contract address.
+            worker_id (str | None): Id holding the lease, the id of this instance by default.
+        """
+        worker_id = worker_id or self.worker_id
+        try:
+            await self._run_in_session(
+                lambda session: ConsensusWorkersRegistry(session).release_lease(
+                    worker_id, address
+                )
+            )
+        except Exception as e:
+            print("Error releasing lease", address, e)
+            print(traceback.format_exc())
+
+    async def _release_transaction(
+        self, transaction_hash: str, previous_status: TransactionStatus | None
+    ):
+        """
+        Release the claim of an executed transaction. If the run sent it back to PENDING (e.g. an appeal
+        succeeded), the crawl is notified and claims it again, see `TransactionsProcessor.release_transaction`.
+
+        Args:
+            transaction_hash (str): Hash of the transaction.
+            previous_status (TransactionStatus | None): Status of the transaction when it was claimed.
+        """
+        try:
+            await self._run_in_session(
+                lambda session: TransactionsProcessor(session).release_transaction(
+                    transaction_hash, previous_status
+                )
+            )
+        except Exception as e:
+            print("Error releasing transaction", transaction_hash, e)
+            print(traceback.format_exc())
+        self.in_flight.discard(transaction_hash)
 
     async def exec_transaction(
         self,
         transaction: Transaction,
-        transactions_processor: TransactionsProcessor,
+        transactions_processor: TransactionsProcessor | AsyncRepository,
         snapshot: ChainSnapshot,
-        accounts_manager: AccountsManager,
+        accounts_manager: AccountsManager | AsyncRepository,
         contract_snapshot_factory: Callable[[str], ContractSnapshot],
         node_factory: Callable[
             [
@@ -227,9 +493,9 @@ class ConsensusAlgorithm:
 
         Args:
             transaction (Transaction): The transaction to execute.
-            transactions_processor (TransactionsProcessor): Instance responsible for handling transaction operations within the database.
+            transactions_processor (TransactionsProcessor | AsyncRepository): Instance responsible for handling transaction operations within the database.
             snapshot (ChainSnapshot): Snapshot of the chain state.
-            accounts_manager (AccountsManager): Manager for accounts.
+            accounts_manager (AccountsManager | AsyncRepository): Manager for accounts.
             contract_snapshot_factory (Callable[[str], ContractSnapshot]): Factory function to create contract snapshots.
             node_factory (Callable[[dict, ExecutionMode, ContractSnapshot, Receipt | None, MessageHandler, Callable[[str], ContractSnapshot]], Node]): Factory function to create nodes.
         """
@@ -245,6 +511,13 @@ class ConsensusAlgorithm:
             node_factory=node_factory,
             msg_handler=msg_handler,
         )
+        context.early_decision = self.early_decision
+        context.pipelined_validation = self.pipelined_validation
+        context.get_session = (
+            self.get_session
+            if self.get_async_session is None
+            else self.get_async_session
+        )
 
         # Begin state transitions starting from PendingState
         state = PendingState()
@@ -255,8 +528,8 @@ class ConsensusAlgorithm:
             state = next_state
 
     @staticmethod
-    def dispatch_transaction_status_update(
-        transactions_processor: TransactionsProcessor,
+    async def dispatch_transaction_status_update(
+        transactions_processor: AsyncRepository,
         transaction_hash: str,
         new_status: TransactionStatus,
         msg_handler: MessageHandler,
@@ -265,13 +538,15 @@ class ConsensusAlgorithm:
         Dispatch a transaction status update.
 
         Args:
-            transactions_processor (TransactionsProcessor): Instance responsible for handling transaction operations within the database.
+            transactions_processor (AsyncRepository): Instance responsible for handling transaction operations within the database, see `TransactionsProcessor`.
             transaction_hash (str): Hash of the transaction.
             new_status (TransactionStatus): New status of the transaction.
             msg_handler (MessageHandler): Handler for messaging.
         """
         # Update the transaction status in the transactions processor
-        transactions_processor.update_transaction_status(transaction_hash, new_status)
+        await transactions_processor.update_transaction_status(
+            transaction_hash, new_status
+        )
 
         # Send a message indicating the transaction status update
         msg_handler.send_message(
@@ -289,10 +564,10 @@ class ConsensusAlgorithm:
         )
 
     @staticmethod
-    def execute_transfer(
+    async def execute_transfer(
         transaction: Transaction,
-        transactions_processor: TransactionsProcessor,
-        accounts_manager: AccountsManager,
+        transactions_processor: AsyncRepository,
+        accounts_manager: AsyncRepository,
         msg_handler: MessageHandler,
     ):
         """
@@ -304,21 +579,21 @@ class ConsensusAlgorithm:
 
         Args:
             transaction (dict): The transaction details including from_address, to_address, and value.
-            transactions_processor (TransactionsProcessor): Instance responsible for handling transaction operations within the database.
-            accounts_manager (AccountsManager): Manager to handle account balance updates.
+            transactions_processor (AsyncRepository): Instance responsible for handling transaction operations within the database, see `TransactionsProcessor`.
+            accounts_manager (AsyncRepository): Manager to handle account balance updates, see `AccountsManager`.
         """
 
         # Check if the transaction is a fund_account call
         if not transaction.from_address is None:
             # Get the balance of the sender account
-            from_balance = accounts_manager.get_account_balance(
+            from_balance = await accounts_manager.get_account_balance(
                 transaction.from_address
             )
 
             # Check if the sender has enough balance
             if from_balance < transaction.value:
                 # Set the transaction status to UNDETERMINED if balance is insufficient
-                ConsensusAlgorithm.dispatch_transaction_status_update(
+                await ConsensusAlgorithm.dispatch_transaction_status_update(
                     transactions_processor,
                     transaction.hash,
                     TransactionStatus.UNDETERMINED,
@@ -327,22 +602,24 @@ class ConsensusAlgorithm:
                 return
 
             # Update the balance of the sender account
-            accounts_manager.update_account_balance(
+            await accounts_manager.update_account_balance(
                 transaction.from_address, from_balance - transaction.value
             )
 
         # Check if the transaction is a burn call
         if not transaction.to_address is None:
             # Get the balance of the recipient account
-            to_balance = accounts_manager.get_account_balance(transaction.to_address)
+            to_balance = await accounts_manager.get_account_balance(
+                transaction.to_address
+            )
 
             # Update the balance of the recipient account
-            accounts_manager.update_account_balance(
+            await accounts_manager.update_account_balance(
                 transaction.to_address, to_balance + transaction.value
             )
 
         # Dispatch a transaction status update to FINALIZED
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             transactions_processor,
             transaction.hash,
             TransactionStatus.FINALIZED,
@@ -364,54 +641,156 @@ class ConsensusAlgorithm:
     async def _appeal_window(self):
         """
         Handle the appeal window for transactions.
+
+        Accepted transactions are kept in an `AppealWindowSchedule`, so the loop only wakes up when the next
+        transaction becomes finalizable, when a transaction is accepted or appealed (database notifications),
+        or when the finality window changes. The schedule is rebuilt from the database by a periodic
+        reconciliation scan in case a notification is missed.
         """
         print(" ~ ~ ~ ~ ~ FINALITY WINDOW: ", self.finality_window_time)
-        while True:
-            try:
-                with self.get_session() as session:
-                    chain_snapshot = ChainSnapshot(session)
+        schedule = AppealWindowSchedule()
+        with self.get_session() as session:
+            engine = session.get_bind()
+        listener = NotificationListener(engine, [ACCEPTED_TRANSACTIONS_CHANNEL])
+        self.appeal_window_listener = listener
+        self.appeal_window_loop = asyncio.get_running_loop()
+        next_reconciliation_time = 0
+        try:
+            while True:
+                try:
+                    if time.time() >= next_reconciliation_time:
+                        with self.get_session() as session:
+                            schedule.reset(
+                                TransactionsProcessor(
+                                    session
+                                ).get_appeal_window_entries()
+                            )  # TODO: also schedule undetermined transactions
+                        next_reconciliation_time = time.time() + (
+                            DEFAULT_RECONCILIATION_SCAN_TIME
+                            if listener.connected
+                            else DEFAULT_APPEAL_WINDOW_SLEEP_TIME
+                        )
+
+                    for transaction_hash in listener.pop_payloads(
+                        ACCEPTED_TRANSACTIONS_CHANNEL
+                    ):
+                        self._schedule_accepted_transaction(schedule, transaction_hash)
+
+                    for transaction_hash in schedule.pop_due(
+                        time.time(), self.finality_window_time
+                    ):
+                        try:
+                            handled = await self._handle_accepted_transaction(
+                                transaction_hash
+                            )
+                        except Exception as e:
+                            print("Error running appeal window", transaction_hash, e)
+                            print(traceback.format_exc())
+                            handled = False
+
+                        if handled:
+                            self._schedule_accepted_transaction(
+                                schedule, transaction_hash
+                            )
+                        else:
+                            schedule.defer(
+                                transaction_hash,
+                                time.time() + DEFAULT_APPEAL_WINDOW_SLEEP_TIME,
+                            )
 
-                    # Retrieve accepted transactions from the chain snapshot
-                    accepted_transactions = (
-                        chain_snapshot.get_accepted_transactions()
-                    )  # TODO: also get undetermined transactions
-                    for transaction in accepted_transactions:
-                        transaction = Transaction.from_dict(transaction)
-
-                        # Check if the transaction is appealed
-                        if not transaction.appealed:
-
-                            # Check if the transaction has exceeded the finality window
-                            if (
-                                int(time.time()) - transaction.timestamp_accepted
-                            ) > self.finality_window_time:
-
-                                # Create a transaction context for finalizing the transaction
-                                context = TransactionContext(
-                                    transaction=transaction,
-                                    transactions_processor=TransactionsProcessor(
-                                        session
-                                    ),
-                                    snapshot=chain_snapshot,
-                                    accounts_manager=AccountsManager(session),
-                                    contract_snapshot_factory=lambda contract_address: contract_snapshot_factory(
-                                        contract_address, session, transaction
-                                    ),
-                                    node_factory=node_factory,
-                                    msg_handler=self.msg_handler,
-                                )
+                except Exception as e:
+                    print("Error running appeal window", e)
+                    print(traceback.format_exc())
+                    # The schedule may have missed transactions, rebuild it soon
+                    next_reconciliation_time = min(
+                        next_reconciliation_time,
+                        time.time() + DEFAULT_APPEAL_WINDOW_SLEEP_TIME,
+                    )
 
-                                # Transition to the FinalizingState
-                                state = FinalizingState()
-                                await state.handle(context)
-                                session.commit()
+                # Sleep until the next scheduled transaction, notification or reconciliation scan
+                wake_up_time = next_reconciliation_time
+                next_due_time = schedule.next_due_time(self.finality_window_time)
+                if next_due_time is not None:
+                    wake_up_time = min(wake_up_time, next_due_time)
+                await listener.wait(max(wake_up_time - time.time(), 0))
+        finally:
+            listener.close()
+
+    def _schedule_accepted_transaction(
+        self, schedule: AppealWindowSchedule, transaction_hash: str
+    ):
+        """
+        Update the schedule entry of a transaction from its current state in the database.
+        """
+        with self.get_session() as session:
+            entries = TransactionsProcessor(session).get_appeal_window_entries(
+                transaction_hash
+            )
+        if entries:
+            schedule.update(entries[0])
+        else:
+            schedule.remove(transaction_hash)
 
-                        else:
+    async def _handle_accepted_transaction(self, transaction_hash: str) -> bool:
+        """
+        Finalize or appeal an ACCEPTED transaction, depending on its current state.
 
-                            # Handle transactions that are appealed
-                            transactions_processor = TransactionsProcessor(session)
+        Args:
+            transaction_hash (str): Hash of the transaction.
 
-                            # Create a transaction context for the appeal process
+        Returns:
+            bool: False if the transaction or its contract is held by another worker, and must be looked at again later.
+        """
+        with self.get_session() as session:
+            transactions_processor = TransactionsProcessor(session)
+
+            # Claim the transaction so that it is handled by a single instance
+            if not transactions_processor.claim_transaction(
+                transaction_hash, self.worker_id, DEFAULT_CLAIM_LEASE_TIME
+            ):
+                return False
+
+            claimed_status = None
+            leased_address = None
+            try:
+                transaction = transactions_processor.get_transaction_by_hash(
+                    transaction_hash
+                )
+                if transaction is not None:
+                    claimed_status = TransactionStatus(transaction["status"])
+                if (
+                    transaction is None
+                    or transaction["status"] != TransactionStatus.ACCEPTED.value
+                ):
+                    return True
+
+                # Appeals and finalizations write the contract state: like the workers, they need the lease
+                # of the contract, so that it is not run concurrently
+                address = transaction["to_address"] or transaction["from_address"]
+                leased = address in ConsensusWorkersRegistry(session).acquire_leases(
+                    self.appeal_worker_id, [address], DEFAULT_CLAIM_LEASE_TIME
+                )
+                session.commit()
+                if not leased:
+                    return False
+                leased_address = address
+
+                # Buffer the intermediate statuses of appeals, see `write_behind`
+                with transactions_processor.write_behind():
+                    transaction = Transaction.from_dict(
+                        transaction, transactions_processor.get_state_blob
+                    )
+                    chain_snapshot = ChainSnapshot(session)
+
+                    # Check if the transaction is appealed
+                    if not transaction.appealed:
+
+                        # Check if the transaction has exceeded the finality window
+                        if (
+                            int(time.time()) - transaction.timestamp_accepted
+                        ) > self.finality_window_time:
+
+                            # Create a transaction context for finalizing the transaction
                             context = TransactionContext(
                                 transaction=transaction,
                                 transactions_processor=transactions_processor,
@@ -424,54 +803,71 @@ class ConsensusAlgorithm:
                                 msg_handler=self.msg_handler,
                             )
 
-                            # Set the leader receipt in the context
-                            context.consensus_data.leader_receipt = (
-                                transaction.consensus_data.leader_receipt
-                            )
-                            try:
-                                # Attempt to get extra validators for the appeal process
-                                context.remaining_validators = (
-                                    ConsensusAlgorithm.get_extra_validators(
-                                        chain_snapshot,
-                                        transaction.consensus_data,
-                                        transaction.appeal_failed,
-                                    )
+                            # Transition to the FinalizingState
+                            state = FinalizingState()
+                            await state.handle(context)
+                            session.commit()
+
+                    else:
+
+                        # Handle transactions that are appealed
+                        # Create a transaction context for the appeal process
+                        context = TransactionContext(
+                            transaction=transaction,
+                            transactions_processor=transactions_processor,
+                            snapshot=chain_snapshot,
+                            accounts_manager=AccountsManager(session),
+                            contract_snapshot_factory=lambda contract_address: contract_snapshot_factory(
+                                contract_address, session, transaction
+                            ),
+                            node_factory=node_factory,
+                            msg_handler=self.msg_handler,
+                        )
+
+                        # Set the leader receipt in the context
+                        context.consensus_data.leader_receipt = (
+                            transaction.consensus_data.leader_receipt
+                        )
+                        try:
+                            # Attempt to get extra validators for the appeal process
+                            context.remaining_validators = (
+                                ConsensusAlgorithm.get_extra_validators(
+                                    chain_snapshot,
+                                    transaction.consensus_data,
+                                    transaction.appeal_failed,
                                 )
-                            except ValueError as e:
-                                # When no validators are found, then the appeal failed
-                                print(e, transaction)
-                                context.transactions_processor.set_transaction_appeal(
-                                    context.transaction.hash, False
-                                )
-                                context.transaction.appealed = False
-                                session.commit()
-                            else:
-                                # Set up the context for the committing state
-                                context.num_validators = len(
-                                    context.remaining_validators
-                                )
-                                context.votes = {}
-                                context.contract_snapshot_supplier = (
-                                    lambda: context.contract_snapshot_factory(
-                                        context.transaction.to_address
-                                    )
+                            )
+                        except ValueError as e:
+                            # When no validators are found, then the appeal failed
+                            print(e, transaction)
+                            await context.transactions_processor.set_transaction_appeal(
+                                context.transaction.hash, False
+                            )
+                            context.transaction.appealed = False
+                            session.commit()
+                        else:
+                            # Set up the context for the committing state
+                            context.num_validators = len(context.remaining_validators)
+                            context.votes = {}
+                            context.contract_snapshot_supplier = (
+                                lambda: context.contract_snapshot_factory(
+                                    context.transaction.to_address
                                 )
+                            )
 
-                                # Begin state transitions starting from CommittingState
-                                state = CommittingState()
-                                while True:
-                                    next_state = await state.handle(context)
-                                    if next_state is None:
-                                        break
-                                    state = next_state
-                                session.commit()
-
-            except Exception as e:
-                print("Error running appeal window", e)
-                print(traceback.format_exc())
-
-            # Sleep for a short duration before the next iteration
-            await asyncio.sleep(1)
+                            # Begin state transitions starting from CommittingState
+                            state = CommittingState()
+                            while True:
+                                next_state = await state.handle(context)
+                                if next_state is None:
+                                    break
+                                state = next_state
+                            session.commit()
+            finally:
+                if leased_address is not None:
+                    await self._release_lease(leased_address, self.appeal_worker_id)
+                await self._release_transaction(transaction_hash, claimed_status)
+        return True
 
     @staticmethod
     def get_extra_validators(
@@ -514,26 +910,24 @@ class ConsensusAlgorithm:
         """
         # Get all validators
         validators = snapshot.get_all_validators()
-
-        # Create a dictionary to map addresses to validator entries
-        validator_map = {validator["address"]: validator for validator in validators}
-
-        # List containing addresses found in leader and validator receipts
-        receipt_addresses = [consensus_data.leader_receipt.node_config["address"]] + [
-            receipt.node_config["address"] for receipt in consensus_data.validators
-        ]
+        stake_index = get_stake_index(validators)
+
+        # List containing addresses found in leader and validator receipts, and the validators of the committee
+        # whose votes were not revealed after an early decision, so the size of the committee is kept
+        receipt_addresses = (
+            [consensus_data.leader_receipt.node_config["address"]]
+            + [receipt.node_config["address"] for receipt in consensus_data.validators]
+            + consensus_data.unrevealed_validators
+        )
 
         # Get leader and current validators from consensus data receipt addresses
         current_validators = [
-            validator_map.pop(receipt_address)
-            for receipt_address in receipt_addresses
-            if receipt_address in validator_map
+            validators[stake_index.rows[receipt_address]]
+            for receipt_address in dict.fromkeys(receipt_addresses)
+            if receipt_address in stake_index.rows
         ]
 
-        # Set not_used_validators to the remaining validators in validator_map
-        not_used_validators = list(validator_map.values())
-
-        if len(not_used_validators) == 0:
+        if len(current_validators) == len(validators):
             raise ValueError(
                 "No validators found for appeal, waiting for next appeal request: "
             )
@@ -542,20 +936,20 @@ class ConsensusAlgorithm:
         if appeal_failed == 0:
             # Calculate extra validators when no appeal has failed
             extra_validators = get_validators_for_transaction(
-                not_used_validators, nb_current_validators + 2
+                validators, nb_current_validators + 2, exclude=receipt_addresses
             )
         elif appeal_failed == 1:
             # Calculate extra validators when one appeal has failed
             n = (nb_current_validators - 2) // 2
             extra_validators = get_validators_for_transaction(
-                not_used_validators, n + 1
+                validators, n + 1, exclude=receipt_addresses
             )
             extra_validators = current_validators[n:] + extra_validators
         else:
             # Calculate extra validators when more than one appeal has failed
             n = (nb_current_validators - 3) // (2 * appeal_failed - 1)
             extra_validators = get_validators_for_transaction(
-                not_used_validators, 2 * n
+                validators, 2 * n, exclude=receipt_addresses
             )
             extra_validators = current_validators[n:] + extra_validators
 
@@ -575,19 +969,28 @@ class ConsensusAlgorithm:
         Returns:
             list: List of validators involved in the consensus process.
         """
-        # Extract addresses of current validators from consensus data
+        # Extract addresses of current validators from consensus data, including the unrevealed ones
         current_validators_addresses = {
             validator.node_config["address"] for validator in consensus_data.validators
-        }
+        } | set(consensus_data.unrevealed_validators)
         # Return validators whose addresses are in the current validators addresses
+        rows = get_stake_index(all_validators).rows
         return [
-            validator
-            for validator in all_validators
-            if validator["address"] in current_validators_addresses
+            all_validators[row]
+            for row in sorted(
+                rows[address]
+                for address in current_validators_addresses
+                if address in rows
+            )
         ]
 
     def set_finality_window_time(self, time: int):
         self.finality_window_time = time
+        if self.appeal_window_loop is not None:
+            # The deadlines of the scheduled transactions changed
+            self.appeal_window_loop.call_soon_threadsafe(
+                self.appeal_window_listener.wake
+            )
 
 
 class TransactionContext:
@@ -596,9 +999,9 @@ class TransactionContext:
 
     Attributes:
         transaction (Transaction): The transaction.
-        transactions_processor (TransactionsProcessor): Instance responsible for handling transaction operations within the database.
+        transactions_processor (AsyncRepository): Instance responsible for handling transaction operations within the database, see `TransactionsProcessor`.
         snapshot (ChainSnapshot): Snapshot of the chain state.
-        accounts_manager (AccountsManager): Manager for accounts.
+        accounts_manager (AsyncRepository): Manager for accounts, see `AccountsManager`.
         contract_snapshot_factory (Callable[[str], ContractSnapshot]): Factory function to create contract snapshots.
         node_factory (Callable[[dict, ExecutionMode, ContractSnapshot, Receipt | None, MessageHandler, Callable[[str], ContractSnapshot]], Node]): Factory function to create nodes.
         msg_handler (MessageHandler): Handler for messaging.
@@ -610,14 +1013,19 @@ class TransactionContext:
         votes (dict): Dictionary of votes.
         validator_nodes (list): List of validator nodes.
         validation_results (list): List of validation results.
+        early_decision (bool): Whether to stop waiting for validators once the majority vote is settled.
+        pipelined_validation (bool): Whether to start the validators at the same time as the leader.
+        validation_tasks (list[asyncio.Future] | None): Validations started with the leader, when pipelined.
+        get_session (Callable[[], Session | AsyncSession] | None): Function to get a database session for the validations that can outlive the consensus decision.
+        validation_session (Session | AsyncSession | None): Session of the contract snapshots of those validations.
     """
 
     def __init__(
         self,
         transaction: Transaction,
-        transactions_processor: TransactionsProcessor,
+        transactions_processor: TransactionsProcessor | AsyncRepository,
         snapshot: ChainSnapshot,
-        accounts_manager: AccountsManager,
+        accounts_manager: AccountsManager | AsyncRepository,
         contract_snapshot_factory: Callable[[str], ContractSnapshot],
         node_factory: Callable[
             [
@@ -637,17 +1045,18 @@ class TransactionContext:
 
         Args:
             transaction (Transaction): The transaction.
-            transactions_processor (TransactionsProcessor): Instance responsible for handling transaction operations within the database.
+            transactions_processor (TransactionsProcessor | AsyncRepository): Instance responsible for handling transaction operations within the database.
             snapshot (ChainSnapshot): Snapshot of the chain state.
-            accounts_manager (AccountsManager): Manager for accounts.
+            accounts_manager (AccountsManager | AsyncRepository): Manager for accounts.
             contract_snapshot_factory (Callable[[str], ContractSnapshot]): Factory function to create contract snapshots.
             node_factory (Callable[[dict, ExecutionMode, ContractSnapshot, Receipt | None, MessageHandler, Callable[[str], ContractSnapshot]], Node]): Factory function to create nodes.
             msg_handler (MessageHandler): Handler for messaging.
         """
         self.transaction = transaction
-        self.transactions_processor = transactions_processor
+        # The states await the database calls, so they don't block the event loop with an async session
+        self.transactions_processor = AsyncRepository.of(transactions_processor)
         self.snapshot = snapshot
-        self.accounts_manager = accounts_manager
+        self.accounts_manager = AsyncRepository.of(accounts_manager)
         self.contract_snapshot_factory = contract_snapshot_factory
         self.node_factory = node_factory
         self.msg_handler = msg_handler
@@ -661,6 +1070,11 @@ class TransactionContext:
         self.votes: dict = {}
         self.validator_nodes: list = []
         self.validation_results: list = []
+        self.early_decision: bool = False
+        self.pipelined_validation: bool = False
+        self.validation_tasks: list[asyncio.Future] | None = None
+        self.get_session: Callable[[], Session | AsyncSession] | None = None
+        self.validation_session: Session | AsyncSession | None = None
 
 
 class TransactionState(ABC):
@@ -692,26 +1106,16 @@ class PendingState(TransactionState):
             context (TransactionContext): The context of the transaction.
 
         Returns:
-            TransactionState | None: The ProposingState or None if the transaction is already in process, when it is a transaction or when there are no validators.
+            TransactionState | None: The ProposingState or None when it is a transfer or when there are no validators.
         """
-        if (
-            context.transactions_processor.get_transaction_by_hash(
-                context.transaction.hash
-            )["status"]
-            != TransactionStatus.PENDING.value
-        ):
-            # This is a patch for a TOCTOU problem we have https://github.com/yeagerai/genlayer-simulator/issues/387
-            # Problem: Pending transactions are checked by `_crawl_snapshot`, which appends them to queues. These queues are consumed by `_run_consensus`, which processes the transactions. This means that a transaction can be processed multiple times, since `_crawl_snapshot` can append the same transaction to the queue multiple times.
-            # Partial solution: This patch checks if the transaction is still pending before processing it. This is not the best solution, but we'll probably refactor the whole consensus algorithm in the short term.
-            print(" ~ ~ ~ ~ ~ TRANSACTION ALREADY IN PROCESS: ", context.transaction)
-            return None
-
+        # Transactions reach this state exactly once: `_crawl_snapshot` claims them in the database
+        # and `enqueue_transaction` ignores the ones already in flight
         print(" ~ ~ ~ ~ ~ EXECUTING TRANSACTION: ", context.transaction)
 
         # If transaction is a transfer, execute it
         # TODO: consider when the transfer involves a contract account, bridging, etc.
         if context.transaction.type == TransactionType.SEND:
-            ConsensusAlgorithm.execute_transfer(
+            await ConsensusAlgorithm.execute_transfer(
                 context.transaction,
                 context.transactions_processor,
                 context.accounts_manager,
@@ -737,7 +1141,7 @@ class PendingState(TransactionState):
                 all_validators, context.transaction.consensus_data
             )
             # Reset the transaction appeal status
-            context.transactions_processor.set_transaction_appeal(
+            await context.transactions_processor.set_transaction_appeal(
                 context.transaction.hash, False
             )
             context.transaction.appealed = False
@@ -777,7 +1181,7 @@ class ProposingState(TransactionState):
             return UndeterminedState()
 
         # Dispatch a transaction status update to PROPOSING
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.PROPOSING,
@@ -796,25 +1200,31 @@ class ProposingState(TransactionState):
             context.transaction.to_address
         )
 
-        # Create a leader node for executing the transaction
-        leader_node = context.node_factory(
-            leader,
-            ExecutionMode.LEADER,
-            contract_snapshot_supplier(),
-            None,
-            context.msg_handler,
-            context.contract_snapshot_factory,
-        )
+        if context.pipelined_validation and remaining_validators:
+            leader_receipt = await self.exec_pipelined(
+                context, leader, remaining_validators, contract_snapshot_supplier
+            )
+        else:
+            # Create a leader node for executing the transaction
+            leader_node = context.node_factory(
+                leader,
+                ExecutionMode.LEADER,
+                await context.transactions_processor.run(contract_snapshot_supplier),
+                None,
+                context.msg_handler,
+                context.contract_snapshot_factory,
+            )
 
-        # Execute the transaction and obtain the leader receipt
-        leader_receipt = await leader_node.exec_transaction(context.transaction)
+            # Execute the transaction and obtain the leader receipt
+            leader_receipt = await leader_node.exec_transaction(context.transaction)
+            context.validation_tasks = None
         votes = {leader["address"]: leader_receipt.vote.value}
 
         # Update the consensus data with the leader's vote and receipt
         context.consensus_data.votes = votes
         context.consensus_data.leader_receipt = leader_receipt
         context.consensus_data.validators = []
-        context.transactions_processor.set_transaction_result(
+        await context.transactions_processor.set_transaction_result(
             context.transaction.hash, context.consensus_data.to_dict()
         )
 
@@ -827,6 +1237,78 @@ class ProposingState(TransactionState):
         # Transition to the CommittingState
         return CommittingState()
 
+    @staticmethod
+    async def exec_pipelined(
+        context: TransactionContext,
+        leader: dict,
+        remaining_validators: list,
+        contract_snapshot_supplier: Callable[[], ContractSnapshot],
+    ) -> Receipt:
+        """
+        Execute the transaction on the leader, and start the validators at the same time. Validators wait for
+        the non-deterministic results of the leader through a `LeaderResultsChannel`, so only those parts of
+        their executions wait for the leader.
+        The validations are left running in `context.validation_tasks`, the CommittingState waits for them.
+
+        Args:
+            context (TransactionContext): The context of the transaction.
+            leader (dict): The leader.
+            remaining_validators (list): The validators.
+            contract_snapshot_supplier (Callable[[], ContractSnapshot]): Supplier of contract snapshots.
+
+        Returns:
+            Receipt: The receipt of the leader.
+        """
+        leader_results = LeaderResultsChannel()
+        validation_snapshot_supplier, validation_snapshot_factory = (
+            CommittingState.open_validation_session(context, contract_snapshot_supplier)
+            if context.early_decision
+            else (
+                lambda: context.transactions_processor.run(contract_snapshot_supplier),
+                context.contract_snapshot_factory,
+            )
+        )
+        leader_node = context.node_factory(
+            leader,
+            ExecutionMode.LEADER,
+            await context.transactions_processor.run(contract_snapshot_supplier),
+            None,
+            context.msg_handler,
+            context.contract_snapshot_factory,
+            leader_results=leader_results,
+        )
+        context.validator_nodes = [
+            context.node_factory(
+                validator,
+                ExecutionMode.VALIDATOR,
+                await validation_snapshot_supplier(),
+                None,
+                context.msg_handler,
+                validation_snapshot_factory,
+                leader_results=leader_results,
+            )
+            for validator in remaining_validators
+        ]
+        context.validation_tasks = [
+            asyncio.ensure_future(validator.exec_transaction(context.transaction))
+            for validator in context.validator_nodes
+        ]
+
+        try:
+            leader_receipt = await leader_node.exec_transaction(context.transaction)
+        except BaseException as e:
+            leader_results.fail(e)
+            for task in context.validation_tasks:
+                task.cancel()
+            CommittingState.release_validations(
+                context, dict(zip(context.validation_tasks, context.validator_nodes))
+            )
+            context.validation_tasks = None
+            raise
+
+        leader_results.finish(leader_receipt)
+        return leader_receipt
+
 
 class CommittingState(TransactionState):
     """
@@ -844,36 +1326,276 @@ class CommittingState(TransactionState):
             TransactionState: The RevealingState.
         """
         # Dispatch a transaction status update to COMMITTING
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.COMMITTING,
             context.msg_handler,
         )
 
-        # Create validator nodes for each validator
-        context.validator_nodes = [
-            context.node_factory(
-                validator,
-                ExecutionMode.VALIDATOR,
-                context.contract_snapshot_supplier(),
-                context.consensus_data.leader_receipt,
-                context.msg_handler,
-                context.contract_snapshot_factory,
+        # Appeals need the results of every validator to update the consensus data
+        early_decision = context.early_decision and not context.transaction.appealed
+        context.consensus_data.unrevealed_validators = []
+
+        # Create validator nodes for each validator, unless they were started with the leader
+        if context.validation_tasks is None:
+            validation_snapshot_supplier, validation_snapshot_factory = (
+                self.open_validation_session(
+                    context, context.contract_snapshot_supplier
+                )
+                if early_decision
+                else (
+                    lambda: context.transactions_processor.run(
+                        context.contract_snapshot_supplier
+                    ),
+                    context.contract_snapshot_factory,
+                )
             )
-            for validator in context.remaining_validators
-        ]
+            context.validator_nodes = [
+                context.node_factory(
+                    validator,
+                    ExecutionMode.VALIDATOR,
+                    await validation_snapshot_supplier(),
+                    context.consensus_data.leader_receipt,
+                    context.msg_handler,
+                    validation_snapshot_factory,
+                )
+                for validator in context.remaining_validators
+            ]
 
-        # Execute the transaction on each validator node and gather the results
-        validation_tasks = [
-            validator.exec_transaction(context.transaction)
-            for validator in context.validator_nodes
-        ]
-        context.validation_results = await asyncio.gather(*validation_tasks)
+        if early_decision:
+            await self.exec_until_decided(context)
+        elif context.validation_tasks is not None:
+            context.validation_results = await asyncio.gather(*context.validation_tasks)
+        else:
+            # Validators returning from a previous appeal round already voted on this leader receipt
+            reusable_receipts = (
+                self.get_reusable_receipts(context.transaction.consensus_data)
+                if context.transaction.appealed
+                else {}
+            )
+            leader_digest = context.consensus_data.leader_receipt.get_digest()
+
+            # Execute the transaction on each new validator node and gather the results
+            new_results = iter(
+                await asyncio.gather(
+                    *[
+                        validator.exec_transaction(context.transaction)
+                        for validator in context.validator_nodes
+                        if (validator.address, leader_digest) not in reusable_receipts
+                    ]
+                )
+            )
+            context.validation_results = [
+                reusable_receipts.get((validator.address, leader_digest))
+                or next(new_results)
+                for validator in context.validator_nodes
+            ]
+        context.validation_tasks = None
 
         # Transition to the RevealingState
         return RevealingState()
 
+    @staticmethod
+    def get_reusable_receipts(
+        consensus_data: ConsensusData | None,
+    ) -> dict[tuple[str, str], Receipt]:
+        """
+        Get the validator receipts of the previous rounds of a transaction, so validators selected again for
+        an appeal don't have to execute it again.
+
+        Args:
+            consensus_data (ConsensusData | None): Consensus data of the transaction.
+
+        Returns:
+            dict[tuple[str, str], Receipt]: Receipts keyed by validator address and digest of the leader receipt they voted on.
+        """
+        if consensus_data is None or consensus_data.leader_receipt is None:
+            return {}
+        leader_digest = consensus_data.leader_receipt.get_digest()
+        return {
+            (receipt.node_config["address"], leader_digest): receipt
+            for receipt in consensus_data.validators or []
+        }
+
+    @staticmethod
+    def open_validation_session(
+        context: TransactionContext,
+        contract_snapshot_supplier: Callable[[], ContractSnapshot],
+    ) -> tuple[
+        Callable[[], Awaitable[ContractSnapshot]], Callable[[str], ContractSnapshot]
+    ]:
+        """
+        Get the contract snapshots of validators that can still be running after the consensus decision,
+        see `exec_until_decided`. By then, the session of the transaction can be closed or used by the next
+        transaction, so their snapshots get a session of their own, closed by `release_validations`.
+
+        Args:
+            context (TransactionContext): The context of the transaction.
+            contract_snapshot_supplier (Callable[[], ContractSnapshot]): Supplier of contract snapshots, used without `context.get_session`.
+
+        Returns:
+            tuple[Callable[[], Awaitable[ContractSnapshot]], Callable[[str], ContractSnapshot]]: The supplier and the factory of the contract snapshots of the validators.
+        """
+        if context.get_session is None:
+            return (
+                lambda: context.transactions_processor.run(contract_snapshot_supplier),
+                context.contract_snapshot_factory,
+            )
+        context.validation_session = context.get_session()
+        session = (
+            context.validation_session.sync_session
+            if isinstance(context.validation_session, AsyncSession)
+            else context.validation_session
+        )
+        transaction = context.transaction
+        validation_snapshot_factory = (
+            lambda contract_address: contract_snapshot_factory(
+                contract_address, session, transaction
+            )
+        )
+        return (
+            lambda: run_sync(
+                session, validation_snapshot_factory, transaction.to_address
+            ),
+            validation_snapshot_factory,
+        )
+
+    @staticmethod
+    async def exec_until_decided(context: TransactionContext):
+        """
+        Execute the transaction on each validator node, and stop waiting as soon as the majority vote is settled:
+        when more than half of the validators agree, or when it can no longer happen.
+        Only the receipts received until then are revealed. The remaining validators finish in the background
+        and their votes are only logged. Validators that fail are not revealed either.
+
+        Args:
+            context (TransactionContext): The context of the transaction.
+        """
+        majority = context.num_validators // 2
+        agree_votes = len(
+            [vote for vote in context.votes.values() if vote == Vote.AGREE.value]
+        )
+        undecided_votes = len(context.validator_nodes)
+
+        started_tasks = (
+            context.validation_tasks
+            if context.validation_tasks is not None
+            else [
+                asyncio.ensure_future(validator.exec_transaction(context.transaction))
+                for validator in context.validator_nodes
+            ]
+        )
+        validation_tasks = {task: i for i, task in enumerate(started_tasks)}
+        validation_results: dict[int, Receipt] = {}
+        pending = set(validation_tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    undecided_votes -= 1
+                    try:
+                        validation_result = task.result()
+                    except Exception as e:
+                        validator = context.validator_nodes[validation_tasks[task]]
+                        print("Error running validator", validator.address, e)
+                        continue
+                    validation_results[validation_tasks[task]] = validation_result
+                    if validation_result.vote == Vote.AGREE:
+                        agree_votes += 1
+
+                if agree_votes > majority or agree_votes + undecided_votes <= majority:
+                    break
+        except BaseException:
+            # E.g. the worker is cancelled, the validations are not needed anymore
+            for task in pending:
+                task.cancel()
+            raise
+        finally:
+            CommittingState.release_validations(
+                context,
+                {
+                    task: context.validator_nodes[validation_tasks[task]]
+                    for task in pending
+                },
+            )
+
+        # Keep the validators order, the revealed votes don't depend on the execution time
+        indexes = sorted(validation_results)
+        context.consensus_data.unrevealed_validators = [
+            validator.address
+            for i, validator in enumerate(context.validator_nodes)
+            if i not in validation_results
+        ]
+        context.validator_nodes = [context.validator_nodes[i] for i in indexes]
+        context.validation_results = [validation_results[i] for i in indexes]
+
+    @staticmethod
+    def release_validations(
+        context: TransactionContext, tasks: dict[asyncio.Future, Node]
+    ):
+        """
+        Let the validations still running finish in the background, logging their votes,
+        and close their session once all of them finished.
+
+        Args:
+            context (TransactionContext): The context of the transaction.
+            tasks (dict[asyncio.Future, Node]): The validations still running, with their validator.
+        """
+        session, context.validation_session = context.validation_session, None
+        for task, validator in tasks.items():
+            late_validations.add(task)
+            task.add_done_callback(
+                lambda task, validator=validator: CommittingState._log_late_validation(
+                    context, validator, task
+                )
+            )
+
+        if session is None:
+            return
+        if not tasks:
+            CommittingState._close_validation_session(session)
+            return
+        asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+            lambda _: CommittingState._close_validation_session(session)
+        )
+
+    @staticmethod
+    def _close_validation_session(session: Session | AsyncSession):
+        if not isinstance(session, AsyncSession):
+            session.close()
+            return
+        # Async sessions are closed by a task, referenced until it finishes like the late validations
+        closing = asyncio.ensure_future(session.close())
+        late_validations.add(closing)
+        closing.add_done_callback(late_validations.discard)
+
+    @staticmethod
+    def _log_late_validation(
+        context: TransactionContext, validator: Node, task: asyncio.Future
+    ):
+        late_validations.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            print("Error running late validator", validator.address, task.exception())
+            return
+        context.msg_handler.send_message(
+            LogEvent(
+                "late_validator_vote",
+                EventType.INFO,
+                EventScope.CONSENSUS,
+                "Validator vote received after the consensus decision",
+                {
+                    "validator": validator.address,
+                    "vote": task.result().vote.value,
+                },
+                transaction_hash=context.transaction.hash,
+            )
+        )
+
 
 class RevealingState(TransactionState):
     """
@@ -891,7 +1613,7 @@ class RevealingState(TransactionState):
             TransactionState | None: The AcceptedState or ProposingState or None if the transaction is successfully appealed.
         """
         # Update the transaction status to REVEALING
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.REVEALING,
@@ -919,7 +1641,7 @@ class RevealingState(TransactionState):
             context.consensus_data.validators = [validation_result]
 
             # Set the consensus data of the transaction
-            context.transactions_processor.set_transaction_result(
+            await context.transactions_processor.set_transaction_result(
                 context.transaction.hash, context.consensus_data.to_dict()
             )
 
@@ -935,6 +1657,15 @@ class RevealingState(TransactionState):
                 context.transaction.consensus_data.votes | context.votes
             )
 
+            # The committee keeps the validators of the appealed round whose votes were not revealed
+            previous_consensus_data = context.transaction.consensus_data
+            context.consensus_data.unrevealed_validators = (
+                previous_consensus_data.unrevealed_validators
+            )
+            nb_previous_validators = len(previous_consensus_data.validators) + len(
+                previous_consensus_data.unrevealed_validators
+            )
+
             # Overwrite old validator results based on the number of appeal failures
             if context.transaction.appeal_failed == 0:
                 context.consensus_data.validators = (
@@ -943,16 +1674,14 @@ class RevealingState(TransactionState):
                 )
 
             elif context.transaction.appeal_failed == 1:
-                n = (len(context.transaction.consensus_data.validators) - 1) // 2
+                n = (nb_previous_validators - 1) // 2
                 context.consensus_data.validators = (
                     context.transaction.consensus_data.validators[: n - 1]
                     + context.validation_results
                 )
 
             else:
-                n = len(context.validation_results) - (
-                    len(context.transaction.consensus_data.validators) + 1
-                )
+                n = len(context.validation_results) - (nb_previous_validators + 1)
                 context.consensus_data.validators = (
                     context.transaction.consensus_data.validators[: n - 1]
                     + context.validation_results
@@ -960,7 +1689,7 @@ class RevealingState(TransactionState):
 
             if majority_agrees:
                 # Appeal failed, increment the appeal_failed counter
-                context.transactions_processor.set_transaction_appeal_failed(
+                await context.transactions_processor.set_transaction_appeal_failed(
                     context.transaction.hash,
                     context.transaction.appeal_failed + 1,
                 )
@@ -968,16 +1697,16 @@ class RevealingState(TransactionState):
 
             else:
                 # Appeal succeeded, set the status to PENDING and reset the appeal_failed counter
-                context.transactions_processor.set_transaction_result(
+                await context.transactions_processor.set_transaction_result(
                     context.transaction.hash, context.consensus_data.to_dict()
                 )
-                ConsensusAlgorithm.dispatch_transaction_status_update(
+                await ConsensusAlgorithm.dispatch_transaction_status_update(
                     context.transactions_processor,
                     context.transaction.hash,
                     TransactionStatus.PENDING,
                     context.msg_handler,
                 )
-                context.transactions_processor.set_transaction_appeal_failed(
+                await context.transactions_processor.set_transaction_appeal_failed(
                     context.transaction.hash,
                     0,
                 )
@@ -1018,18 +1747,18 @@ class AcceptedState(TransactionState):
         """
         if not context.transaction.appealed:
             # When appeal fails, the appeal window is not reset
-            context.transactions_processor.set_transaction_timestamp_accepted(
+            await context.transactions_processor.set_transaction_timestamp_accepted(
                 context.transaction.hash
             )
 
         # Set the transaction appeal status to False
-        context.transactions_processor.set_transaction_appeal(
+        await context.transactions_processor.set_transaction_appeal(
             context.transaction.hash, False
         )
         context.transaction.appealed = False
 
         # Update the transaction status to ACCEPTED
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.ACCEPTED,
@@ -1037,7 +1766,7 @@ class AcceptedState(TransactionState):
         )
 
         # Set the transaction result
-        context.transactions_processor.set_transaction_result(
+        await context.transactions_processor.set_transaction_result(
             context.transaction.hash, context.consensus_data.to_dict()
         )
 
@@ -1058,7 +1787,9 @@ class AcceptedState(TransactionState):
         leader_receipt = context.consensus_data.leader_receipt
 
         # Get the contract snapshot for the transaction's target address
-        leaders_contract_snapshot = context.contract_snapshot_supplier()
+        leaders_contract_snapshot = await context.transactions_processor.run(
+            context.contract_snapshot_supplier
+        )
 
         if leader_receipt.execution_result == ExecutionResultStatus.SUCCESS:
             # Register contract if it is a new contract
@@ -1066,12 +1797,14 @@ class AcceptedState(TransactionState):
                 new_contract = {
                     "id": context.transaction.data["contract_address"],
                     "data": {
-                        "state": leader_receipt.contract_state,
+                        "state": leader_receipt.get_contract_state(),
                         "code": context.transaction.data["contract_code"],
                         "ghost_contract_address": context.transaction.ghost_contract_address,
                     },
                 }
-                leaders_contract_snapshot.register_contract(new_contract)
+                await context.transactions_processor.run(
+                    leaders_contract_snapshot.register_contract, new_contract
+                )
 
                 # Send a message indicating successful contract deployment
                 context.msg_handler.send_message(
@@ -1086,8 +1819,9 @@ class AcceptedState(TransactionState):
                 )
             # Update contract state if it is an existing contract
             else:
-                leaders_contract_snapshot.update_contract_state(
-                    leader_receipt.contract_state
+                await context.transactions_processor.run(
+                    leaders_contract_snapshot.update_contract_state,
+                    leader_receipt.get_contract_state(),
                 )
 
         return None
@@ -1123,7 +1857,7 @@ class UndeterminedState(TransactionState):
         )
 
         # Update the transaction status to UNDETERMINED
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.UNDETERMINED,
@@ -1131,7 +1865,7 @@ class UndeterminedState(TransactionState):
         )
 
         # Set the transaction result with the current consensus data
-        context.transactions_processor.set_transaction_result(
+        await context.transactions_processor.set_transaction_result(
             context.transaction.hash,
             context.consensus_data.to_dict(),
         )
@@ -1154,7 +1888,7 @@ class FinalizingState(TransactionState):
             None: The transaction is finalized.
         """
         # Update the transaction status to FINALIZED
-        ConsensusAlgorithm.dispatch_transaction_status_update(
+        await ConsensusAlgorithm.dispatch_transaction_status_update(
             context.transactions_processor,
             context.transaction.hash,
             TransactionStatus.FINALIZED,
@@ -1166,7 +1900,7 @@ class FinalizingState(TransactionState):
             context.transaction.consensus_data.leader_receipt.pending_transactions
         )
         for pending_transaction in pending_transactions:
-            nonce = context.transactions_processor.get_transaction_count(
+            nonce = await context.transactions_processor.get_transaction_count(
                 context.transaction.to_address
             )
             data: dict
@@ -1177,8 +1911,8 @@ class FinalizingState(TransactionState):
                 if pending_transaction.salt_nonce == 0:
                     # NOTE: this address is random, which doesn't 100% align with consensus spec
                     new_contract_address = (
-                        context.accounts_manager.create_new_account().address
-                    )
+                        await context.accounts_manager.create_new_account()
+                    ).address
                 else:
                     from eth_utils.crypto import keccak
                     from backend.node.types import Address
@@ -1192,7 +1926,7 @@ class FinalizingState(TransactionState):
                     )
                     arr.extend(SIMULATOR_CHAIN_ID.to_bytes(32, "big", signed=False))
                     new_contract_address = Address(keccak(arr)[:20]).as_hex
-                    context.accounts_manager.create_new_account_with_address(
+                    await context.accounts_manager.create_new_account_with_address(
                         new_contract_address
                     )
                 pending_transaction.address = new_contract_address
@@ -1206,7 +1940,7 @@ class FinalizingState(TransactionState):
                 data = {
                     "calldata": pending_transaction.calldata,
                 }
-            context.transactions_processor.insert_transaction(
+            await context.transactions_processor.insert_transaction(
                 context.transaction.to_address,  # new calls are done by the contract
                 pending_transaction.address,
                 data,
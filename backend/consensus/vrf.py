@@ -1,26 +1,83 @@
 from datetime import datetime
+from typing import Iterable
 import numpy as np
 
 
+class StakeIndex:
+    """
+    Stake of a list of validators as a NumPy array, with a mapping from address to row,
+    so that validators can be sampled with array operations.
+    """
+
+    def __init__(self, validators: list[dict]):
+        self.validators = validators
+        self.stakes = np.array(
+            [validator["stake"] for validator in validators], dtype=np.float64
+        )
+        total_stake = self.stakes.sum()
+        self.probabilities = (
+            self.stakes / total_stake if total_stake > 0 else self.stakes
+        )
+        self.rows = {
+            validator["address"]: row
+            for row, validator in enumerate(validators)
+            if "address" in validator
+        }
+
+    def sample(
+        self,
+        num_validators: int,
+        rng: np.random.Generator,
+        exclude: Iterable[str] = (),
+    ) -> list[dict]:
+        """
+        Returns `num_validators` validators sampled without replacement, with probabilities proportional
+        to their stake, in the order they are drawn. Validators whose address is in `exclude` are never returned.
+
+        Uses the exponential keys of Efraimidis and Spirakis: drawing the validators with the smallest
+        `Exp(1) / stake` is the same as drawing them one by one based on their stake.
+        """
+        excluded_rows = list({self.rows[a] for a in exclude if a in self.rows})
+        num_validators = min(num_validators, len(self.validators) - len(excluded_rows))
+        if num_validators <= 0:
+            return []
+
+        with np.errstate(divide="ignore"):
+            keys = rng.standard_exponential(len(self.validators)) / self.stakes
+        # Validators without stake are only drawn when there is nobody else left
+        keys[self.stakes <= 0] = np.finfo(np.float64).max
+        keys[excluded_rows] = np.inf
+
+        rows = np.argpartition(keys, num_validators - 1)[:num_validators]
+        rows = rows[np.argsort(keys[rows], kind="stable")]
+        return [self.validators[row] for row in rows]
+
+
+_stake_index: StakeIndex | None = None
+
+
+def get_stake_index(validators: list[dict]) -> StakeIndex:
+    """
+    Returns the stake index of `validators`. The index is only rebuilt when called with another list,
+    so callers should keep passing the same list while the validators don't change.
+    """
+    global _stake_index
+    stake_index = _stake_index
+    if stake_index is None or stake_index.validators is not validators:
+        stake_index = StakeIndex(validators)
+        _stake_index = stake_index
+    return stake_index
+
+
 def get_validators_for_transaction(
     nodes: list[dict],
     num_validators: int,
     rng=np.random.default_rng(seed=int(datetime.now().timestamp())),
+    exclude: Iterable[str] = (),
 ) -> list[dict]:
     """
     Returns subset of validators for a transaction.
     The selelction and order is given by a random sampling based on the stake of the validators.
+    Validators whose address is in `exclude` are not selected.
     """
-    num_validators = min(num_validators, len(nodes))
-
-    total_stake = sum(validator["stake"] for validator in nodes)
-    probabilities = [validator["stake"] / total_stake for validator in nodes]
-
-    selected_validators = rng.choice(
-        nodes,
-        p=probabilities,
-        size=num_validators,
-        replace=False,
-    )
-
-    return list(selected_validators)
+    return get_stake_index(nodes).sample(num_validators, rng, exclude)
@@ -0,0 +1,83 @@
+# database_handler/async_repository.py
+
+import asyncio
+from typing import Any, Callable
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_session,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+
+_RUN_SYNC_LOCK = "run_sync_lock"
+
+
+def get_async_db_uri(db_uri: str) -> str:
+    """Return the URI of the same PostgreSQL database with the asyncpg driver."""
+    return (
+        make_url(db_uri)
+        .set(drivername="postgresql+asyncpg")
+        .render_as_string(hide_password=False)
+    )
+
+
+def create_async_session_factory(
+    db_uri: str, **engine_options
+) -> async_sessionmaker[AsyncSession]:
+    """Create the async sessions of the consensus, over `postgresql+asyncpg`."""
+    engine = create_async_engine(get_async_db_uri(db_uri), **engine_options)
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def run_sync(session: Session | None, function: Callable, /, *args, **kwargs):
+    """
+    Run a function that uses `session`, e.g. a method of a repository or a `ContractSnapshot` creation.
+
+    If `session` is the synchronous session of an `AsyncSession` (see `create_async_session_factory`), the function
+    runs through `AsyncSession.run_sync`: its queries go through asyncpg and are awaited, instead of blocking the
+    event loop. An `AsyncSession` can't be used by concurrent coroutines (e.g. the leader and the validators of
+    a transaction), so these calls are serialized per session.
+    Otherwise (e.g. synchronous sessions, or mocks), the function runs directly.
+    """
+    proxy = async_session(session) if isinstance(session, Session) else None
+    if proxy is None:
+        return function(*args, **kwargs)
+    async with session.info.setdefault(_RUN_SYNC_LOCK, asyncio.Lock()):
+        return await proxy.run_sync(lambda _: function(*args, **kwargs))
+
+
+class AsyncRepository:
+    """
+    Awaitable proxy of a repository of the database handler (e.g. `TransactionsProcessor`, `AccountsManager`)
+    for the coroutines of the consensus. Its methods are the ones of the repository, and return coroutines that
+    run them on the session of the repository with `run_sync`.
+
+    With an `AsyncSession`, the repository must be created with `session.sync_session`, so that its queries go
+    through asyncpg and are awaited, instead of blocking the event loop.
+    """
+
+    def __init__(self, repository: Any):
+        self.repository = repository
+
+    @classmethod
+    def of(cls, repository: Any) -> "AsyncRepository":
+        """Return `repository` if it is already awaitable, or its proxy."""
+        if isinstance(repository, AsyncRepository):
+            return repository
+        return cls(repository)
+
+    async def run(self, function: Callable, /, *args, **kwargs):
+        """Run a function using the session of the repository, see `run_sync`."""
+        session = getattr(self.repository, "session", None)
+        return await run_sync(session, function, *args, **kwargs)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.repository, name)
+
+        async def run_method(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        return run_method
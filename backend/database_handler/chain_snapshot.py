@@ -4,6 +4,7 @@ from typing import List
 from sqlalchemy.orm import Session
 
 from backend.database_handler.transactions_processor import (
+    LOAD_TRIGGERED_TRANSACTIONS,
     TransactionStatus,
     Transactions,
 )
@@ -16,15 +17,17 @@ class ChainSnapshot:
         self.session = session
         self.validators_registry = ValidatorsRegistry(session)
         self.all_validators = self.validators_registry.get_all_validators()
-        self.pending_transactions = self._load_pending_transactions()
         self.num_validators = len(self.all_validators)
-        self.accepted_transactions = self._load_accepted_transactions()
+        # Transactions are loaded on first access, most callers only need the validators
+        self.pending_transactions: List[dict] | None = None
+        self.accepted_transactions: List[dict] | None = None
 
     def _load_pending_transactions(self) -> List[dict]:
         """Load and return the list of pending transactions from the database."""
 
         pending_transactions = (
             self.session.query(Transactions)
+            .options(LOAD_TRIGGERED_TRANSACTIONS)
             .filter(Transactions.status == TransactionStatus.PENDING)
             .all()
         )
@@ -35,6 +38,8 @@ class ChainSnapshot:
 
     def get_pending_transactions(self):
         """Return the list of pending transactions."""
+        if self.pending_transactions is None:
+            self.pending_transactions = self._load_pending_transactions()
         return self.pending_transactions
 
     def get_all_validators(self):
@@ -46,6 +51,7 @@ class ChainSnapshot:
 
         accepted_transactions = (
             self.session.query(Transactions)
+            .options(LOAD_TRIGGERED_TRANSACTIONS)
             .filter(Transactions.status == TransactionStatus.ACCEPTED)
             .all()
         )
@@ -56,4 +62,6 @@ class ChainSnapshot:
 
     def get_accepted_transactions(self):
         """Return the list of accepted transactions."""
+        if self.accepted_transactions is None:
+            self.accepted_transactions = self._load_accepted_transactions()
         return self.accepted_transactions
@@ -0,0 +1,126 @@
+# database_handler/consensus_workers.py
+
+import datetime
+import hashlib
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .models import ConsensusWorkers, ContractLeases
+
+
+def get_shard_owner(address: str, workers: list[str]) -> str:
+    """
+    Deterministically assign an address to one of the live workers.
+    Every worker computes the same owner as long as they see the same (sorted) list of workers.
+    """
+    digest = hashlib.sha256(address.lower().encode("utf-8")).digest()
+    return workers[int.from_bytes(digest[:8], "big") % len(workers)]
+
+
+class ConsensusWorkersRegistry:
+    """
+    Keeps track of the consensus workers running across processes and replicas, and of the contract
+    addresses each of them owns.
+
+    A worker is alive while it keeps sending heartbeats. Contract addresses are sharded across live workers
+    with `get_shard_owner`, and a worker must hold the lease of an address before executing its transactions,
+    so transactions of a contract are never executed concurrently and keep their order.
+    Leases are renewed with the heartbeat, and expire when the worker dies so other workers can take over.
+
+    Timestamps come from the database clock, so replicas don't need synchronized clocks.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def heartbeat(self, worker_id: str):
+        """Register the worker as alive and renew its leases."""
+        stmt = insert(ConsensusWorkers).values(id=worker_id, heartbeat_at=func.now())
+        self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ConsensusWorkers.id],
+                set_={"heartbeat_at": stmt.excluded.heartbeat_at},
+            )
+        )
+        self.renew_leases(worker_id)
+
+    def renew_leases(self, worker_id: str):
+        """Renew the leases of `worker_id`, e.g. for leases held on behalf of a worker (see `heartbeat`)."""
+        self.session.query(ContractLeases).filter(
+            ContractLeases.worker_id == worker_id
+        ).update({ContractLeases.heartbeat_at: func.now()}, synchronize_session=False)
+
+    def get_live_workers(self, timeout: int) -> list[str]:
+        """Return the sorted ids of the workers that sent a heartbeat in the last `timeout` seconds."""
+        workers = (
+            self.session.query(ConsensusWorkers.id)
+            .filter(
+                ConsensusWorkers.heartbeat_at
+                >= func.now() - datetime.timedelta(seconds=timeout)
+            )
+            .order_by(ConsensusWorkers.id)
+            .all()
+        )
+        return [worker.id for worker in workers]
+
+    def remove_dead_workers(self, timeout: int):
+        """Forget the workers that didn't send a heartbeat in the last `timeout` seconds."""
+        self.session.query(ConsensusWorkers).filter(
+            ConsensusWorkers.heartbeat_at
+            < func.now() - datetime.timedelta(seconds=timeout)
+        ).delete(synchronize_session=False)
+
+    def acquire_leases(
+        self, worker_id: str, addresses: list[str], timeout: int
+    ) -> list[str]:
+        """
+        Try to lease `addresses` to the worker. Addresses leased to another worker are only taken over
+        when that lease was not renewed in the last `timeout` seconds.
+
+        Returns:
+            list[str]: All the addresses leased to the worker, including the ones it already held.
+        """
+        addresses = sorted(set(addresses))
+        if addresses:
+            stmt = insert(ContractLeases).values(
+                [
+                    {
+                        "address": address,
+                        "worker_id": worker_id,
+                        "heartbeat_at": func.now(),
+                    }
+                    for address in addresses
+                ]
+            )
+            self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ContractLeases.address],
+                    set_={
+                        "worker_id": stmt.excluded.worker_id,
+                        "heartbeat_at": stmt.excluded.heartbeat_at,
+                    },
+                    where=or_(
+                        ContractLeases.worker_id == worker_id,
+                        ContractLeases.heartbeat_at
+                        < func.now() - datetime.timedelta(seconds=timeout),
+                    ),
+                )
+            )
+        return self.get_leased_addresses(worker_id)
+
+    def get_leased_addresses(self, worker_id: str) -> list[str]:
+        leases = (
+            self.session.query(ContractLeases.address)
+            .filter(ContractLeases.worker_id == worker_id)
+            .order_by(ContractLeases.address)
+            .all()
+        )
+        return [lease.address for lease in leases]
+
+    def release_lease(self, worker_id: str, address: str):
+        self.session.query(ContractLeases).filter(
+            ContractLeases.address == address,
+            ContractLeases.worker_id == worker_id,
+        ).delete(synchronize_session=False)
@@ -1,7 +1,121 @@
 # database_handler/contract_snapshot.py
-from .models import CurrentState
+import base64
+from collections import OrderedDict
+import datetime
+import threading
+
+from .models import ContractStorage, CurrentState
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
 
+# Number of contracts kept by `contract_snapshot_cache`
+CONTRACT_SNAPSHOT_CACHE_SIZE = 256
+# How long the values of the slots replaced by a newer version are kept for the snapshots still reading
+# the previous versions, see `LazyEncodedState`. It must be longer than any execution.
+SUPERSEDED_SLOTS_RETENTION = datetime.timedelta(hours=1)
+
+
+class CachedContract:
+    """
+    Data of a contract at a given version, shared by every snapshot of that version.
+    It must not be modified, except to add the slots loaded from the database.
+    """
+
+    def __init__(self, contract_data: dict):
+        self.contract_data = contract_data
+        # Encoded slots loaded so far, None for the slots that don't exist
+        self.slots: dict[str, str | None] = {}
+
+
+class ContractSnapshotCache:
+    """
+    In-process LRU cache of the contracts loaded by `ContractSnapshot`, shared by every session and thread.
+
+    Entries are keyed by the address and the version of the contract, i.e. `CurrentState.state_version`, which
+    is incremented whenever the contract is written, so a stale entry is never returned even if the contract was
+    changed by another process. Entries are also dropped when the contract is written by this process.
+    """
+
+    def __init__(self, max_size: int = CONTRACT_SNAPSHOT_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.entries: OrderedDict[str, tuple[int, CachedContract]] = OrderedDict()
+
+    def get(self, address: str, version: int) -> CachedContract | None:
+        with self.lock:
+            entry = self.entries.get(address)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(address)
+            return entry[1]
+
+    def put(self, address: str, version: int, contract: CachedContract):
+        with self.lock:
+            self.entries[address] = (version, contract)
+            self.entries.move_to_end(address)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, address: str):
+        with self.lock:
+            self.entries.pop(address, None)
+
+
+contract_snapshot_cache = ContractSnapshotCache()
+
+
+class LazyEncodedState(dict[str, str]):
+    """
+    Encoded state of a contract, i.e. base64 slot ids to base64 slot contents.
+    Slots are loaded from the `contract_storage` table the first time they are read by any snapshot of the
+    same version of the contract, see `CachedContract`. Slots set on this dict are only seen by its snapshot.
+
+    Slots are read as of `version`: values written by newer versions of the contract are skipped, so the state
+    stays consistent even if the contract is written while it is being read, see `ContractSnapshot._write_slots`.
+    """
+
+    def __init__(
+        self,
+        contract_address: str,
+        version: int,
+        session: Session,
+        loaded_slots: dict[str, str | None] | None = None,
+    ):
+        super().__init__()
+        self.contract_address = contract_address
+        self.version = version
+        self.session = session
+        self.loaded_slots = {} if loaded_slots is None else loaded_slots
+
+    def __missing__(self, slot_id: str) -> str:
+        if slot_id in self.loaded_slots:
+            encoded_value = self.loaded_slots[slot_id]
+        else:
+            value = self.session.execute(
+                select(ContractStorage.value)
+                .where(
+                    ContractStorage.address == self.contract_address,
+                    ContractStorage.slot == base64.b64decode(slot_id),
+                    ContractStorage.version <= self.version,
+                )
+                .order_by(ContractStorage.version.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+            encoded_value = (
+                None if value is None else base64.b64encode(value).decode("ascii")
+            )
+            self.loaded_slots[slot_id] = encoded_value
+        if encoded_value is None:
+            raise KeyError(slot_id)
+        self[slot_id] = encoded_value
+        return encoded_value
+
+    def get(self, slot_id: str, default: str | None = None) -> str | None:
+        try:
+            return self[slot_id]
+        except KeyError:
+            return default
+
 
 # TODO: should ContractSnapshot be a dataclass with just the contract data? Snapshots shouldn't be allowed to be modified, so it doesn't make sense to modify the database
 # TODO: once we have it in the state, we should only allow states in ACCEPTED or FINALIZED status.
@@ -9,12 +123,18 @@ class ContractSnapshot:
     """
     Warning: if you initialize this class with a contract_address:
     - The contract_address must exist in the database.
-    - `self.contract_data`, `self.contract_code` and `self.encoded_state` will be loaded from the database **only once** at initialization.
+    - `self.contract_data` and `self.contract_code` will be loaded from the database **only once** at initialization.
+    - The slots of `self.encoded_state` will be loaded from the database **only once**, the first time they are read.
+      They are read as of the version that was loaded, even if the contract was written since, see `LazyEncodedState`.
+    - The contract is loaded from `contract_snapshot_cache` when it didn't change since it was last loaded,
+      in which case `self.contract_data` is shared and must not be modified.
     """
 
     contract_address: str
     contract_code: str
     encoded_state: dict[str, str]
+    # `CurrentState.state_version` of the loaded contract, it is incremented whenever the contract is written
+    version: int
 
     def __init__(self, contract_address: str | None, session: Session):
         self.session = session
@@ -22,20 +142,45 @@ class ContractSnapshot:
         if contract_address is not None:
             self.contract_address = contract_address
 
-            contract_account = self._load_contract_account()
-            self.contract_data = contract_account.data
+            cached_contract = self._load_cached_contract()
+            self.contract_data = cached_contract.contract_data
             self.contract_code = self.contract_data["code"]
-            self.encoded_state = self.contract_data["state"]
+            self.encoded_state = LazyEncodedState(
+                contract_address, self.version, session, cached_contract.slots
+            )
             self.ghost_contract_address = (
                 self.contract_data["ghost_contract_address"]
                 if "ghost_contract_address" in self.contract_data
                 else None
             )
 
-    def _load_contract_account(self) -> CurrentState:
-        """Load and return the current state of the contract from the database."""
+    def _load_cached_contract(self) -> CachedContract:
+        """Return the contract from `contract_snapshot_cache`, loading it from the database on a miss."""
+        result = (
+            self.session.query(CurrentState.state_version)
+            .filter(CurrentState.id == self.contract_address)
+            .one_or_none()
+        )
+        if result is None:
+            raise Exception(f"Contract {self.contract_address} not found")
+
+        self.version = result.state_version
+        cached_contract = contract_snapshot_cache.get(
+            self.contract_address, self.version
+        )
+        if cached_contract is None:
+            contract_account = self._load_contract_account()
+            self.version = contract_account.state_version
+            cached_contract = CachedContract(contract_account.data)
+            contract_snapshot_cache.put(
+                self.contract_address, self.version, cached_contract
+            )
+        return cached_contract
+
+    def _load_contract_account(self):
+        """Load and return the current data of the contract from the database."""
         result = (
-            self.session.query(CurrentState)
+            self.session.query(CurrentState.data, CurrentState.state_version)
             .filter(CurrentState.id == self.contract_address)
             .one_or_none()
         )
@@ -51,18 +196,59 @@ class ContractSnapshot:
             self.session.query(CurrentState).filter_by(id=contract["id"]).one()
         )
 
-        current_contract.data = contract["data"]
+        contract_data = dict(contract["data"])
+        state = contract_data.pop("state", {})
+        current_contract.data = contract_data
+        self._write_slots(contract["id"], state)
         self.session.commit()
+        contract_snapshot_cache.invalidate(contract["id"])
 
     def update_contract_state(self, new_state: dict[str, str]):
-        """Update the state of the contract in the database."""
-        new_contract_data = {
-            "code": self.contract_data["code"],
-            "state": new_state,
-        }
-
-        contract = (
-            self.session.query(CurrentState).filter_by(id=self.contract_address).one()
-        )
-        contract.data = new_contract_data
+        """
+        Update the state of the contract in the database.
+        `new_state` only needs to contain the slots that changed, the other slots are kept.
+        """
+        self._write_slots(self.contract_address, new_state)
         self.session.commit()
+        contract_snapshot_cache.invalidate(self.contract_address)
+
+    def _write_slots(self, contract_address: str, encoded_state: dict[str, str]):
+        """
+        Write the slots of a new version of the contract.
+        The values they replace are kept for `SUPERSEDED_SLOTS_RETENTION`, for the snapshots still reading them.
+        """
+        version = self.session.execute(
+            update(CurrentState)
+            .where(CurrentState.id == contract_address)
+            .values(state_version=CurrentState.state_version + 1)
+            .returning(CurrentState.state_version)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        if not encoded_state:
+            return
+
+        previous_values = self.session.query(ContractStorage).filter(
+            ContractStorage.address == contract_address,
+            ContractStorage.slot.in_(
+                [base64.b64decode(slot_id) for slot_id in encoded_state]
+            ),
+        )
+        previous_values.filter(
+            ContractStorage.superseded_at < func.now() - SUPERSEDED_SLOTS_RETENTION
+        ).delete(synchronize_session=False)
+        previous_values.filter(ContractStorage.superseded_at.is_(None)).update(
+            {ContractStorage.superseded_at: func.now()}, synchronize_session=False
+        )
+        self.session.execute(
+            insert(ContractStorage).values(
+                [
+                    {
+                        "address": contract_address,
+                        "slot": base64.b64decode(slot_id),
+                        "value": base64.b64decode(value),
+                        "version": version,
+                    }
+                    for slot_id, value in encoded_state.items()
+                ]
+            )
+        )
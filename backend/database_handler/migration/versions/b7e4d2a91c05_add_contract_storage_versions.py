@@ -0,0 +1,58 @@
+"""add contract storage versions
+
+Revision ID: b7e4d2a91c05
+Revises: 3e9a6c1f0d52
+Create Date: 2026-10-18 21:04:37.118264
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e4d2a91c05"
+down_revision: Union[str, None] = "3e9a6c1f0d52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "current_state",
+        sa.Column(
+            "state_version",
+            sa.BigInteger(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "contract_storage",
+        sa.Column(
+            "version", sa.BigInteger(), server_default=sa.text("0"), nullable=False
+        ),
+    )
+    op.alter_column("contract_storage", "version", server_default=None)
+    op.add_column(
+        "contract_storage",
+        sa.Column("superseded_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.drop_constraint("contract_storage_pkey", "contract_storage", type_="primary")
+    op.create_primary_key(
+        "contract_storage_pkey", "contract_storage", ["address", "slot", "version"]
+    )
+
+
+def downgrade() -> None:
+    # Only the latest value of each slot is kept
+    op.execute("DELETE FROM contract_storage WHERE superseded_at IS NOT NULL")
+    op.drop_constraint("contract_storage_pkey", "contract_storage", type_="primary")
+    op.create_primary_key(
+        "contract_storage_pkey", "contract_storage", ["address", "slot"]
+    )
+    op.drop_column("contract_storage", "superseded_at")
+    op.drop_column("contract_storage", "version")
+    op.drop_column("current_state", "state_version")
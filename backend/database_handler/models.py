@@ -6,7 +6,9 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     Enum,
+    Index,
     Integer,
+    LargeBinary,
     PrimaryKeyConstraint,
     String,
     UniqueConstraint,
@@ -53,6 +55,15 @@ class CurrentState(Base):
     id: Mapped[str] = mapped_column(String(255), primary_key=True)
     data: Mapped[dict] = mapped_column(JSONB)
     balance: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Number of transactions sent from this account, see `TransactionsProcessor.insert_transaction`
+    nonce: Mapped[int] = mapped_column(
+        Integer, default=0, server_default=text("0"), nullable=False
+    )
+    # Version of the code and storage of the contract, incremented whenever they are written,
+    # see `ContractSnapshot.version`
+    state_version: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default=text("0"), nullable=False
+    )
     updated_at: Mapped[Optional[datetime.datetime]] = mapped_column(
         DateTime(True),
         init=False,
@@ -61,12 +72,63 @@ class CurrentState(Base):
     )
 
 
+class ContractStorage(Base):
+    __tablename__ = "contract_storage"
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "address", "slot", "version", name="contract_storage_pkey"
+        ),
+    )
+
+    address: Mapped[str] = mapped_column(
+        String(255),
+        ForeignKey(
+            "current_state.id",
+            name="contract_storage_address_fkey",
+            ondelete="CASCADE",
+        ),
+    )
+    # Raw slot id and content, they are base64 encoded in `ContractSnapshot.encoded_state` and in receipts
+    slot: Mapped[bytes] = mapped_column(LargeBinary)
+    value: Mapped[bytes] = mapped_column(LargeBinary)
+    # `CurrentState.state_version` that wrote the value, the values of the previous versions are kept
+    # for the snapshots still reading them, see `LazyEncodedState`
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    # When the value was replaced by the one of a newer version, see `ContractSnapshot._write_slots`
+    superseded_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime(True), default=None
+    )
+
+
+class StateBlobs(Base):
+    __tablename__ = "state_blobs"
+    __table_args__ = (PrimaryKeyConstraint("hash", name="state_blobs_pkey"),)
+
+    # Contract states of the receipts in `Transactions.consensus_data`, stored once by content hash
+    hash: Mapped[str] = mapped_column(String(66), primary_key=True)
+    data: Mapped[dict] = mapped_column(JSONB)
+
+
 class Transactions(Base):
     __tablename__ = "transactions"
     __table_args__ = (
         CheckConstraint("type = ANY (ARRAY[0, 1, 2])", name="transactions_type_check"),
         PrimaryKeyConstraint("hash", name="transactions_pkey"),
         CheckConstraint("value >= 0", name="value_unsigned_int"),
+        Index("ix_transactions_from_address_created_at", "from_address", "created_at"),
+        Index("ix_transactions_to_address_created_at", "to_address", "created_at"),
+        # Consensus only scans the transactions that are still active
+        Index(
+            "ix_transactions_active_status_created_at",
+            "status",
+            "created_at",
+            postgresql_where=text("status IN ('PENDING', 'ACCEPTED')"),
+        ),
+        Index(
+            "ix_transactions_worker_id",
+            "worker_id",
+            postgresql_where=text("worker_id IS NOT NULL"),
+        ),
     )
 
     hash: Mapped[str] = mapped_column(String(66), primary_key=True, unique=True)
@@ -117,6 +179,28 @@ class Transactions(Base):
     )
     appealed: Mapped[bool] = mapped_column(Boolean, default=False)
     timestamp_accepted: Mapped[Optional[int]] = mapped_column(BigInteger, default=None)
+    # Consensus worker that claimed the transaction for execution, see `TransactionsProcessor.claim_pending_transactions`
+    worker_id: Mapped[Optional[str]] = mapped_column(String(255), default=None)
+    claimed_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime(True), default=None
+    )
+
+
+class ConsensusWorkers(Base):
+    __tablename__ = "consensus_workers"
+    __table_args__ = (PrimaryKeyConstraint("id", name="consensus_workers_pkey"),)
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    heartbeat_at: Mapped[datetime.datetime] = mapped_column(DateTime(True))
+
+
+class ContractLeases(Base):
+    __tablename__ = "contract_leases"
+    __table_args__ = (PrimaryKeyConstraint("address", name="contract_leases_pkey"),)
+
+    address: Mapped[str] = mapped_column(String(255), primary_key=True)
+    worker_id: Mapped[str] = mapped_column(String(255))
+    heartbeat_at: Mapped[datetime.datetime] = mapped_column(DateTime(True))
 
 
 class Validators(Base):
@@ -124,6 +208,7 @@ class Validators(Base):
     __table_args__ = (
         PrimaryKeyConstraint("id", name="validators_pkey"),
         CheckConstraint("stake >= 0", name="stake_unsigned_int"),
+        Index("ix_validators_address", "address"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, init=False)
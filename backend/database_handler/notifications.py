@@ -0,0 +1,137 @@
+# database_handler/notifications.py
+
+import asyncio
+import traceback
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+# Channel used to signal that a transaction entered the PENDING status
+PENDING_TRANSACTIONS_CHANNEL = "pending_transactions"
+# Channel used to signal that a transaction entered the ACCEPTED status or was appealed
+ACCEPTED_TRANSACTIONS_CHANNEL = "accepted_transactions"
+# Channel used to signal that the validator set changed
+VALIDATORS_CHANNEL = "validators"
+
+
+def notify(session: Session, channel: str, payload: str = ""):
+    """
+    Queue a Postgres notification on `channel`.
+    Notifications are transactional: listeners only receive them once the session is committed,
+    so they never observe rows that are not visible yet.
+    """
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+class NotificationListener:
+    """
+    Listens on Postgres LISTEN/NOTIFY channels from within an asyncio event loop.
+
+    The listener owns a dedicated connection taken from the engine pool, and it must be used
+    from a single event loop. If the connection can't be established or gets lost,
+    `wait` degrades to a plain timeout so callers keep working in polling mode.
+    """
+
+    def __init__(self, engine: Engine, channels: list[str]):
+        self.engine = engine
+        self.channels = channels
+        self.connection = None
+        self.received: set[str] = set()
+        self.payloads: dict[str, list[str]] = {}
+        self._event: asyncio.Event | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self.connection is not None
+
+    def _connect(self):
+        raw_connection = self.engine.raw_connection()
+        try:
+            driver_connection = raw_connection.driver_connection
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                for channel in self.channels:
+                    cursor.execute(f'LISTEN "{channel}"')
+        except Exception:
+            raw_connection.close()
+            raise
+        self.connection = raw_connection
+        asyncio.get_running_loop().add_reader(
+            driver_connection.fileno(), self._on_readable
+        )
+
+    def _disconnect(self):
+        if self.connection is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(
+                self.connection.driver_connection.fileno()
+            )
+        except Exception:
+            pass
+        try:
+            self.connection.invalidate()
+        except Exception:
+            pass
+        self.connection = None
+
+    def _on_readable(self):
+        driver_connection = self.connection.driver_connection
+        try:
+            driver_connection.poll()
+        except Exception as e:
+            print("Notification listener connection lost", e)
+            self._disconnect()
+            self._event.set()
+            return
+
+        while driver_connection.notifies:
+            notification = driver_connection.notifies.pop(0)
+            self.received.add(notification.channel)
+            self.payloads.setdefault(notification.channel, []).append(
+                notification.payload
+            )
+        if self.received:
+            self._event.set()
+
+    async def wait(self, timeout: float) -> set[str]:
+        """
+        Wait until a notification arrives or `timeout` seconds elapse.
+
+        Returns:
+            set[str]: The channels that were notified since the previous call. Empty on timeout.
+        """
+        if self._event is None:
+            self._event = asyncio.Event()
+
+        if not self.connected:
+            try:
+                self._connect()
+            except Exception as e:
+                print("Could not listen for database notifications", e)
+                print(traceback.format_exc())
+
+        if not self.received:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except TimeoutError:
+                pass
+
+        self._event.clear()
+        received, self.received = self.received, set()
+        return received
+
+    def pop_payloads(self, channel: str) -> list[str]:
+        """Return the payloads received on `channel` since the previous call, in order."""
+        return self.payloads.pop(channel, [])
+
+    def wake(self):
+        """Wake up the waiter without a notification, e.g. when the caller's schedule changed."""
+        if self._event is not None:
+            self._event.set()
+
+    def close(self):
+        self._disconnect()
@@ -2,20 +2,36 @@
 from enum import Enum
 import rlp
 
-from .models import Transactions
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from .models import CurrentState, StateBlobs, Transactions
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, defer, selectinload
+from sqlalchemy import or_, and_, func, tuple_, update
 
 from .models import TransactionStatus
+from contextlib import asynccontextmanager, contextmanager
 from eth_utils import to_bytes, keccak, is_address
 import json
 import base64
 import time
+import datetime
 from backend.domain.types import TransactionType
+from backend.node.types import get_state_digest
 from web3 import Web3
+from backend.database_handler.async_repository import run_sync
 from backend.database_handler.contract_snapshot import ContractSnapshot
+from backend.database_handler.notifications import (
+    ACCEPTED_TRANSACTIONS_CHANNEL,
+    PENDING_TRANSACTIONS_CHANNEL,
+    notify,
+)
 import os
 
+# `_parse_transaction_data` lists the hashes of the triggered transactions. Queries returning several transactions
+# load them with this option, in one query for all the rows instead of one query per row
+LOAD_TRIGGERED_TRANSACTIONS = selectinload(
+    Transactions.triggered_transactions
+).load_only(Transactions.hash)
+
 
 class TransactionAddressFilter(Enum):
     ALL = "all"
@@ -23,12 +39,34 @@ class TransactionAddressFilter(Enum):
     FROM = "from"
 
 
+class TransactionView(Enum):
+    # Every field of the transaction
+    FULL = "full"
+    # Without the heavy `data` and `consensus_data` fields, which are not read from the database
+    SLIM = "slim"
+    # Slim, with the leader receipt of `consensus_data` only
+    RECEIPT = "receipt"
+
+
+# Statuses a transaction goes through while consensus is running. With `write_behind`, they are only
+# written to the database together with the next status that is not intermediate
+INTERMEDIATE_STATUSES = {
+    TransactionStatus.PROPOSING,
+    TransactionStatus.COMMITTING,
+    TransactionStatus.REVEALING,
+}
+
+
 class TransactionsProcessor:
     def __init__(
         self,
         session: Session,
     ):
         self.session = session
+        self.write_buffer: dict[str, dict] = {}
+        self.buffering = False
+        # Statuses before `write_behind` of the transactions whose intermediate status was flushed since its start
+        self.previous_statuses: dict[str, TransactionStatus] = {}
 
         # Connect to Hardhat Network
         port = os.environ.get("HARDHAT_PORT")
@@ -37,16 +75,16 @@ class TransactionsProcessor:
         self.web3 = Web3(Web3.HTTPProvider(hardhat_url))
 
     @staticmethod
-    def _parse_transaction_data(transaction_data: Transactions) -> dict:
-        return {
+    def _parse_transaction_data(
+        transaction_data: Transactions, slim: bool = False
+    ) -> dict:
+        parsed = {
             "hash": transaction_data.hash,
             "from_address": transaction_data.from_address,
             "to_address": transaction_data.to_address,
-            "data": transaction_data.data,
             "value": transaction_data.value,
             "type": transaction_data.type,
             "status": transaction_data.status.value,
-            "consensus_data": transaction_data.consensus_data,
             "gaslimit": transaction_data.nonce,
             "nonce": transaction_data.nonce,
             "r": transaction_data.r,
@@ -64,6 +102,34 @@ class TransactionsProcessor:
             "timestamp_accepted": transaction_data.timestamp_accepted,
             "appeal_failed": transaction_data.appeal_failed,
         }
+        if not slim:
+            parsed["data"] = transaction_data.data
+            parsed["consensus_data"] = transaction_data.consensus_data
+        return parsed
+
+    def _query_transactions(self, view: TransactionView):
+        """Query transactions, and only load the columns needed by `view`. Rows are parsed by `_parse_transaction_view`."""
+        query = self.session.query(Transactions)
+        if view != TransactionView.FULL:
+            query = query.options(
+                defer(Transactions.data), defer(Transactions.consensus_data)
+            )
+        if view == TransactionView.RECEIPT:
+            query = query.add_columns(Transactions.consensus_data["leader_receipt"])
+        return query
+
+    @staticmethod
+    def _parse_transaction_view(row, view: TransactionView) -> dict:
+        if view == TransactionView.RECEIPT:
+            transaction, leader_receipt = row
+            parsed = TransactionsProcessor._parse_transaction_data(
+                transaction, slim=True
+            )
+            parsed["leader_receipt"] = leader_receipt
+            return parsed
+        return TransactionsProcessor._parse_transaction_data(
+            row, slim=view == TransactionView.SLIM
+        )
 
     @staticmethod
     def _transaction_data_to_str(data: dict) -> str:
@@ -131,11 +197,9 @@ class TransactionsProcessor:
             str | None
         ) = None,  # If filled, the transaction must be present in the database (committed)
     ) -> str:
-        current_nonce = self.get_transaction_count(from_address)
-
-        if nonce != current_nonce:
+        if not self._increment_nonce(from_address, nonce):
             raise Exception(
-                f"Unexpected nonce. Provided: {nonce}, expected: {current_nonce}"
+                f"Unexpected nonce. Provided: {nonce}, expected: {self.get_transaction_count(from_address)}"
             )
 
         transaction_hash = self._generate_transaction_hash(
@@ -236,35 +300,295 @@ class TransactionsProcessor:
         if type != TransactionType.SEND.value:
             self.create_rollup_transaction(new_transaction.hash)
 
+        # Wake up the consensus intake once this transaction gets committed
+        notify(self.session, PENDING_TRANSACTIONS_CHANNEL, new_transaction.hash)
+
         return new_transaction.hash
 
-    def get_transaction_by_hash(self, transaction_hash: str) -> dict | None:
+    def get_transaction_by_hash(
+        self, transaction_hash: str, view: TransactionView = TransactionView.FULL
+    ) -> dict | None:
+        self.flush()
         transaction = (
-            self.session.query(Transactions)
-            .filter_by(hash=transaction_hash)
+            self._query_transactions(view)
+            .filter(Transactions.hash == transaction_hash)
             .one_or_none()
         )
 
         if transaction is None:
             return None
 
-        return self._parse_transaction_data(transaction)
+        return self._parse_transaction_view(transaction, view)
 
     def update_transaction_status(
         self, transaction_hash: str, new_status: TransactionStatus
     ):
-        transaction = (
-            self.session.query(Transactions).filter_by(hash=transaction_hash).one()
+        self._write(transaction_hash, {Transactions.status: new_status})
+        if not self.buffering or new_status not in INTERMEDIATE_STATUSES:
+            self.flush()
+
+    @contextmanager
+    def write_behind(self):
+        """
+        Buffer the status and result updates of transactions in memory while consensus is running.
+        Buffered updates are written, one statement per transaction, and committed when the transaction reaches
+        a status that is not intermediate (e.g. ACCEPTED, UNDETERMINED or back to PENDING), or when leaving the
+        context. Reads of transactions through this processor flush the buffer first.
+        If the context exits with an exception, the buffered updates are discarded instead, see `discard_writes`.
+        """
+        self.buffering = True
+        self.previous_statuses = {}
+        try:
+            yield self
+        except BaseException:
+            self.buffering = False
+            self.discard_writes()
+            raise
+        self.buffering = False
+        self.flush()
+
+    @asynccontextmanager
+    async def async_write_behind(self):
+        """`write_behind` for a processor on the synchronous session of an `AsyncSession`, see `run_sync`."""
+        self.buffering = True
+        self.previous_statuses = {}
+        try:
+            yield self
+        except BaseException:
+            self.buffering = False
+            await run_sync(self.session, self.discard_writes)
+            raise
+        self.buffering = False
+        await run_sync(self.session, self.flush)
+
+    def _write(self, transaction_hash: str, values: dict):
+        self.write_buffer.setdefault(transaction_hash, {}).update(values)
+
+    def discard_writes(self):
+        """
+        Discard the buffered updates of transactions after consensus failed, and roll back the session.
+        Transactions of `write_behind` that were left in an intermediate status (e.g. flushed by a read) get back
+        the status they had before, so that they are not stranded (e.g. an appealed transaction goes back to
+        ACCEPTED). Transactions that were already stranded in an intermediate status are set back to PENDING.
+        """
+        self.write_buffer = {}
+        previous_statuses, self.previous_statuses = self.previous_statuses, {}
+        self.session.rollback()
+        if not previous_statuses:
+            return
+        hashes_by_status: dict[TransactionStatus, list[str]] = {}
+        for transaction_hash, status in previous_statuses.items():
+            if status in INTERMEDIATE_STATUSES:
+                status = TransactionStatus.PENDING
+            hashes_by_status.setdefault(status, []).append(transaction_hash)
+        for status, transaction_hashes in hashes_by_status.items():
+            self.session.query(Transactions).filter(
+                Transactions.hash.in_(transaction_hashes),
+                Transactions.status.in_(INTERMEDIATE_STATUSES),
+            ).update({Transactions.status: status}, synchronize_session=False)
+        self.session.commit()
+
+    def flush(self):
+        """Write the buffered updates of transactions and commit."""
+        if not self.write_buffer:
+            return
+        write_buffer, self.write_buffer = self.write_buffer, {}
+        if self.buffering:
+            self._save_previous_statuses(write_buffer)
+        for transaction_hash, values in write_buffer.items():
+            self.session.query(Transactions).filter_by(hash=transaction_hash).update(
+                values
+            )
+            new_status = values.get(Transactions.status)
+            if new_status == TransactionStatus.PENDING:
+                # E.g. a successful appeal sends the transaction back to the consensus intake
+                notify(self.session, PENDING_TRANSACTIONS_CHANNEL, transaction_hash)
+            elif new_status == TransactionStatus.ACCEPTED:
+                # Schedule the finalization of the transaction in the appeal window
+                notify(self.session, ACCEPTED_TRANSACTIONS_CHANNEL, transaction_hash)
+        self.session.commit()
+
+    def _save_previous_statuses(self, write_buffer: dict[str, dict]):
+        """Keep the status of the transactions whose intermediate status is written for the first time, see `discard_writes`."""
+        transaction_hashes = [
+            transaction_hash
+            for transaction_hash, values in write_buffer.items()
+            if values.get(Transactions.status) in INTERMEDIATE_STATUSES
+            and transaction_hash not in self.previous_statuses
+        ]
+        if not transaction_hashes:
+            return
+        self.previous_statuses.update(
+            self.session.query(Transactions.hash, Transactions.status)
+            .filter(Transactions.hash.in_(transaction_hashes))
+            .all()
+        )
+
+    @staticmethod
+    def _claimable(lease_timeout: int):
+        """Condition for transactions that are not claimed, or whose claim expired."""
+        return or_(
+            Transactions.worker_id.is_(None),
+            Transactions.claimed_at
+            < func.now() - datetime.timedelta(seconds=lease_timeout),
+        )
+
+    def get_claimable_addresses(self, lease_timeout: int) -> list[str]:
+        """Return the addresses with PENDING transactions that can be claimed."""
+        address = func.coalesce(Transactions.to_address, Transactions.from_address)
+        rows = (
+            self.session.query(address)
+            .filter(
+                Transactions.status == TransactionStatus.PENDING,
+                self._claimable(lease_timeout),
+            )
+            .distinct()
+            .all()
+        )
+        return [row[0] for row in rows]
+
+    def claim_pending_transactions(
+        self, worker_id: str, lease_timeout: int, addresses: list[str] | None = None
+    ) -> list[dict]:
+        """
+        Atomically claim the PENDING transactions that no other worker holds, ordered by creation.
+        Rows are locked with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers never claim
+        the same transaction. Claims that were not renewed in the last `lease_timeout` seconds are
+        considered abandoned (e.g. the worker crashed) and can be claimed again.
+        If `addresses` is given, only transactions for those addresses are claimed.
+        """
+        query = (
+            self.session.query(Transactions)
+            .options(LOAD_TRIGGERED_TRANSACTIONS)
+            .filter(
+                Transactions.status == TransactionStatus.PENDING,
+                self._claimable(lease_timeout),
+            )
+        )
+        if addresses is not None:
+            query = query.filter(
+                func.coalesce(Transactions.to_address, Transactions.from_address).in_(
+                    addresses
+                )
+            )
+        transactions = (
+            query.order_by(Transactions.created_at)
+            .with_for_update(skip_locked=True)
+            .all()
         )
-        transaction.status = new_status
+        for transaction in transactions:
+            transaction.worker_id = worker_id
+            transaction.claimed_at = func.now()
         self.session.commit()
 
-    def set_transaction_result(self, transaction_hash: str, consensus_data: dict):
-        transaction = (
-            self.session.query(Transactions).filter_by(hash=transaction_hash).one()
+        return [
+            self._parse_transaction_data(transaction) for transaction in transactions
+        ]
+
+    def claim_transaction(
+        self, transaction_hash: str, worker_id: str, lease_timeout: int
+    ) -> bool:
+        """Atomically claim a single transaction, whatever its status. Returns whether the claim succeeded."""
+        claimed = (
+            self.session.query(Transactions)
+            .filter(
+                Transactions.hash == transaction_hash,
+                self._claimable(lease_timeout),
+            )
+            .update(
+                {
+                    Transactions.worker_id: worker_id,
+                    Transactions.claimed_at: func.now(),
+                },
+                synchronize_session=False,
+            )
         )
-        transaction.consensus_data = consensus_data
         self.session.commit()
+        return claimed == 1
+
+    def renew_claims(self, worker_id: str):
+        """Renew the lease of every transaction claimed by the worker."""
+        self.session.query(Transactions).filter(
+            Transactions.worker_id == worker_id
+        ).update({Transactions.claimed_at: func.now()}, synchronize_session=False)
+
+    def release_transaction(
+        self, transaction_hash: str, previous_status: TransactionStatus | None
+    ):
+        """
+        Release the worker claim of a transaction, so it can be claimed again if it is still PENDING.
+        The consensus intake skipped PENDING transactions while they were claimed, so it is woken up again
+        when the run sent the transaction back to PENDING (e.g. a successful appeal of an ACCEPTED transaction).
+        Transactions that were already PENDING when claimed (e.g. no validators, or a failed run) wait for
+        the next scan of the intake instead, so they are not executed again in a loop.
+        """
+        status = self.session.execute(
+            update(Transactions)
+            .where(Transactions.hash == transaction_hash)
+            .values(worker_id=None, claimed_at=None)
+            .returning(Transactions.status)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if (
+            status == TransactionStatus.PENDING
+            and previous_status != TransactionStatus.PENDING
+        ):
+            notify(self.session, PENDING_TRANSACTIONS_CHANNEL, transaction_hash)
+
+    def set_transaction_result(self, transaction_hash: str, consensus_data: dict):
+        """
+        The contract states of the receipts are stored once in `state_blobs`, and the receipts only keep
+        their hash, see `Receipt.from_dict`.
+        """
+        consensus_data = self._store_state_blobs(consensus_data)
+        self._write(transaction_hash, {Transactions.consensus_data: consensus_data})
+        if not self.buffering:
+            self.flush()
+
+    def _store_state_blobs(self, consensus_data: dict) -> dict:
+        blobs = {}
+
+        def to_blob_reference(receipt: dict | None) -> dict | None:
+            if not receipt or receipt.get("contract_state") is None:
+                return receipt
+            receipt = dict(receipt)
+            contract_state = receipt.pop("contract_state")
+            state_hash = receipt.get("contract_state_hash") or get_state_digest(
+                contract_state
+            )
+            blobs[state_hash] = contract_state
+            receipt["contract_state_hash"] = state_hash
+            return receipt
+
+        consensus_data = dict(consensus_data)
+        if "leader_receipt" in consensus_data:
+            consensus_data["leader_receipt"] = to_blob_reference(
+                consensus_data["leader_receipt"]
+            )
+        if consensus_data.get("validators"):
+            consensus_data["validators"] = [
+                to_blob_reference(receipt) for receipt in consensus_data["validators"]
+            ]
+
+        if blobs:
+            self.session.execute(
+                insert(StateBlobs)
+                .values(
+                    [
+                        {"hash": state_hash, "data": data}
+                        for state_hash, data in blobs.items()
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[StateBlobs.hash])
+            )
+        return consensus_data
+
+    def get_state_blob(self, state_hash: str) -> dict[str, str]:
+        """Return the contract state stored by `set_transaction_result` under `state_hash`."""
+        blob = self.session.query(StateBlobs).filter_by(hash=state_hash).one_or_none()
+        if blob is None:
+            raise Exception(f"State blob {state_hash} not found")
+        return blob.data
 
     def create_rollup_transaction(self, transaction_hash: str):
         transaction = (
@@ -309,20 +633,90 @@ class TransactionsProcessor:
         # # Get full transaction details including input data
         # transaction = self.web3.eth.get_transaction(tx_hash)
 
-    def get_transaction_count(self, address: str) -> int:
-        count = (
-            self.session.query(Transactions)
-            .filter(Transactions.from_address == address)
-            .count()
+    def get_appeal_window_entries(
+        self, transaction_hash: str | None = None
+    ) -> list[dict]:
+        """
+        Return the fields needed to schedule the appeal window of ACCEPTED transactions, without loading
+        their consensus data. If `transaction_hash` is given, only that transaction is returned (if ACCEPTED).
+        """
+        query = self.session.query(
+            Transactions.hash,
+            Transactions.timestamp_accepted,
+            Transactions.appealed,
+        ).filter(Transactions.status == TransactionStatus.ACCEPTED)
+        if transaction_hash is not None:
+            query = query.filter(Transactions.hash == transaction_hash)
+        return [
+            {
+                "hash": row.hash,
+                "timestamp_accepted": row.timestamp_accepted or 0,
+                "appealed": row.appealed,
+            }
+            for row in query.all()
+        ]
+
+    def get_transaction_count(self, address: str | None) -> int:
+        if address is None:
+            # Transactions without sender (e.g. funding an account) have no account to keep their nonce
+            return (
+                self.session.query(Transactions)
+                .filter(Transactions.from_address.is_(None))
+                .count()
+            )
+        nonce = (
+            self.session.query(CurrentState.nonce)
+            .filter(CurrentState.id == address)
+            .scalar()
+        )
+        return nonce or 0
+
+    def _increment_nonce(self, address: str | None, nonce: int) -> bool:
+        """
+        Atomically increment the nonce of the account if it is equal to `nonce`, creating the account on its
+        first transaction. Returns whether the nonce was incremented.
+        """
+        if address is None:
+            return nonce == self.get_transaction_count(None)
+
+        if nonce == 0:
+            statement = (
+                insert(CurrentState)
+                .values(id=address, data={}, balance=0, nonce=1)
+                .on_conflict_do_update(
+                    index_elements=[CurrentState.id],
+                    set_={"nonce": CurrentState.nonce + 1},
+                    where=CurrentState.nonce == 0,
+                )
+            )
+        else:
+            statement = (
+                update(CurrentState).where(
+                    CurrentState.id == address, CurrentState.nonce == nonce
+                )
+                # The nonce is not part of the contract state, keep the version of its snapshot
+                .values(
+                    nonce=CurrentState.nonce + 1, updated_at=CurrentState.updated_at
+                )
+            )
+        return (
+            self.session.execute(statement.returning(CurrentState.nonce)).first()
+            is not None
         )
-        return count
 
     def get_transactions_for_address(
         self,
         address: str,
         filter: TransactionAddressFilter,
+        limit: int | None = None,
+        cursor: str | None = None,
+        view: TransactionView = TransactionView.FULL,
     ) -> list[dict]:
-        query = self.session.query(Transactions)
+        """
+        Return the transactions of an address, the most recent first.
+        Pages are requested with `limit`, and `cursor` set to the hash of the last transaction of the previous page.
+        """
+        query = self._query_transactions(view).options(LOAD_TRIGGERED_TRANSACTIONS)
 
         if filter == TransactionAddressFilter.TO:
             query = query.filter(Transactions.to_address == address)
@@ -336,17 +730,33 @@ class TransactionsProcessor:
                 )
             )
 
-        transactions = query.order_by(Transactions.created_at.desc()).all()
+        if cursor is not None:
+            cursor_created_at = (
+                self.session.query(Transactions.created_at)
+                .filter(Transactions.hash == cursor)
+                .scalar()
+            )
+            if cursor_created_at is None:
+                raise Exception(f"Transaction {cursor} not found")
+            # Keyset pagination, the order is unique with the hash
+            query = query.filter(
+                tuple_(Transactions.created_at, Transactions.hash)
+                < tuple_(cursor_created_at, cursor)
+            )
+
+        query = query.order_by(Transactions.created_at.desc(), Transactions.hash.desc())
+        if limit is not None:
+            query = query.limit(limit)
 
-        return [
-            self._parse_transaction_data(transaction) for transaction in transactions
-        ]
+        return [self._parse_transaction_view(row, view) for row in query.all()]
 
     def set_transaction_appeal(self, transaction_hash: str, appeal: bool):
         transaction = (
             self.session.query(Transactions).filter_by(hash=transaction_hash).one()
         )
         transaction.appealed = appeal
+        if appeal:
+            notify(self.session, ACCEPTED_TRANSACTIONS_CHANNEL, transaction_hash)
 
     def set_transaction_timestamp_accepted(
         self, transaction_hash: str, timestamp_accepted: int = None
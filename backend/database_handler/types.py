@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from backend.node.types import Receipt
-from typing import Optional
+from typing import Callable, Optional
 
 
 @dataclass
@@ -8,6 +8,9 @@ class ConsensusData:
     votes: dict[str, str]
     leader_receipt: Receipt | None
     validators: list[Receipt] | None = None
+    # Addresses of the validators of the committee whose votes were not revealed, because the consensus was
+    # decided before they finished or because they failed, see `CommittingState.exec_until_decided`
+    unrevealed_validators: list[str] = field(default_factory=list)
 
     def to_dict(self):
         return {
@@ -16,18 +19,24 @@ class ConsensusData:
                 self.leader_receipt.to_dict() if self.leader_receipt else None
             ),
             "validators": [receipt.to_dict() for receipt in self.validators],
+            "unrevealed_validators": self.unrevealed_validators,
         }
 
     @classmethod
-    def from_dict(cls, input: dict) -> Optional["ConsensusData"]:
+    def from_dict(
+        cls, input: dict, load_state: Callable[[str], dict[str, str]] | None = None
+    ) -> Optional["ConsensusData"]:
         if input:
             return cls(
                 votes=input.get("votes", {}),
-                leader_receipt=Receipt.from_dict(input.get("leader_receipt", None)),
+                leader_receipt=Receipt.from_dict(
+                    input.get("leader_receipt", None), load_state
+                ),
                 validators=[
-                    Receipt.from_dict(validator)
+                    Receipt.from_dict(validator, load_state)
                     for validator in (input.get("validators", None) or [])
                 ],
+                unrevealed_validators=input.get("unrevealed_validators", []),
             )
         else:
             return None
@@ -1,13 +1,20 @@
 # consensus/domain/state.py
 
-from typing import List
+import threading
+import time
+from typing import Callable, List
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from backend.domain.types import LLMProvider, Validator
 
 from .models import Validators
+from .notifications import VALIDATORS_CHANNEL, notify
 from backend.errors.errors import ValidatorNotFound
 
+# Maximum age of the cached validator set, in case a change notification is missed
+VALIDATORS_CACHE_MAX_AGE = 60
+
 
 # the to_dict function lives in this module and not in models.py because it's on this layer of abstraction where we convert database objects to our custom data structures
 def to_dict(validator: Validators) -> dict:
@@ -24,11 +31,68 @@ def to_dict(validator: Validators) -> dict:
     }
 
 
+class ValidatorsCache:
+    """
+    In-process cache of the validator set, shared by every session and thread.
+
+    The cache is invalidated when a session that changed validators commits or rolls back, and when
+    another process changes them (see `VALIDATORS_CHANNEL`). The version makes sure that a validator set
+    loaded before an invalidation is never cached after it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.validators: List[dict] | None = None
+        self.loaded_at = 0.0
+
+    def get(self, load: Callable[[], List[dict]]) -> List[dict]:
+        """Return the cached validator set, loading it with `load` if needed. The list must not be modified."""
+        with self.lock:
+            if (
+                self.validators is not None
+                and time.monotonic() - self.loaded_at < VALIDATORS_CACHE_MAX_AGE
+            ):
+                return self.validators
+            version = self.version
+
+        validators = load()
+
+        with self.lock:
+            if self.version == version:
+                self.validators = validators
+                self.loaded_at = time.monotonic()
+        return validators
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.validators = None
+
+
+validators_cache = ValidatorsCache()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_validators_cache(session: Session):
+    if session.info.pop("validators_changed", False):
+        validators_cache.invalidate()
+
+
 class ValidatorsRegistry:
     def __init__(self, session: Session):
         self.session = session
         self.db_validators_table = "validators"
 
+    def _validators_changed(self):
+        """
+        Mark the validator set as changed. The cache is invalidated once the session commits,
+        and other processes are notified.
+        """
+        self.session.info["validators_changed"] = True
+        notify(self.session, VALIDATORS_CHANNEL)
+
     def _get_validator_or_fail(self, validator_address: str) -> Validators:
         """Private method to check if an account exists, and raise an error if not."""
 
@@ -46,6 +110,13 @@ class ValidatorsRegistry:
         return self.session.query(Validators).count()
 
     def get_all_validators(self) -> List[dict]:
+        """Return all the validators. The returned list is shared and must not be modified."""
+        if self.session.info.get("validators_changed"):
+            # Uncommitted changes must not be visible to other sessions
+            return self._load_all_validators()
+        return validators_cache.get(self._load_all_validators)
+
+    def _load_all_validators(self) -> List[dict]:
         validators_data = self.session.query(Validators).all()
         return [to_dict(validator) for validator in validators_data]
 
@@ -54,6 +125,7 @@ class ValidatorsRegistry:
 
     def create_validator(self, validator: Validator) -> dict:
         self.session.add(_to_db_model(validator))
+        self._validators_changed()
         return self.get_validator(validator.address)
 
     def update_validator(
@@ -68,6 +140,7 @@ class ValidatorsRegistry:
         validator.config = new_validator.llmprovider.config
         validator.plugin = new_validator.llmprovider.plugin
         validator.plugin_config = new_validator.llmprovider.plugin_config
+        self._validators_changed()
 
         return to_dict(validator)
 
@@ -75,9 +148,11 @@ class ValidatorsRegistry:
         validator = self._get_validator_or_fail(validator_address)
 
         self.session.delete(validator)
+        self._validators_changed()
 
     def delete_all_validators(self):
         self.session.query(Validators).delete()
+        self._validators_changed()
 
 
 # def _to_domain(validator: Validators) -> Validator:
@@ -5,6 +5,7 @@
 from dataclasses import dataclass
 import decimal
 from enum import Enum, IntEnum
+from typing import Callable
 
 from backend.database_handler.models import TransactionStatus
 from backend.database_handler.types import ConsensusData
@@ -111,7 +112,10 @@ class Transaction:
         }
 
     @classmethod
-    def from_dict(cls, input: dict) -> "Transaction":
+    def from_dict(
+        cls, input: dict, load_state: Callable[[str], dict[str, str]] | None = None
+    ) -> "Transaction":
+        """`load_state` loads the contract states referenced by the receipts, see `Receipt.from_dict`."""
         return cls(
             hash=input["hash"],
             status=TransactionStatus(input["status"]),
@@ -120,7 +124,9 @@ class Transaction:
             to_address=input.get("to_address"),
             input_data=input.get("input_data"),
             data=input.get("data"),
-            consensus_data=ConsensusData.from_dict(input.get("consensus_data")),
+            consensus_data=ConsensusData.from_dict(
+                input.get("consensus_data"), load_state
+            ),
             nonce=input.get("nonce"),
             value=input.get("value"),
             gaslimit=input.get("gaslimit"),
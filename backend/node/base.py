@@ -12,9 +12,17 @@ from backend.domain.types import Validator, Transaction, TransactionType
 from backend.protocol_rpc.message_handler.types import LogEvent, EventType, EventScope
 import backend.node.genvm.base as genvmbase
 import backend.node.genvm.origin.calldata as calldata
+from backend.database_handler.async_repository import run_sync
 from backend.database_handler.contract_snapshot import ContractSnapshot
-from backend.node.types import Receipt, ExecutionMode, Vote, ExecutionResultStatus
+from backend.node.types import (
+    Receipt,
+    ExecutionMode,
+    Vote,
+    ExecutionResultStatus,
+    get_state_digest,
+)
 from backend.protocol_rpc.message_handler.base import MessageHandler
+from backend.node.schema_cache import contract_schema_cache
 
 from .types import Address
 
@@ -22,6 +30,13 @@ SIMULATOR_CHAIN_ID: typing.Final[int] = 61999
 
 
 class _SnapshotView(genvmbase.StateProxy):
+    """
+    Storage of the contracts as seen by an execution.
+    Slots are decoded once and kept as `bytearray`s for the duration of the execution. Writes are only
+    kept by the view, as snapshots can be shared (see `ContractSnapshotCache`), and written slots are
+    encoded by `flush`, once, when the execution is finished.
+    """
+
     def __init__(
         self,
         snapshot: ContractSnapshot,
@@ -33,6 +48,12 @@ class _SnapshotView(genvmbase.StateProxy):
         self.snapshot_factory = snapshot_factory
         self.cached = {}
         self.readonly = readonly
+        self.slots: dict[tuple[Address, bytes], bytearray] = {}
+        self.dirty_slots: set[bytes] = set()
+
+    async def run(self, function: typing.Callable, /, *args) -> typing.Any:
+        # Contracts and slots are loaded lazily, on the session of the snapshot, which may be asynchronous
+        return await run_sync(getattr(self.snapshot, "session", None), function, *args)
 
     def _get_snapshot(self, addr: Address) -> ContractSnapshot:
         if addr == self.contract_address:
@@ -44,18 +65,24 @@ class _SnapshotView(genvmbase.StateProxy):
         self.cached[addr] = res
         return res
 
+    def _get_slot(self, account: Address, slot: bytes) -> bytearray:
+        data = self.slots.get((account, slot))
+        if data is None:
+            snap = self._get_snapshot(account)
+            slot_id = base64.b64encode(slot).decode("ascii")
+            for_slot = snap.encoded_state.get(slot_id)
+            data = bytearray(base64.b64decode(for_slot)) if for_slot else bytearray()
+            self.slots[(account, slot)] = data
+        return data
+
     def get_code(self, addr: Address) -> bytes:
         return base64.b64decode(self._get_snapshot(addr).contract_code)
 
     def storage_read(
         self, account: Address, slot: bytes, index: int, le: int, /
     ) -> bytes:
-        snap = self._get_snapshot(account)
-        slot_id = base64.b64encode(slot).decode("ascii")
-        for_slot = snap.encoded_state.setdefault(slot_id, "")
-        data = bytearray(base64.b64decode(for_slot))
-        data.extend(b"\x00" * (index + le - len(data)))
-        return data[index : index + le]
+        data = self._get_slot(account, bytes(slot))
+        return bytes(data[index : index + le]).ljust(le, b"\x00")
 
     def storage_write(
         self,
@@ -67,14 +94,28 @@ class _SnapshotView(genvmbase.StateProxy):
     ) -> None:
         assert account == self.contract_address
         assert not self.readonly
-        snap = self._get_snapshot(account)
-        slot_id = base64.b64encode(slot).decode("ascii")
-        for_slot = snap.encoded_state.setdefault(slot_id, "")
-        data = bytearray(base64.b64decode(for_slot))
+        slot = bytes(slot)
+        data = self._get_slot(account, slot)
         mem = memoryview(got)
         data.extend(b"\x00" * (index + len(mem) - len(data)))
         data[index : index + len(mem)] = mem
-        snap.encoded_state[slot_id] = base64.b64encode(data).decode("utf-8")
+        self.dirty_slots.add(slot)
+
+    def flush(self) -> dict[str, str]:
+        """
+        Encode the slots written during the execution.
+
+        Returns:
+            dict[str, str]: The encoded slots that were written, i.e. the state diff of the execution.
+        """
+        written = {}
+        for slot in self.dirty_slots:
+            slot_id = base64.b64encode(slot).decode("ascii")
+            written[slot_id] = base64.b64encode(
+                self.slots[(self.contract_address, slot)]
+            ).decode("utf-8")
+        self.dirty_slots.clear()
+        return written
 
 
 class Node:
@@ -86,7 +127,13 @@ class Node:
         contract_snapshot_factory: Callable[[str], ContractSnapshot] | None,
         leader_receipt: Optional[Receipt] = None,
         msg_handler: MessageHandler | None = None,
+        leader_results: genvmbase.LeaderResultsChannel | None = None,
     ):
+        """
+        `leader_results` pipelines the execution of the leader and of the validators: the leader posts its
+        non-deterministic results to it, and validators created without `leader_receipt` read them from it
+        while the leader is still running.
+        """
         self.contract_snapshot = contract_snapshot
         self.validator_mode = validator_mode
         self.validator = validator
@@ -94,6 +141,7 @@ class Node:
         self.leader_receipt = leader_receipt
         self.msg_handler = msg_handler
         self.contract_snapshot_factory = contract_snapshot_factory
+        self.leader_results = leader_results
 
     def _create_genvm(self) -> genvmbase.IGenVM:
         return genvmbase.GenVMHost()
@@ -131,7 +179,8 @@ class Node:
         elif (
             leader_receipt.execution_result == receipt.execution_result
             and leader_receipt.result == receipt.result
-            and leader_receipt.contract_state == receipt.contract_state
+            and leader_receipt.get_contract_state_hash()
+            == receipt.get_contract_state_hash()
             and leader_receipt.pending_transactions == receipt.pending_transactions
         ):
             receipt.vote = Vote.AGREE
@@ -225,6 +274,11 @@ class Node:
         )
 
     async def get_contract_schema(self, code: bytes) -> str:
+        return await contract_schema_cache.get(
+            code, lambda: self._run_get_contract_schema(code)
+        )
+
+    async def _run_get_contract_schema(self, code: bytes) -> str:
         genvm = self._create_genvm()
         res = await genvm.get_contract_schema(code)
         await self._execution_finished(res, None)
@@ -258,9 +312,13 @@ class Node:
         transaction_datetime: datetime.datetime | None,
     ) -> Receipt:
         genvm = self._create_genvm()
-        leader_res: None | dict[int, bytes]
-        if self.leader_receipt is None:
+        leader_res: None | dict[int, bytes] | genvmbase.LeaderResultsChannel
+        post_nondet_results_to = None
+        if self.validator_mode == ExecutionMode.LEADER:
             leader_res = None
+            post_nondet_results_to = self.leader_results
+        elif self.leader_receipt is None:
+            leader_res = self.leader_results
         else:
             leader_res = {
                 k: base64.b64decode(v)
@@ -303,7 +361,9 @@ class Node:
             config=json.dumps(config),
             date=transaction_datetime,
             chain_id=SIMULATOR_CHAIN_ID,
+            post_nondet_results_to=post_nondet_results_to,
         )
+        contract_state = snapshot_view.flush()
         await self._execution_finished(res, transaction_hash)
 
         result_exec_code = (
@@ -312,6 +372,12 @@ class Node:
             else ExecutionResultStatus.ERROR
         )
 
+        if self.leader_receipt is None and isinstance(
+            leader_res, genvmbase.LeaderResultsChannel
+        ):
+            # The vote compares with the leader receipt, wait for the leader to finish
+            self.leader_receipt = await leader_res.get_receipt()
+
         return self._set_vote(
             Receipt(
                 result=genvmbase.encode_result_to_bytes(res.result),
@@ -323,7 +389,8 @@ class Node:
                 pending_transactions=res.pending_transactions,
                 vote=None,
                 execution_result=result_exec_code,
-                contract_state=self.contract_snapshot.encoded_state,
+                contract_state=contract_state,
+                contract_state_hash=get_state_digest(contract_state),
                 calldata=calldata,
                 mode=self.validator_mode,
                 node_config=self.validator.to_dict(),
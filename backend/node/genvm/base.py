@@ -1,6 +1,6 @@
 # backend/node/genvm/base.py
 
-__all__ = ("IGenVM", "GenVMHost")
+__all__ = ("IGenVM", "GenVMHost", "LeaderResultsChannel")
 
 import typing
 import tempfile
@@ -77,6 +77,68 @@ class StateProxy(typing.Protocol):
         /,
     ) -> None: ...
     def get_code(self, addr: Address) -> bytes: ...
+    async def run(self, function: typing.Callable, /, *args) -> typing.Any:
+        """Run an access to the state, e.g. on the database session of the state. Runs directly by default."""
+        return function(*args)
+
+
+class LeaderResultsChannel:
+    """
+    Non-deterministic results of a leader execution, streamed to validators that execute the same
+    transaction at the same time as the leader.
+
+    The leader posts each result as soon as GenVM produces it, and validators wait for the results they need,
+    so their deterministic work overlaps with the leader execution. The leader receipt is published once the
+    leader finishes, validators need it to vote.
+    """
+
+    def __init__(self):
+        self.results: dict[int, bytes] = {}
+        self.waiters: dict[int, asyncio.Future] = {}
+        self.receipt: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def post(self, call_no: int, encoded_result: bytes):
+        self.results[call_no] = encoded_result
+        waiter = self.waiters.pop(call_no, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(encoded_result)
+
+    async def get(self, call_no: int) -> bytes:
+        """Return the result of the leader for `call_no`, waiting for the leader to post it."""
+        if call_no in self.results:
+            return self.results[call_no]
+        if self.receipt.done():
+            raise Exception(f"Leader has no non-deterministic result #{call_no}")
+        waiter = self.waiters.get(call_no)
+        if waiter is None:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters[call_no] = waiter
+        return await asyncio.shield(waiter)
+
+    async def get_receipt(self):
+        """Return the receipt of the leader, waiting for the leader to finish."""
+        return await asyncio.shield(self.receipt)
+
+    def finish(self, receipt):
+        """Publish the leader receipt. Validators still waiting for a result get an error."""
+        self._close(Exception("Leader finished without the non-deterministic result"))
+        if not self.receipt.done():
+            self.receipt.set_result(receipt)
+
+    def fail(self, error: BaseException):
+        """The leader failed: validators waiting for a result or for the receipt get `error`."""
+        self._close(error)
+        if not self.receipt.done():
+            self.receipt.set_exception(error)
+            # Validators may be done already, the error is reported where the leader failed
+            self.receipt.exception()
+
+    def _close(self, error: BaseException):
+        waiters, self.waiters = self.waiters, {}
+        for waiter in waiters.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+                waiter.exception()
 
 
 # GenVM protocol just in case it is needed for mocks or bringing back the old one
@@ -89,10 +151,11 @@ class IGenVM(typing.Protocol):
         contract_address: Address,
         calldata_raw: bytes,
         is_init: bool = False,
-        leader_results: None | dict[int, bytes],
+        leader_results: None | dict[int, bytes] | LeaderResultsChannel,
         config: str,
         date: datetime.datetime | None,
         chain_id: int,
+        post_nondet_results_to: LeaderResultsChannel | None = None,
     ) -> ExecutionResult: ...
 
     async def get_contract_schema(self, contract_code: bytes) -> ExecutionResult: ...
@@ -135,10 +198,11 @@ class GenVMHost(IGenVM):
         contract_address: Address,
         calldata_raw: bytes,
         is_init: bool = False,
-        leader_results: None | dict[int, bytes],
+        leader_results: None | dict[int, bytes] | LeaderResultsChannel,
         config: str,
         date: datetime.datetime | None,
         chain_id: int,
+        post_nondet_results_to: LeaderResultsChannel | None = None,
     ) -> ExecutionResult:
         message = {
             "is_init": is_init,
@@ -159,6 +223,7 @@ class GenVMHost(IGenVM):
                 calldata_bytes=calldata_raw,
                 state_proxy=state,
                 leader_results=leader_results,
+                post_nondet_results_to=post_nondet_results_to,
             ),
             ["--message", json.dumps(message)],
             config,
@@ -198,7 +263,8 @@ class _Host(genvmhost.IHost):
         *,
         calldata_bytes: bytes,
         state_proxy: StateProxy,
-        leader_results: None | dict[int, bytes],
+        leader_results: None | dict[int, bytes] | LeaderResultsChannel,
+        post_nondet_results_to: LeaderResultsChannel | None = None,
     ):
         self._eq_outputs = {}
         self._pending_transactions = []
@@ -209,6 +275,7 @@ class _Host(genvmhost.IHost):
         self._state_proxy = state_proxy
         self.calldata_bytes = calldata_bytes
         self._leader_results = leader_results
+        self._post_nondet_results_to = post_nondet_results_to
 
     def provide_result(self, res: genvmhost.RunHostAndProgramRes) -> ExecutionResult:
         assert self._result is not None
@@ -232,7 +299,7 @@ class _Host(genvmhost.IHost):
         return self.calldata_bytes
 
     async def get_code(self, addr: bytes, /) -> bytes:
-        return self._state_proxy.get_code(Address(addr))
+        return await self._state_proxy.run(self._state_proxy.get_code, Address(addr))
 
     def has_result(self) -> bool:
         return self._result is not None
@@ -241,7 +308,9 @@ class _Host(genvmhost.IHost):
         self, type: StorageType, account: bytes, slot: bytes, index: int, le: int, /
     ) -> bytes:
         assert type != StorageType.LATEST_FINAL
-        return self._state_proxy.storage_read(Address(account), slot, index, le)
+        return await self._state_proxy.run(
+            self._state_proxy.storage_read, Address(account), slot, index, le
+        )
 
     async def storage_write(
         self,
@@ -251,7 +320,9 @@ class _Host(genvmhost.IHost):
         got: collections.abc.Buffer,
         /,
     ) -> None:
-        return self._state_proxy.storage_write(Address(account), slot, index, got)
+        return await self._state_proxy.run(
+            self._state_proxy.storage_write, Address(account), slot, index, got
+        )
 
     async def consume_result(
         self, type: ResultCode, data: collections.abc.Buffer, /
@@ -273,7 +344,11 @@ class _Host(genvmhost.IHost):
         leader_results = self._leader_results
         if leader_results is None:
             return None
-        leader_results_mem = memoryview(leader_results[call_no])
+        if isinstance(leader_results, LeaderResultsChannel):
+            leader_result = await leader_results.get(call_no)
+        else:
+            leader_result = leader_results[call_no]
+        leader_results_mem = memoryview(leader_result)
         return (ResultCode(leader_results_mem[0]), leader_results_mem[1:])
 
     async def post_nondet_result(
@@ -283,6 +358,8 @@ class _Host(genvmhost.IHost):
         encoded_result.append(type.value)
         encoded_result.extend(memoryview(data))
         self._eq_outputs[call_no] = bytes(encoded_result)
+        if self._post_nondet_results_to is not None:
+            self._post_nondet_results_to.post(call_no, self._eq_outputs[call_no])
 
     async def post_message(self, account: bytes, calldata: bytes, _data, /) -> None:
         self._pending_transactions.append(
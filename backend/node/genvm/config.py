@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 
@@ -36,3 +37,24 @@ def get_genvm_path() -> Path:
         _found_at = _find_exe("genvm")
 
     return _found_at
+
+
+_version: str | None = None
+
+
+def get_genvm_version() -> str:
+    """
+    Identifier of the installed GenVM, which changes when the executable or the installation directory
+    is replaced. Results that only depend on the contract code and on GenVM can be cached with it.
+    """
+    global _version
+    if _version is None:
+        exe = get_genvm_path()
+        parts = []
+        for path in [exe, exe.parent.parent]:
+            stat = path.stat()
+            parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+        _version = hashlib.sha256(
+            ":".join([str(exe.resolve())] + parts).encode("utf-8")
+        ).hexdigest()[:16]
+    return _version
@@ -70,29 +70,99 @@ class IHost(metaclass=abc.ABCMeta):
     async def eth_call(self, account: bytes, calldata: bytes, /) -> bytes: ...
 
 
+class _BufferedSocket:
+    """
+    Framing of the host protocol over a non-blocking socket.
+
+    Incoming bytes are received in chunks into a single buffer, and fields are parsed from it by offset,
+    so a request costs a single receive instead of one per field. Outgoing bytes are accumulated and sent
+    at once right before waiting for the next request, as genvm doesn't send anything before getting the
+    whole response.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, async_loop: asyncio.AbstractEventLoop, sock: socket.socket):
+        self.async_loop = async_loop
+        self.sock = sock
+        self.buf = bytearray()
+        self.pos = 0
+        self.out = bytearray()
+        self.chunk = memoryview(bytearray(self.CHUNK_SIZE))
+
+    async def flush(self):
+        if self.out:
+            await self.async_loop.sock_sendall(self.sock, self.out)
+            self.out.clear()
+
+    async def _recv_into(self, buf: memoryview) -> int:
+        await self.flush()
+        read = await self.async_loop.sock_recv_into(self.sock, buf)
+        if read == 0:
+            raise ConnectionResetError()
+        return read
+
+    async def _fill(self, le: int):
+        """Make sure that at least `le` bytes are buffered."""
+        if self.pos > 0:
+            del self.buf[: self.pos]
+            self.pos = 0
+        while len(self.buf) < le:
+            read = await self._recv_into(self.chunk)
+            self.buf += self.chunk[:read]
+
+    async def read_exact(self, le: int) -> bytes:
+        available = len(self.buf) - self.pos
+        if available >= le:
+            res = bytes(self.buf[self.pos : self.pos + le])
+            self.pos += le
+            return res
+        if le - available <= self.CHUNK_SIZE:
+            await self._fill(le)
+            res = bytes(self.buf[:le])
+            self.pos = le
+            return res
+        # Large fields are received in place instead of going through the buffer
+        res = bytearray(le)
+        res[:available] = self.buf[self.pos :]
+        self.buf.clear()
+        self.pos = 0
+        view = memoryview(res)
+        idx = available
+        while idx < le:
+            idx += await self._recv_into(view[idx:])
+        return bytes(res)
+
+    async def recv_int(self, bytes: int = 4) -> int:
+        if len(self.buf) - self.pos < bytes:
+            await self._fill(bytes)
+        res = int.from_bytes(
+            self.buf[self.pos : self.pos + bytes], byteorder="little", signed=False
+        )
+        self.pos += bytes
+        return res
+
+    def send_all(self, data: collections.abc.Buffer):
+        self.out += data
+
+    def send_int(self, i: int, bytes=4):
+        self.out += int.to_bytes(i, bytes, byteorder="little", signed=False)
+
+
 async def host_loop(handler: IHost):
     async_loop = asyncio.get_event_loop()
 
     sock = await handler.loop_enter()
+    conn = _BufferedSocket(async_loop, sock)
 
     async def send_all(data: collections.abc.Buffer):
-        await async_loop.sock_sendall(sock, data)
-
-    async def read_exact(le: int) -> bytes:
-        buf = bytearray([0] * le)
-        idx = 0
-        while idx < le:
-            read = await async_loop.sock_recv_into(sock, memoryview(buf)[idx:le])
-            if read == 0:
-                raise ConnectionResetError()
-            idx += read
-        return bytes(buf)
+        conn.send_all(data)
 
-    async def recv_int(bytes: int = 4) -> int:
-        return int.from_bytes(await read_exact(bytes), byteorder="little", signed=False)
+    read_exact = conn.read_exact
+    recv_int = conn.recv_int
 
     async def send_int(i: int, bytes=4):
-        await send_all(int.to_bytes(i, bytes, byteorder="little", signed=False))
+        conn.send_int(i, bytes)
 
     async def read_result() -> tuple[ResultCode, bytes]:
         type = await recv_int(1)
@@ -132,6 +202,7 @@ async def host_loop(handler: IHost):
             case Methods.CONSUME_RESULT:
                 await handler.consume_result(*await read_result())
                 await send_all(b"\x00")
+                await conn.flush()
                 return
             case Methods.GET_LEADER_NONDET_RESULT:
                 call_no = await recv_int()
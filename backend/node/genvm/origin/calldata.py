@@ -26,157 +26,227 @@ class CalldataEncodable(metaclass=abc.ABCMeta):
     def __to_calldata__(self) -> typing.Any: ...
 
 
+def _identity(x: typing.Any) -> typing.Any:
+    return x
+
+
+def _append_uleb128(mem: bytearray, i: int) -> None:
+    assert i >= 0
+    while i >= 0x80:
+        mem.append((i & 0x7F) | 0x80)
+        i >>= 7
+    mem.append(i)
+
+
+def _encode_none(mem: bytearray, b: None, default) -> None:
+    mem.append(SPECIAL_NULL)
+
+
+def _encode_bool(mem: bytearray, b: bool, default) -> None:
+    mem.append(SPECIAL_TRUE if b else SPECIAL_FALSE)
+
+
+def _encode_int(mem: bytearray, b: int, default) -> None:
+    if b >= 0:
+        _append_uleb128(mem, (b << 3) | TYPE_PINT)
+    else:
+        _append_uleb128(mem, ((-b - 1) << 3) | TYPE_NINT)
+
+
+def _encode_address(mem: bytearray, b: Address, default) -> None:
+    mem.append(SPECIAL_ADDR)
+    mem.extend(b.as_bytes)
+
+
+def _encode_bytes(mem: bytearray, b: bytes, default) -> None:
+    _append_uleb128(mem, (len(b) << 3) | TYPE_BYTES)
+    mem.extend(b)
+
+
+def _encode_str(mem: bytearray, b: str, default) -> None:
+    bts = b.encode("utf-8")
+    _append_uleb128(mem, (len(bts) << 3) | TYPE_STR)
+    mem.extend(bts)
+
+
+def _encode_sequence(mem: bytearray, b: collections.abc.Sequence, default) -> None:
+    _append_uleb128(mem, (len(b) << 3) | TYPE_ARR)
+    for x in b:
+        _encode_value(mem, x, default)
+
+
+def _encode_mapping(mem: bytearray, b: collections.abc.Mapping, default) -> None:
+    keys = sorted(b)
+    _append_uleb128(mem, (len(keys) << 3) | TYPE_MAP)
+    for k in keys:
+        if not isinstance(k, str):
+            raise Exception(f"key is not string {type(k)}")
+        bts = k.encode("utf-8")
+        _append_uleb128(mem, len(bts))
+        mem.extend(bts)
+        _encode_value(mem, b[k], default)
+
+
+# Encoders of the most common types, looked up by exact type. Other types (subclasses, `CalldataEncodable`,
+# dataclasses, ...) go through `_encode_other`
+_ENCODERS: dict[type, typing.Callable[[bytearray, typing.Any, typing.Any], None]] = {
+    type(None): _encode_none,
+    bool: _encode_bool,
+    int: _encode_int,
+    Address: _encode_address,
+    bytes: _encode_bytes,
+    str: _encode_str,
+    list: _encode_sequence,
+    tuple: _encode_sequence,
+    dict: _encode_mapping,
+}
+
+
+def _encode_other(mem: bytearray, b: typing.Any, default) -> None:
+    if isinstance(b, CalldataEncodable):
+        b = b.__to_calldata__()
+        encoder = _ENCODERS.get(type(b))
+        if encoder is not None:
+            encoder(mem, b, default)
+            return
+    if b is None:
+        mem.append(SPECIAL_NULL)
+    elif b is True:
+        mem.append(SPECIAL_TRUE)
+    elif b is False:
+        mem.append(SPECIAL_FALSE)
+    elif isinstance(b, int):
+        _encode_int(mem, b, default)
+    elif isinstance(b, Address):
+        _encode_address(mem, b, default)
+    elif isinstance(b, bytes):
+        _encode_bytes(mem, b, default)
+    elif isinstance(b, str):
+        _encode_str(mem, b, default)
+    elif isinstance(b, collections.abc.Sequence):
+        _encode_sequence(mem, b, default)
+    elif isinstance(b, collections.abc.Mapping):
+        _encode_mapping(mem, b, default)
+    elif dataclasses.is_dataclass(b):
+        assert not isinstance(b, type)
+        _encode_mapping(mem, dataclasses.asdict(b), default)
+    else:
+        raise Exception(f"invalid type {type(b)}")
+
+
+def _encode_value(mem: bytearray, b: typing.Any, default) -> None:
+    if default is not None:
+        b = default(b)
+    encoder = _ENCODERS.get(type(b), _encode_other)
+    encoder(mem, b, default)
+
+
 def encode(
-    x: typing.Any, *, default: typing.Callable[[typing.Any], typing.Any] = lambda x: x
+    x: typing.Any, *, default: typing.Callable[[typing.Any], typing.Any] = _identity
 ) -> bytes:
     mem = bytearray()
+    _encode_value(mem, x, None if default is _identity else default)
+    return bytes(mem)
 
-    def append_uleb128(i):
-        assert i >= 0
-        if i == 0:
-            mem.append(0)
-        while i > 0:
-            cur = i & 0x7F
-            i = i >> 7
-            if i > 0:
-                cur |= 0x80
-            mem.append(cur)
-
-    def impl_dict(b: collections.abc.Mapping):
-        keys = list(b.keys())
-        keys.sort()
-        le = len(keys)
-        le = (le << 3) | TYPE_MAP
-        append_uleb128(le)
-        for k in keys:
-            if not isinstance(k, str):
-                raise Exception(f"key is not string {type(k)}")
-            bts = k.encode("utf-8")
-            append_uleb128(len(bts))
-            mem.extend(bts)
-            impl(b[k])
-
-    def impl(b: typing.Any):
-        b = default(b)
-        if isinstance(b, CalldataEncodable):
-            b = b.__to_calldata__()
-        if b is None:
-            mem.append(SPECIAL_NULL)
-        elif b is True:
-            mem.append(SPECIAL_TRUE)
-        elif b is False:
-            mem.append(SPECIAL_FALSE)
-        elif isinstance(b, int):
-            if b >= 0:
-                b = (b << 3) | TYPE_PINT
-                append_uleb128(b)
-            else:
-                b = -b - 1
-                b = (b << 3) | TYPE_NINT
-                append_uleb128(b)
-        elif isinstance(b, Address):
-            mem.append(SPECIAL_ADDR)
-            mem.extend(b.as_bytes)
-        elif isinstance(b, bytes):
-            lb = len(b)
-            lb = (lb << 3) | TYPE_BYTES
-            append_uleb128(lb)
-            mem.extend(b)
-        elif isinstance(b, str):
-            b = b.encode("utf-8")
-            lb = len(b)
-            lb = (lb << 3) | TYPE_STR
-            append_uleb128(lb)
-            mem.extend(b)
-        elif isinstance(b, collections.abc.Sequence):
-            lb = len(b)
-            lb = (lb << 3) | TYPE_ARR
-            append_uleb128(lb)
-            for x in b:
-                impl(x)
-        elif isinstance(b, collections.abc.Mapping):
-            impl_dict(b)
-        elif dataclasses.is_dataclass(b):
-            assert not isinstance(b, type)
-            impl_dict(dataclasses.asdict(b))
-        else:
-            raise Exception(f"invalid type {type(b)}")
 
-    impl(x)
-    return bytes(mem)
+def _read_uleb128(mem: memoryview, pos: int) -> tuple[int, int]:
+    m = mem[pos]
+    if m < 0x80:
+        return m, pos + 1
+    ret = m & 0x7F
+    off = 7
+    while True:
+        pos += 1
+        m = mem[pos]
+        ret |= (m & 0x7F) << off
+        off += 7
+        if m < 0x80:
+            return ret, pos + 1
+
+
+def _check_end(mem: memoryview, end: int) -> None:
+    if end > len(mem):
+        raise Exception(f"unexpected end of calldata, {end - len(mem)} bytes missing")
+
+
+def _decode_value(mem: memoryview, pos: int) -> tuple[typing.Any, int]:
+    code = mem[pos]
+    if code < 0x80:
+        pos += 1
+    else:
+        code, pos = _read_uleb128(mem, pos)
+    typ = code & 0x7
+    if typ == TYPE_SPECIAL:
+        if code == SPECIAL_NULL:
+            return None, pos
+        if code == SPECIAL_FALSE:
+            return False, pos
+        if code == SPECIAL_TRUE:
+            return True, pos
+        if code == SPECIAL_ADDR:
+            end = pos + Address.SIZE
+            _check_end(mem, end)
+            return Address(mem[pos:end]), end
+        raise Exception(f"Unknown special {bin(code)} {hex(code)}")
+    code = code >> 3
+    if typ == TYPE_PINT:
+        return code, pos
+    elif typ == TYPE_NINT:
+        return -code - 1, pos
+    elif typ == TYPE_BYTES:
+        end = pos + code
+        _check_end(mem, end)
+        return mem[pos:end], end
+    elif typ == TYPE_STR:
+        end = pos + code
+        _check_end(mem, end)
+        return str(mem[pos:end], encoding="utf-8"), end
+    elif typ == TYPE_ARR:
+        ret_arr = [None] * code
+        for i in range(code):
+            ret_arr[i], pos = _decode_value(mem, pos)
+        return ret_arr, pos
+    elif typ == TYPE_MAP:
+        ret_dict: dict[str, typing.Any] = {}
+        prev = None
+        for _i in range(code):
+            le, pos = _read_uleb128(mem, pos)
+            end = pos + le
+            _check_end(mem, end)
+            key = str(mem[pos:end], encoding="utf-8")
+            if prev is not None:
+                assert prev < key
+            prev = key
+            ret_dict[key], pos = _decode_value(mem, end)
+        return ret_dict, pos
+    raise Exception(f"invalid type {typ}")
 
 
 def decode(mem0: collections.abc.Buffer) -> typing.Any:
-    mem: memoryview = memoryview(mem0)
-
-    def read_uleb128() -> int:
-        nonlocal mem
-        ret = 0
-        off = 0
-        while True:
-            m = mem[0]
-            ret = ret | ((m & 0x7F) << off)
-            off += 7
-            mem = mem[1:]
-            if (m & 0x80) == 0:
-                break
-        return ret
-
-    def impl() -> typing.Any:
-        nonlocal mem
-        code = read_uleb128()
-        typ = code & 0x7
-        if typ == TYPE_SPECIAL:
-            if code == SPECIAL_NULL:
-                return None
-            if code == SPECIAL_FALSE:
-                return False
-            if code == SPECIAL_TRUE:
-                return True
-            if code == SPECIAL_ADDR:
-                ret_addr = mem[: Address.SIZE]
-                mem = mem[Address.SIZE :]
-                return Address(ret_addr)
-            raise Exception(f"Unknown special {bin(code)} {hex(code)}")
-        code = code >> 3
-        if typ == TYPE_PINT:
-            return code
-        elif typ == TYPE_NINT:
-            return -code - 1
-        elif typ == TYPE_BYTES:
-            ret_bytes = mem[:code]
-            mem = mem[code:]
-            return ret_bytes
-        elif typ == TYPE_STR:
-            ret_str = mem[:code]
-            mem = mem[code:]
-            return str(ret_str, encoding="utf-8")
-        elif typ == TYPE_ARR:
-            ret_arr = []
-            for _i in range(code):
-                ret_arr.append(impl())
-            return ret_arr
-        elif typ == TYPE_MAP:
-            ret_dict: dict[str, typing.Any] = {}
-            prev = None
-            for _i in range(code):
-                le = read_uleb128()
-                key = str(mem[:le], encoding="utf-8")
-                mem = mem[le:]
-                if prev is not None:
-                    assert prev < key
-                prev = key
-                assert key not in ret_dict
-                ret_dict[key] = impl()
-            return ret_dict
-        raise Exception(f"invalid type {typ}")
-
-    res = impl()
-    if len(mem) != 0:
-        raise Exception(f"unparsed end {bytes(mem[:5])!r}... (decoded {res})")
+    """Decodes calldata. Bytes are returned as `memoryview`s of `mem0`, without copying them."""
+    mem = memoryview(mem0)
+    res, pos = _decode_value(mem, 0)
+    if pos != len(mem):
+        raise Exception(f"unparsed end {bytes(mem[pos:pos + 5])!r}... (decoded {res})")
     return res
 
 
+def decode_iter(mem0: collections.abc.Buffer) -> typing.Iterator[typing.Any]:
+    """
+    Decodes calldata holding an array, yielding its items one by one instead of building the whole list,
+    e.g. to process large arrays as they are decoded.
+    """
+    mem = memoryview(mem0)
+    code, pos = _read_uleb128(mem, 0)
+    if code & 0x7 != TYPE_ARR:
+        raise Exception(f"expected array, got type {code & 0x7}")
+    for _i in range(code >> 3):
+        item, pos = _decode_value(mem, pos)
+        yield item
+    if pos != len(mem):
+        raise Exception(f"unparsed end {bytes(mem[pos:pos + 5])!r}...")
+
+
 def to_str(d: typing.Any) -> str:
     buf: list[str] = []
 
@@ -0,0 +1,117 @@
+# backend/node/schema_cache.py
+
+import asyncio
+import concurrent.futures
+import os
+import tempfile
+import threading
+import typing
+from collections import OrderedDict
+from pathlib import Path
+
+from eth_hash.auto import keccak
+
+from backend.node.genvm.config import get_genvm_version
+
+# Number of schemas kept in memory by `contract_schema_cache`
+CONTRACT_SCHEMA_CACHE_SIZE = 128
+
+
+class ContractSchemaCache:
+    """
+    Cache of contract schemas, shared by every thread.
+
+    The schema of a contract only depends on its code and on GenVM, so schemas are keyed by the keccak of
+    the code and the GenVM version. The most recently used schemas are kept in memory, and all of them can
+    also be kept in `directory` so they survive restarts.
+    Concurrent requests for the same schema are deduplicated: only the first one runs GenVM and the others
+    wait for its result.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CONTRACT_SCHEMA_CACHE_SIZE,
+        directory: Path | None = None,
+        get_version: typing.Callable[[], str] = get_genvm_version,
+    ):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.directory = directory
+        self.get_version = get_version
+        self.schemas: OrderedDict[str, str] = OrderedDict()
+        self.in_flight: dict[str, concurrent.futures.Future] = {}
+
+    def _get_key(self, code: bytes) -> str:
+        return f"{keccak(code).hex()}-{self.get_version()}"
+
+    async def get(
+        self, code: bytes, compute: typing.Callable[[], typing.Awaitable[str]]
+    ) -> str:
+        """Return the schema of `code`, computing it with `compute` if it is not cached."""
+        key = self._get_key(code)
+        with self.lock:
+            schema = self.schemas.get(key)
+            if schema is not None:
+                self.schemas.move_to_end(key)
+                return schema
+            future = self.in_flight.get(key)
+            computing = future is None
+            if computing:
+                future = concurrent.futures.Future()
+                self.in_flight[key] = future
+
+        if not computing:
+            # Requests can come from different threads, each with its own event loop.
+            # A cancelled waiter must not cancel the shared future, the other requests still wait for it
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            schema = self._read_from_disk(key)
+            if schema is None:
+                schema = await compute()
+                self._write_to_disk(key, schema)
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            if not future.done():
+                future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.schemas[key] = schema
+            while len(self.schemas) > self.max_size:
+                self.schemas.popitem(last=False)
+            del self.in_flight[key]
+        if not future.done():
+            future.set_result(schema)
+        return schema
+
+    def _read_from_disk(self, key: str) -> str | None:
+        if self.directory is None:
+            return None
+        try:
+            return self.directory.joinpath(f"{key}.json").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _write_to_disk(self, key: str, schema: str):
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, so other processes never read a partial schema
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(schema)
+            os.replace(tmp_path, self.directory.joinpath(f"{key}.json"))
+        except OSError as e:
+            print(f"Failed to write contract schema to {self.directory}: {e}")
+
+
+contract_schema_cache = ContractSchemaCache(
+    directory=(
+        Path(os.environ["GENVM_SCHEMA_CACHE_DIR"])
+        if os.environ.get("GENVM_SCHEMA_CACHE_DIR")
+        else None
+    )
+)
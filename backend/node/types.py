@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
 import base64
 
 import collections.abc
@@ -160,18 +160,72 @@ class PendingTransaction:
             )
 
 
+def get_state_digest(contract_state: dict[str, str]) -> str:
+    """
+    Digest of an encoded contract state: the keccak of the sorted keccaks of its slots.
+    Equal states have equal digests whatever the order of their slots.
+    """
+    slot_hashes = sorted(
+        keccak(f"{slot_id}:{value}".encode("ascii"))
+        for slot_id, value in contract_state.items()
+    )
+    return "0x" + keccak(b"".join(slot_hashes)).hex()
+
+
 @dataclass
 class Receipt:
     result: bytes
     calldata: bytes
     gas_used: int
     mode: ExecutionMode
-    contract_state: dict[str, dict[str, str]]
+    # Encoded slots written by the execution, see `ContractSnapshot.update_contract_state`.
+    # None when the receipt was loaded with a reference to a state blob, see `get_contract_state`
+    contract_state: dict[str, str] | None
     node_config: dict
     eq_outputs: dict[int, str]
     execution_result: ExecutionResultStatus
     vote: Optional[Vote] = None
     pending_transactions: Iterable[PendingTransaction] = ()
+    # Digest of `contract_state`, see `get_state_digest`
+    contract_state_hash: str | None = None
+    load_state: Callable[[str], dict[str, str]] | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    def get_contract_state(self) -> dict[str, str]:
+        """Return the contract state, loading it from its state blob the first time it is needed."""
+        if self.contract_state is None:
+            if self.contract_state_hash is None:
+                return {}
+            if self.load_state is None:
+                raise Exception(
+                    f"Cannot load state blob {self.contract_state_hash} of receipt"
+                )
+            self.contract_state = self.load_state(self.contract_state_hash)
+        return self.contract_state
+
+    def get_contract_state_hash(self) -> str:
+        """Return the digest of the contract state, which is enough to compare states of receipts."""
+        if self.contract_state_hash is None:
+            self.contract_state_hash = get_state_digest(self.get_contract_state())
+        return self.contract_state_hash
+
+    def get_digest(self) -> str:
+        """Digest of what validators compare against: the result, the contract state and the equivalence outputs."""
+        eq_outputs = sorted((int(k), v) for k, v in self.eq_outputs.items())
+        return (
+            "0x"
+            + keccak(
+                b"".join(
+                    [
+                        self.execution_result.value.encode("ascii"),
+                        keccak(self.result),
+                        self.get_contract_state_hash().encode("ascii"),
+                        repr(eq_outputs).encode("utf-8"),
+                    ]
+                )
+            ).hex()
+        )
 
     def to_dict(self):
         return {
@@ -181,7 +235,12 @@ class Receipt:
             "calldata": str(base64.b64encode(self.calldata), encoding="ascii"),
             "gas_used": self.gas_used,
             "mode": self.mode.value,
-            "contract_state": self.contract_state,
+            **(
+                {"contract_state": self.contract_state}
+                if self.contract_state is not None
+                else {}
+            ),
+            "contract_state_hash": self.get_contract_state_hash(),
             "node_config": self.node_config,
             "eq_outputs": self.eq_outputs,
             "pending_transactions": [
@@ -191,7 +250,14 @@ class Receipt:
         }
 
     @classmethod
-    def from_dict(cls, input: dict) -> Optional["Receipt"]:
+    def from_dict(
+        cls, input: dict, load_state: Callable[[str], dict[str, str]] | None = None
+    ) -> Optional["Receipt"]:
+        """
+        `input` can reference its contract state by hash instead of embedding it, see
+        `TransactionsProcessor.set_transaction_result`. The state is then only loaded with `load_state`
+        when `get_contract_state` is called.
+        """
         if input:
             return cls(
                 vote=Vote.from_string(input.get("vote")),
@@ -203,6 +269,8 @@ class Receipt:
                 gas_used=input.get("gas_used"),
                 mode=ExecutionMode.from_string(input.get("mode")),
                 contract_state=input.get("contract_state"),
+                contract_state_hash=input.get("contract_state_hash"),
+                load_state=load_state,
                 node_config=input.get("node_config"),
                 eq_outputs={int(k): v for k, v in input.get("eq_outputs", {}).items()},
                 pending_transactions=[
@@ -0,0 +1,64 @@
+# rpc/call_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class CallResultsCache:
+    """
+    LRU cache of the results of read-only calls (`eth_call`), shared by every thread.
+
+    Results are cached per contract address, calldata and sender, together with the version of the contract
+    they were computed with (see `ContractSnapshot.version`). A result is only returned for the same version,
+    and it is replaced by the next result computed with a newer one.
+
+    Callers must not cache executions that ran non-deterministic blocks or read other contracts. Views that
+    depend on the current time would return stale results, which is why the cache is opt-in.
+    """
+
+    def __init__(self, max_size: int):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.results: OrderedDict[tuple[str, bytes, str | None], tuple[int, str]] = (
+            OrderedDict()
+        )
+
+    def get(
+        self,
+        contract_address: str,
+        version: int,
+        calldata: bytes,
+        from_address: str | None,
+    ) -> str | None:
+        key = (contract_address.lower(), calldata, from_address)
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                # The contract changed since the result was computed
+                del self.results[key]
+                return None
+            self.results.move_to_end(key)
+            return entry[1]
+
+    def put(
+        self,
+        contract_address: str,
+        version: int,
+        calldata: bytes,
+        from_address: str | None,
+        result: str,
+    ):
+        if self.max_size <= 0:
+            return
+        key = (contract_address.lower(), calldata, from_address)
+        with self.lock:
+            self.results[key] = (version, result)
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+
+call_results_cache = CallResultsCache(int(os.environ.get("ETH_CALL_CACHE_SIZE", "0")))
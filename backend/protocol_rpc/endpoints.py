@@ -31,6 +31,7 @@ from backend.node.create_nodes.create_nodes import (
     random_validator_config,
 )
 
+from backend.protocol_rpc.call_cache import call_results_cache
 from backend.protocol_rpc.endpoint_generator import generate_rpc_endpoint
 from backend.protocol_rpc.transactions_parser import (
     decode_signed_transaction,
@@ -42,6 +43,7 @@ from backend.errors.errors import InvalidAddressError, InvalidTransactionError
 
 from backend.database_handler.transactions_processor import (
     TransactionAddressFilter,
+    TransactionView,
     TransactionsProcessor,
 )
 from backend.node.base import Node
@@ -374,9 +376,13 @@ def get_transaction_count(
 
 
 def get_transaction_by_hash(
-    transactions_processor: TransactionsProcessor, transaction_hash: str
+    transactions_processor: TransactionsProcessor,
+    transaction_hash: str,
+    view: str = TransactionView.FULL.value,
 ) -> dict | None:
-    return transactions_processor.get_transaction_by_hash(transaction_hash)
+    return transactions_processor.get_transaction_by_hash(
+        transaction_hash, TransactionView(view)
+    )
 
 
 async def call(
@@ -398,9 +404,23 @@ async def call(
 
     decoded_data = decode_method_call_data(data)
 
+    contract_snapshot = ContractSnapshot(to_address, session)
+    cached_result = call_results_cache.get(
+        to_address, contract_snapshot.version, decoded_data.calldata, from_address
+    )
+    if cached_result is not None:
+        return cached_result
+
+    # Results that depend on other contracts are not cached
+    other_contracts_read = []
+
+    def contract_snapshot_factory(contract_address: str) -> ContractSnapshot:
+        other_contracts_read.append(contract_address)
+        return ContractSnapshot(contract_address, session)
+
     node = Node(  # Mock node just to get the data from the GenVM
-        contract_snapshot=ContractSnapshot(to_address, session),
-        contract_snapshot_factory=partial(ContractSnapshot, session=session),
+        contract_snapshot=contract_snapshot,
+        contract_snapshot_factory=contract_snapshot_factory,
         validator_mode=ExecutionMode.LEADER,
         validator=Validator(
             address="",
@@ -425,7 +445,17 @@ async def call(
         raise JSONRPCError(
             message="running contract failed", data={"receipt": receipt.to_dict()}
         )
-    return base64.b64encode(receipt.result[1:]).decode("ascii")
+    result = base64.b64encode(receipt.result[1:]).decode("ascii")
+    # Executions with non-deterministic blocks have equivalence outputs
+    if not receipt.eq_outputs and not other_contracts_read:
+        call_results_cache.put(
+            to_address,
+            contract_snapshot.version,
+            decoded_data.calldata,
+            from_address,
+            result,
+        )
+    return result
 
 
 def send_raw_transaction(
@@ -512,12 +542,19 @@ def get_transactions_for_address(
     accounts_manager: AccountsManager,
     address: str,
     filter: str = TransactionAddressFilter.ALL.value,
+    limit: int | None = None,
+    cursor: str | None = None,
+    view: str = TransactionView.FULL.value,
 ) -> list[dict]:
     if not accounts_manager.is_valid_address(address):
         raise InvalidAddressError(address)
 
     return transactions_processor.get_transactions_for_address(
-        address, TransactionAddressFilter(filter)
+        address,
+        TransactionAddressFilter(filter),
+        limit,
+        cursor,
+        TransactionView(view),
     )
 
 
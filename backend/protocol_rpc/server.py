@@ -21,6 +21,7 @@ from dotenv import load_dotenv
 from backend.database_handler.transactions_processor import TransactionsProcessor
 from backend.database_handler.validators_registry import ValidatorsRegistry
 from backend.database_handler.accounts_manager import AccountsManager
+from backend.database_handler.async_repository import create_async_session_factory
 from backend.consensus.base import ConsensusAlgorithm
 from backend.database_handler.models import Base
 from backend.rollup.consensus_service import ConsensusService
@@ -72,7 +73,10 @@ def create_app():
     initialize_validators_db_session.commit()
 
     consensus = ConsensusAlgorithm(
-        lambda: Session(engine, expire_on_commit=False), msg_handler
+        lambda: Session(engine, expire_on_commit=False),
+        msg_handler,
+        # The Flask endpoints keep the synchronous sessions
+        create_async_session_factory(db_uri, pool_size=50, max_overflow=50),
     )
     return (
         app,
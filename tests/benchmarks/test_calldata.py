@@ -0,0 +1,52 @@
+# Throughput of the calldata codec, run with `pytest tests/benchmarks/test_calldata.py`
+import pytest
+
+import backend.node.genvm.origin.calldata as calldata
+from backend.node.types import Address
+
+PAYLOADS = {
+    "method_call": {
+        "method": "transfer",
+        "args": [Address(b"\x01" * 20), 1_000_000, "memo"],
+    },
+    "schema": {
+        "ctor": {"params": [["owner", "address"]], "kwparams": {}},
+        "methods": {
+            f"method_{i}": {
+                "params": [["key", "string"], ["value", "int"]],
+                "kwparams": {},
+                "readonly": i % 2 == 0,
+                "ret": "null",
+            }
+            for i in range(200)
+        },
+    },
+    "int_array": list(range(-50_000, 50_000)),
+    "str_array": [f"item number {i}" for i in range(20_000)],
+    "large_bytes": b"\xab" * 1_000_000,
+}
+
+
+def _report_throughput(benchmark, size: int):
+    benchmark.extra_info["MB/s"] = round(size / benchmark.stats.stats.mean / 1e6, 2)
+
+
+@pytest.mark.parametrize("name", PAYLOADS.keys())
+def test_encode(benchmark, name: str):
+    payload = PAYLOADS[name]
+    encoded = benchmark(calldata.encode, payload)
+    _report_throughput(benchmark, len(encoded))
+
+
+@pytest.mark.parametrize("name", PAYLOADS.keys())
+def test_decode(benchmark, name: str):
+    encoded = calldata.encode(PAYLOADS[name])
+    benchmark(calldata.decode, encoded)
+    _report_throughput(benchmark, len(encoded))
+
+
+@pytest.mark.parametrize("name", ["int_array", "str_array"])
+def test_decode_iter(benchmark, name: str):
+    encoded = calldata.encode(PAYLOADS[name])
+    benchmark(lambda: sum(1 for _ in calldata.decode_iter(encoded)))
+    _report_throughput(benchmark, len(encoded))
@@ -0,0 +1,35 @@
+# Micro-benchmark of the GenVM host protocol, run with `pytest tests/benchmarks -s`
+import asyncio
+import time
+
+import pytest
+
+from backend.node.genvm.origin.base_host import host_loop
+from tests.common.genvm_host import GenVMClient, StorageHost, socket_pair
+
+CALLS = 20_000
+
+
+@pytest.mark.asyncio
+async def test_host_loop_storage_calls_per_second():
+    host_sock, genvm_sock = socket_pair()
+    host_task = asyncio.create_task(host_loop(StorageHost(host_sock)))
+    client = GenVMClient(genvm_sock)
+
+    account = b"\x01" * 20
+    await client.storage_write(account, b"slot", 0, b"\x00" * 32)
+
+    start = time.perf_counter()
+    for i in range(CALLS // 2):
+        await client.storage_write(account, b"slot", 0, i.to_bytes(32, "little"))
+        assert await client.storage_read(account, b"slot", 0, 32) == i.to_bytes(
+            32, "little"
+        )
+    elapsed = time.perf_counter() - start
+
+    await client.consume_result(b"")
+    await asyncio.wait_for(host_task, 5)
+    host_sock.close()
+    genvm_sock.close()
+
+    print(f"\nhost_loop: {CALLS / elapsed:,.0f} storage calls/s")
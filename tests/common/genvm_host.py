@@ -0,0 +1,97 @@
+# tests/common/genvm_host.py
+import asyncio
+import socket
+
+from backend.node.genvm.origin.base_host import (
+    ACCOUNT_ADDR_SIZE,
+    GENERIC_ADDR_SIZE,
+    IHost,
+    Methods,
+    ResultCode,
+    StorageType,
+)
+
+
+class StorageHost(IHost):
+    """Host keeping the storage of contracts in memory"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.storage: dict[tuple[bytes, bytes], bytearray] = {}
+        self.result = None
+
+    async def loop_enter(self) -> socket.socket:
+        return self.sock
+
+    async def storage_read(
+        self, mode: StorageType, account: bytes, slot: bytes, index: int, le: int, /
+    ) -> bytes:
+        data = self.storage.get((account, slot), bytearray())
+        return bytes(data[index : index + le].ljust(le, b"\x00"))
+
+    async def storage_write(self, account: bytes, slot: bytes, index: int, got, /):
+        data = self.storage.setdefault((account, slot), bytearray())
+        data[index : index + len(got)] = got
+
+    async def consume_result(self, type: ResultCode, data, /) -> None:
+        self.result = (type, bytes(data))
+
+    def has_result(self) -> bool:
+        return self.result is not None
+
+
+class GenVMClient:
+    """Client side of the host protocol, as genvm speaks it"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.loop = asyncio.get_running_loop()
+
+    async def _recv_exact(self, le: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < le:
+            read = await self.loop.sock_recv(self.sock, le - len(buf))
+            if not read:
+                raise ConnectionResetError()
+            buf += read
+        return bytes(buf)
+
+    async def storage_write(self, account: bytes, slot: bytes, index: int, data: bytes):
+        await self.loop.sock_sendall(
+            self.sock,
+            bytes([Methods.STORAGE_WRITE])
+            + account.ljust(ACCOUNT_ADDR_SIZE, b"\x00")
+            + slot.ljust(GENERIC_ADDR_SIZE, b"\x00")
+            + index.to_bytes(4, "little")
+            + len(data).to_bytes(4, "little")
+            + data,
+        )
+
+    async def storage_read(
+        self, account: bytes, slot: bytes, index: int, le: int
+    ) -> bytes:
+        await self.loop.sock_sendall(
+            self.sock,
+            bytes([Methods.STORAGE_READ, StorageType.DEFAULT])
+            + account.ljust(ACCOUNT_ADDR_SIZE, b"\x00")
+            + slot.ljust(GENERIC_ADDR_SIZE, b"\x00")
+            + index.to_bytes(4, "little")
+            + le.to_bytes(4, "little"),
+        )
+        return await self._recv_exact(le)
+
+    async def consume_result(self, data: bytes):
+        await self.loop.sock_sendall(
+            self.sock,
+            bytes([Methods.CONSUME_RESULT, ResultCode.RETURN])
+            + len(data).to_bytes(4, "little")
+            + data,
+        )
+        assert await self._recv_exact(1) == b"\x00"
+
+
+def socket_pair() -> tuple[socket.socket, socket.socket]:
+    host_sock, genvm_sock = socket.socketpair()
+    host_sock.setblocking(False)
+    genvm_sock.setblocking(False)
+    return host_sock, genvm_sock
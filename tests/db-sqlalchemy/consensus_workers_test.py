@@ -0,0 +1,70 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from backend.database_handler.consensus_workers import (
+    ConsensusWorkersRegistry,
+    get_shard_owner,
+)
+
+
+def test_get_shard_owner():
+    workers = ["worker-a", "worker-b", "worker-c"]
+    owners = {get_shard_owner(f"0x{i:040x}", workers) for i in range(100)}
+
+    assert owners == set(workers)
+    assert get_shard_owner("0xABC", workers) == get_shard_owner("0xabc", workers)
+
+
+def test_contract_leases(session: Session):
+    registry = ConsensusWorkersRegistry(session)
+    registry.heartbeat("worker-a")
+    registry.heartbeat("worker-b")
+    session.commit()
+
+    assert registry.get_live_workers(60) == ["worker-a", "worker-b"]
+
+    assert registry.acquire_leases("worker-a", ["0x1", "0x2"], 60) == ["0x1", "0x2"]
+    session.commit()
+
+    # Leases of a live worker can't be taken over
+    assert registry.acquire_leases("worker-b", ["0x2", "0x3"], 60) == ["0x3"]
+    session.commit()
+
+    # Released leases can be taken
+    registry.release_lease("worker-a", "0x2")
+    session.commit()
+    assert registry.acquire_leases("worker-b", ["0x2"], 60) == ["0x2", "0x3"]
+    session.commit()
+
+    # Expired leases are taken over
+    time.sleep(1)
+    registry.heartbeat("worker-b")
+    session.commit()
+    assert registry.get_live_workers(1) == ["worker-b"]
+    assert sorted(registry.acquire_leases("worker-b", ["0x1"], 1)) == [
+        "0x1",
+        "0x2",
+        "0x3",
+    ]
+    assert registry.get_leased_addresses("worker-a") == []
+    session.commit()
+
+    registry.remove_dead_workers(1)
+    session.commit()
+    assert registry.get_live_workers(60) == ["worker-b"]
+
+
+def test_renew_leases(session: Session):
+    registry = ConsensusWorkersRegistry(session)
+    registry.heartbeat("worker-a")
+    assert registry.acquire_leases("worker-a-appeal", ["0x1"], 60) == ["0x1"]
+    session.commit()
+
+    # Leases held on behalf of a worker are renewed without registering a worker
+    time.sleep(1)
+    registry.renew_leases("worker-a-appeal")
+    session.commit()
+    assert registry.get_live_workers(60) == ["worker-a"]
+    assert registry.acquire_leases("worker-b", ["0x1"], 1) == []
+    session.commit()
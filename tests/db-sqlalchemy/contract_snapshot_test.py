@@ -1,44 +1,69 @@
+import base64
+import datetime
+
 from sqlalchemy.orm import Session
 
-from backend.database_handler.contract_snapshot import ContractSnapshot
-from backend.database_handler.models import CurrentState
+from backend.database_handler.contract_snapshot import (
+    SUPERSEDED_SLOTS_RETENTION,
+    ContractSnapshot,
+)
+from backend.database_handler.models import ContractStorage, CurrentState
+
+
+def _encode(value: bytes) -> str:
+    return base64.b64encode(value).decode("ascii")
 
 
 def test_contract_snapshot_with_contract(session: Session):
     # Pre-load contract
     contract_address = "0x123456"
     contract_code = "code"
-    contract_state = "state"
-    contract = CurrentState(
-        id=contract_address, data={"code": contract_code, "state": contract_state}
-    )
+    contract = CurrentState(id=contract_address, data={"code": contract_code})
 
     session.add(contract)
     session.commit()
+    session.add(ContractStorage(address=contract_address, slot=b"a", value=b"1"))
+    session.add(ContractStorage(address=contract_address, slot=b"b", value=b"2"))
+    session.commit()
 
     # Test ContractSnapshot
     contract_snapshot = ContractSnapshot(contract_address, session)
 
     assert contract_snapshot.contract_address == contract_address
     assert contract_snapshot.contract_data["code"] == contract_code
-    assert contract_snapshot.contract_data["state"] == contract_state
+    # Slots are loaded when read
+    assert dict(contract_snapshot.encoded_state) == {}
+    assert contract_snapshot.encoded_state.get(_encode(b"a")) == _encode(b"1")
+    assert contract_snapshot.encoded_state.get(_encode(b"c")) is None
+    assert dict(contract_snapshot.encoded_state) == {_encode(b"a"): _encode(b"1")}
 
-    new_state = {}
+    new_state = {_encode(b"b"): _encode(b"3"), _encode(b"c"): _encode(b"4")}
     contract_snapshot.update_contract_state(new_state)
 
     actual_contract = session.query(CurrentState).filter_by(id=contract_address).one()
+    assert actual_contract.data == {"code": contract_code}
 
-    assert actual_contract.data["state"] == new_state
-    assert actual_contract.data["code"] == contract_code
+    actual_storage = (
+        session.query(ContractStorage)
+        .filter_by(address=contract_address)
+        .order_by(ContractStorage.slot, ContractStorage.version)
+        .all()
+    )
+    # The replaced value is kept for the snapshots of the previous version
+    assert [
+        (slot.slot, slot.value, slot.version, slot.superseded_at is not None)
+        for slot in actual_storage
+    ] == [
+        (b"a", b"1", 0, False),
+        (b"b", b"2", 0, True),
+        (b"b", b"3", 1, False),
+        (b"c", b"4", 1, False),
+    ]
 
 
 def test_contract_snapshot_without_contract(session: Session):
     contract_address = "0x123456"
-    contract_code = "code"
-    contract_state = "state"
-    contract = CurrentState(
-        id=contract_address, data={"code": contract_code, "state": contract_state}
-    )
+    contract = CurrentState(id=contract_address, data={})
     session.add(contract)
 
     contract_snapshot = ContractSnapshot(None, session)
@@ -49,12 +74,99 @@ def test_contract_snapshot_without_contract(session: Session):
 
     updated_data = {
         "code": "new_code",
-        "state": "new_state",
+        "state": {_encode(b"a"): _encode(b"1")},
     }
     updated_contract = {"id": contract_address, "data": updated_data}
     contract_snapshot.register_contract(updated_contract)
 
     actual_contract = session.query(CurrentState).filter_by(id=contract.id).one()
 
-    assert actual_contract.data == updated_data
+    assert actual_contract.data == {"code": "new_code"}
     assert actual_contract.id == contract_address
+
+    loaded_snapshot = ContractSnapshot(contract_address, session)
+    assert loaded_snapshot.encoded_state.get(_encode(b"a")) == _encode(b"1")
+
+
+def test_contract_snapshot_cache(session: Session):
+    contract_address = "0x654321"
+    session.add(CurrentState(id=contract_address, data={"code": "code"}))
+    session.commit()
+    session.add(ContractStorage(address=contract_address, slot=b"a", value=b"1"))
+    session.commit()
+
+    first_snapshot = ContractSnapshot(contract_address, session)
+    assert first_snapshot.encoded_state.get(_encode(b"a")) == _encode(b"1")
+
+    # The contract didn't change, so the second snapshot reuses the data and the slots of the first one
+    second_snapshot = ContractSnapshot(contract_address, session)
+    assert second_snapshot.contract_data is first_snapshot.contract_data
+    assert (
+        second_snapshot.encoded_state.loaded_slots
+        is first_snapshot.encoded_state.loaded_slots
+    )
+
+    second_snapshot.update_contract_state({_encode(b"a"): _encode(b"2")})
+
+    third_snapshot = ContractSnapshot(contract_address, session)
+    assert third_snapshot.contract_data is not first_snapshot.contract_data
+    assert third_snapshot.encoded_state.get(_encode(b"a")) == _encode(b"2")
+
+
+def test_contract_snapshot_reads_a_single_version(session: Session):
+    contract_address = "0x654321"
+    session.add(CurrentState(id=contract_address, data={"code": "code"}))
+    session.commit()
+    session.add(ContractStorage(address=contract_address, slot=b"a", value=b"1"))
+    session.add(ContractStorage(address=contract_address, slot=b"b", value=b"1"))
+    session.commit()
+
+    snapshot = ContractSnapshot(contract_address, session)
+    assert snapshot.encoded_state.get(_encode(b"a")) == _encode(b"1")
+
+    # E.g. another worker accepts a transaction of the contract while it is being executed
+    ContractSnapshot(contract_address, session).update_contract_state(
+        {_encode(b"a"): _encode(b"2"), _encode(b"b"): _encode(b"2")}
+    )
+
+    # Slots are still read as of the version of the snapshot, including the ones not read yet
+    assert snapshot.encoded_state.get(_encode(b"a")) == _encode(b"1")
+    assert snapshot.encoded_state.get(_encode(b"b")) == _encode(b"1")
+    assert snapshot.encoded_state.get(_encode(b"c")) is None
+
+    new_snapshot = ContractSnapshot(contract_address, session)
+    assert new_snapshot.version == snapshot.version + 1
+    assert new_snapshot.encoded_state.get(_encode(b"b")) == _encode(b"2")
+
+
+def test_contract_snapshot_drops_expired_superseded_slots(session: Session):
+    contract_address = "0x654321"
+    session.add(
+        CurrentState(id=contract_address, data={"code": "code"}, state_version=1)
+    )
+    session.commit()
+    session.add(
+        ContractStorage(
+            address=contract_address,
+            slot=b"a",
+            value=b"0",
+            superseded_at=datetime.datetime.now(datetime.timezone.utc)
+            - SUPERSEDED_SLOTS_RETENTION * 2,
+        )
+    )
+    session.add(
+        ContractStorage(address=contract_address, slot=b"a", value=b"1", version=1)
+    )
+    session.commit()
+
+    ContractSnapshot(contract_address, session).update_contract_state(
+        {_encode(b"a"): _encode(b"2")}
+    )
+
+    actual_storage = (
+        session.query(ContractStorage)
+        .filter_by(address=contract_address)
+        .order_by(ContractStorage.version)
+        .all()
+    )
+    assert [slot.value for slot in actual_storage] == [b"1", b"2"]
@@ -1,9 +1,17 @@
 import math
+import pytest
 from datetime import datetime
 
+from sqlalchemy import Engine, event
+
+from backend.database_handler.chain_snapshot import ChainSnapshot
+from backend.database_handler.models import StateBlobs, Transactions
+from backend.database_handler.notifications import PENDING_TRANSACTIONS_CHANNEL
 from backend.database_handler.transactions_processor import (
+    TransactionAddressFilter,
     TransactionsProcessor,
     TransactionStatus,
+    TransactionView,
 )
 
 
@@ -98,3 +106,388 @@ def test_transactions_processor(transactions_processor: TransactionsProcessor):
     assert math.isclose(actual_transaction["value"], value)
     assert actual_transaction["type"] == transaction_type
     assert actual_transaction["created_at"] == created_at
+
+
+def test_claim_pending_transactions(transactions_processor: TransactionsProcessor):
+    from_address = "0x9F0e84243496AcFB3Cd99D02eA59673c05901501"
+    to_address = "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794"
+
+    transaction_hashes = [
+        transactions_processor.insert_transaction(
+            from_address, to_address, {"key": "value"}, 0, 1, nonce, False
+        )
+        for nonce in range(2)
+    ]
+    transactions_processor.session.commit()
+
+    claimed = transactions_processor.claim_pending_transactions("worker_a", 600)
+    assert [transaction["hash"] for transaction in claimed] == transaction_hashes
+
+    # Claimed transactions are not handed out twice
+    assert transactions_processor.claim_pending_transactions("worker_b", 600) == []
+
+    transactions_processor.release_transaction(
+        transaction_hashes[0], TransactionStatus.PENDING
+    )
+    transactions_processor.session.commit()
+
+    claimed = transactions_processor.claim_pending_transactions("worker_b", 600)
+    assert [transaction["hash"] for transaction in claimed] == [transaction_hashes[0]]
+
+    # Abandoned claims can be taken over once their lease expires
+    claimed = transactions_processor.claim_pending_transactions("worker_c", -1)
+    assert [transaction["hash"] for transaction in claimed] == transaction_hashes
+
+
+def test_release_transaction_notifies_pending(
+    transactions_processor: TransactionsProcessor, engine: Engine
+):
+    transaction_hashes = [
+        transactions_processor.insert_transaction(
+            "0x9F0e84243496AcFB3Cd99D02eA59673c05901501",
+            "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794",
+            {"key": "value"},
+            0,
+            1,
+            nonce,
+            False,
+        )
+        for nonce in range(3)
+    ]
+    transactions_processor.session.commit()
+    transactions_processor.claim_pending_transactions("worker_a", 600)
+    # The second transaction was ACCEPTED, and a successful appeal sent it back to PENDING
+    transactions_processor.update_transaction_status(
+        transaction_hashes[2], TransactionStatus.ACCEPTED
+    )
+    previous_statuses = [
+        TransactionStatus.PENDING,
+        TransactionStatus.ACCEPTED,
+        TransactionStatus.ACCEPTED,
+    ]
+
+    listener = engine.raw_connection()
+    try:
+        driver_connection = listener.driver_connection
+        driver_connection.autocommit = True
+        with driver_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{PENDING_TRANSACTIONS_CHANNEL}"')
+
+        for transaction_hash, previous_status in zip(
+            transaction_hashes, previous_statuses
+        ):
+            transactions_processor.release_transaction(
+                transaction_hash, previous_status
+            )
+        transactions_processor.session.commit()
+
+        # Only the transaction sent back to PENDING wakes up the consensus intake,
+        # the one that stayed PENDING waits for the next scan
+        driver_connection.poll()
+        assert [
+            notification.payload for notification in driver_connection.notifies
+        ] == [transaction_hashes[1]]
+    finally:
+        listener.close()
+
+
+def test_write_behind(transactions_processor: TransactionsProcessor):
+    transaction_hash = transactions_processor.insert_transaction(
+        "0x9F0e84243496AcFB3Cd99D02eA59673c05901501",
+        "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794",
+        {"key": "value"},
+        0,
+        1,
+        0,
+        False,
+    )
+    transactions_processor.session.commit()
+
+    def get_stored_status():
+        return (
+            transactions_processor.session.query(Transactions.status)
+            .filter_by(hash=transaction_hash)
+            .scalar()
+        )
+
+    with transactions_processor.write_behind():
+        transactions_processor.update_transaction_status(
+            transaction_hash, TransactionStatus.PROPOSING
+        )
+        transactions_processor.set_transaction_result(transaction_hash, {"step": 1})
+        transactions_processor.set_transaction_result(transaction_hash, {"step": 2})
+
+        # Intermediate statuses and results are buffered
+        assert get_stored_status() == TransactionStatus.PENDING
+
+        transactions_processor.update_transaction_status(
+            transaction_hash, TransactionStatus.ACCEPTED
+        )
+
+        # Durable statuses are written with the buffered results
+        assert get_stored_status() == TransactionStatus.ACCEPTED
+
+        transactions_processor.update_transaction_status(
+            transaction_hash, TransactionStatus.PROPOSING
+        )
+        assert (
+            transactions_processor.get_transaction_by_hash(transaction_hash)["status"]
+            == TransactionStatus.PROPOSING.value
+        )
+        transactions_processor.set_transaction_result(transaction_hash, {"step": 3})
+
+    transaction = transactions_processor.get_transaction_by_hash(transaction_hash)
+    assert transaction["consensus_data"] == {"step": 3}
+
+
+def test_write_behind_discards_writes_on_error(
+    transactions_processor: TransactionsProcessor,
+):
+    transaction_hashes = [
+        transactions_processor.insert_transaction(
+            "0x9F0e84243496AcFB3Cd99D02eA59673c05901501",
+            "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794",
+            {"key": "value"},
+            0,
+            1,
+            nonce,
+            False,
+        )
+        for nonce in range(3)
+    ]
+    # The third transaction is appealed after it was accepted
+    transactions_processor.update_transaction_status(
+        transaction_hashes[2], TransactionStatus.ACCEPTED
+    )
+    transactions_processor.session.commit()
+
+    def get_stored_transaction(transaction_hash: str):
+        return (
+            transactions_processor.session.query(
+                Transactions.status, Transactions.consensus_data
+            )
+            .filter_by(hash=transaction_hash)
+            .one()
+        )
+
+    with pytest.raises(Exception, match="consensus failed"):
+        with transactions_processor.write_behind():
+            transactions_processor.update_transaction_status(
+                transaction_hashes[0], TransactionStatus.PROPOSING
+            )
+            transactions_processor.set_transaction_result(
+                transaction_hashes[0], {"step": 1}
+            )
+            # Flushes the intermediate status of the first transaction
+            transactions_processor.get_transaction_by_hash(transaction_hashes[0])
+
+            transactions_processor.update_transaction_status(
+                transaction_hashes[0], TransactionStatus.COMMITTING
+            )
+            transactions_processor.set_transaction_result(
+                transaction_hashes[0], {"step": 2}
+            )
+            transactions_processor.update_transaction_status(
+                transaction_hashes[1], TransactionStatus.PROPOSING
+            )
+            transactions_processor.set_transaction_result(
+                transaction_hashes[1], {"step": 1}
+            )
+            transactions_processor.update_transaction_status(
+                transaction_hashes[2], TransactionStatus.COMMITTING
+            )
+            # Flushes the intermediate status of the appealed transaction
+            transactions_processor.get_transaction_by_hash(transaction_hashes[2])
+            raise Exception("consensus failed")
+
+    # The transactions are not stranded in an intermediate status, and the buffered writes are discarded
+    assert get_stored_transaction(transaction_hashes[0]) == (
+        TransactionStatus.PENDING,
+        {"step": 1},
+    )
+    assert get_stored_transaction(transaction_hashes[1]) == (
+        TransactionStatus.PENDING,
+        None,
+    )
+    # The appealed transaction goes back to ACCEPTED instead of being executed again
+    assert get_stored_transaction(transaction_hashes[2]) == (
+        TransactionStatus.ACCEPTED,
+        None,
+    )
+    assert transactions_processor.write_buffer == {}
+
+
+def test_state_blobs(transactions_processor: TransactionsProcessor):
+    transaction_hash = transactions_processor.insert_transaction(
+        "0x9F0e84243496AcFB3Cd99D02eA59673c05901501",
+        "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794",
+        {"key": "value"},
+        0,
+        1,
+        0,
+        False,
+    )
+    contract_state = {"c2xvdA==": "dmFsdWU="}
+    receipt = {"vote": "agree", "contract_state": contract_state}
+    transactions_processor.set_transaction_result(
+        transaction_hash,
+        {"votes": {}, "leader_receipt": receipt, "validators": [receipt, receipt]},
+    )
+
+    consensus_data = transactions_processor.get_transaction_by_hash(transaction_hash)[
+        "consensus_data"
+    ]
+    # The state is stored once, and the receipts reference it by hash
+    state_hash = consensus_data["leader_receipt"]["contract_state_hash"]
+    assert "contract_state" not in consensus_data["leader_receipt"]
+    assert [
+        validator["contract_state_hash"] for validator in consensus_data["validators"]
+    ] == [state_hash, state_hash]
+    assert transactions_processor.session.query(StateBlobs).count() == 1
+    assert transactions_processor.get_state_blob(state_hash) == contract_state
+
+    # The same state is not stored twice
+    transactions_processor.set_transaction_result(
+        transaction_hash,
+        {"votes": {}, "leader_receipt": receipt, "validators": []},
+    )
+    assert transactions_processor.session.query(StateBlobs).count() == 1
+
+
+def test_transaction_count(transactions_processor: TransactionsProcessor):
+    from_address = "0x9F0e84243496AcFB3Cd99D02eA59673c05901501"
+    to_address = "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794"
+    assert transactions_processor.get_transaction_count(from_address) == 0
+
+    for nonce in range(2):
+        transactions_processor.insert_transaction(
+            from_address, to_address, {"key": "value"}, 0, 1, nonce, False
+        )
+    assert transactions_processor.get_transaction_count(from_address) == 2
+    assert transactions_processor.get_transaction_count(to_address) == 0
+
+    # The nonce is only incremented when it matches
+    for nonce in [0, 1, 3]:
+        with pytest.raises(Exception, match="Unexpected nonce"):
+            transactions_processor.insert_transaction(
+                from_address, to_address, {"key": "value"}, 0, 1, nonce, False
+            )
+    assert transactions_processor.get_transaction_count(from_address) == 2
+
+    # Transactions without sender are counted
+    transactions_processor.insert_transaction(None, to_address, None, 1, 0, 0, False)
+    assert transactions_processor.get_transaction_count(None) == 1
+
+
+def test_list_transactions_query_count(
+    transactions_processor: TransactionsProcessor, engine: Engine
+):
+    from_address = "0x9F0e84243496AcFB3Cd99D02eA59673c05901501"
+    to_address = "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794"
+    nonce = 0
+    for _ in range(5):
+        parent_hash = transactions_processor.insert_transaction(
+            from_address, to_address, {"key": "value"}, 0, 1, nonce, False
+        )
+        transactions_processor.session.commit()
+        transactions_processor.insert_transaction(
+            from_address,
+            to_address,
+            {"key": "value"},
+            0,
+            1,
+            nonce + 1,
+            False,
+            parent_hash,
+        )
+        nonce += 2
+    transactions_processor.session.commit()
+    transactions_processor.session.expire_all()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    chain_snapshot = ChainSnapshot(transactions_processor.session)
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        transactions = transactions_processor.get_transactions_for_address(
+            from_address, TransactionAddressFilter.FROM
+        )
+        transactions_processor.session.expire_all()
+        pending_transactions = chain_snapshot.get_pending_transactions()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    assert len(transactions) == 10
+    assert sum(len(t["triggered_transactions"]) for t in transactions) == 5
+    assert len(pending_transactions) == 10
+    # For each list, one query for the rows and one for the triggered transactions of all of them
+    assert len(statements) == 4
+
+
+def test_get_transactions_for_address_pages(
+    transactions_processor: TransactionsProcessor,
+):
+    from_address = "0x9F0e84243496AcFB3Cd99D02eA59673c05901501"
+    to_address = "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794"
+    for nonce in range(5):
+        transactions_processor.insert_transaction(
+            from_address, to_address, {"key": "value"}, 0, 1, nonce, False
+        )
+    transactions_processor.session.commit()
+    all_transactions = transactions_processor.get_transactions_for_address(
+        from_address, TransactionAddressFilter.FROM
+    )
+
+    pages = []
+    cursor = None
+    while True:
+        page = transactions_processor.get_transactions_for_address(
+            from_address, TransactionAddressFilter.FROM, 2, cursor
+        )
+        if not page:
+            break
+        pages.append(page)
+        cursor = page[-1]["hash"]
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [transaction for page in pages for transaction in page] == all_transactions
+
+
+def test_transaction_views(transactions_processor: TransactionsProcessor):
+    transaction_hash = transactions_processor.insert_transaction(
+        "0x9F0e84243496AcFB3Cd99D02eA59673c05901501",
+        "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794",
+        {"key": "value"},
+        0,
+        1,
+        0,
+        False,
+    )
+    receipt = {"vote": "agree", "contract_state": {}}
+    transactions_processor.set_transaction_result(
+        transaction_hash,
+        {"votes": {}, "leader_receipt": receipt, "validators": [receipt]},
+    )
+    transactions_processor.session.commit()
+    transactions_processor.session.expire_all()
+
+    full = transactions_processor.get_transaction_by_hash(transaction_hash)
+    slim = transactions_processor.get_transaction_by_hash(
+        transaction_hash, TransactionView.SLIM
+    )
+    receipt_view = transactions_processor.get_transaction_by_hash(
+        transaction_hash, TransactionView.RECEIPT
+    )
+
+    assert "data" not in slim and "consensus_data" not in slim
+    assert slim == {
+        key: value
+        for key, value in full.items()
+        if key not in ["data", "consensus_data"]
+    }
+    assert receipt_view == slim | {
+        "leader_receipt": full["consensus_data"]["leader_receipt"]
+    }
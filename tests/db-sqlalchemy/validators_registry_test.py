@@ -4,7 +4,10 @@ from typing import Iterable
 import pytest
 from sqlalchemy.orm import Session
 
-from backend.database_handler.validators_registry import ValidatorsRegistry
+from backend.database_handler.validators_registry import (
+    ValidatorsRegistry,
+    validators_cache,
+)
 from backend.domain.types import LLMProvider, Validator
 
 
@@ -82,3 +85,36 @@ def test_validators_registry(validators_registry: ValidatorsRegistry):
 
     assert len(validators_registry.get_all_validators()) == 0
     assert validators_registry.count_validators() == 0
+
+
+def test_validators_cache(session: Session):
+    validators_cache.invalidate()
+    validators_registry = ValidatorsRegistry(session)
+    validator_address = "0xabcdef"
+    validators_registry.create_validator(
+        Validator(
+            address=validator_address,
+            stake=1,
+            llmprovider=LLMProvider(
+                provider="ollama",
+                model="llama3",
+                config={},
+                plugin="ollama",
+                plugin_config={},
+            ),
+        )
+    )
+    session.commit()
+
+    validators = validators_registry.get_all_validators()
+    assert len(validators) == 1
+    assert ValidatorsRegistry(session).get_all_validators() is validators
+
+    # Uncommitted changes are only visible to the session that made them
+    validators_registry.delete_validator(validator_address)
+    assert validators_registry.get_all_validators() == []
+    assert validators_cache.validators is validators
+
+    session.commit()
+    assert validators_cache.validators is None
+    assert ValidatorsRegistry(session).get_all_validators() == []
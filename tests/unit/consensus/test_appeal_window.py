@@ -0,0 +1,54 @@
+from backend.consensus.appeal_window import AppealWindowSchedule
+
+
+def entry(transaction_hash: str, timestamp_accepted: int, appealed: bool = False):
+    return {
+        "hash": transaction_hash,
+        "timestamp_accepted": timestamp_accepted,
+        "appealed": appealed,
+    }
+
+
+def test_finalizable_transactions_are_returned_in_acceptance_order():
+    schedule = AppealWindowSchedule()
+    schedule.reset([entry("0x2", 200), entry("0x1", 100), entry("0x3", 300)])
+
+    assert schedule.next_due_time(10) == 111
+    assert schedule.pop_due(110, 10) == []
+    assert schedule.pop_due(211, 10) == ["0x1", "0x2"]
+    assert schedule.next_due_time(10) == 311
+
+    # A larger finality window delays the remaining transactions
+    assert schedule.pop_due(311, 100) == []
+    assert schedule.next_due_time(100) == 401
+    assert schedule.pop_due(401, 100) == ["0x3"]
+    assert schedule.next_due_time(100) is None
+
+
+def test_updated_and_removed_transactions_are_discarded():
+    schedule = AppealWindowSchedule()
+    schedule.reset([entry("0x1", 100), entry("0x2", 100), entry("0x3", 100)])
+
+    # Accepted again after a failed appeal
+    schedule.update(entry("0x1", 500))
+    # Finalized by another worker
+    schedule.remove("0x2")
+
+    assert schedule.pop_due(200, 10) == ["0x3"]
+    assert schedule.next_due_time(10) == 511
+    assert schedule.pop_due(511, 10) == ["0x1"]
+
+
+def test_appealed_and_deferred_transactions_are_due_immediately():
+    schedule = AppealWindowSchedule()
+    schedule.reset([entry("0x1", 100)])
+
+    schedule.update(entry("0x1", 100, appealed=True))
+    schedule.update(entry("0x1", 100, appealed=True))
+    assert schedule.next_due_time(1000) == 0
+    assert schedule.pop_due(101, 1000) == ["0x1"]
+
+    schedule.defer("0x1", 102)
+    assert schedule.pop_due(101, 1000) == []
+    assert schedule.pop_due(102, 1000) == ["0x1"]
+    assert schedule.next_due_time(1000) is None
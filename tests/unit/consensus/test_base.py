@@ -1,15 +1,25 @@
-from unittest.mock import Mock
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+import asyncio
 import time
 import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
 
 from backend.consensus.base import (
+    CommittingState,
     ConsensusAlgorithm,
+    ProposingState,
+    TransactionContext,
+    late_validations,
     rotate,
     DEFAULT_VALIDATORS_COUNT,
 )
+from backend.database_handler.async_repository import run_sync
 from backend.database_handler.models import TransactionStatus
+from backend.database_handler.types import ConsensusData
 from backend.domain.types import Transaction
-from backend.node.types import Vote
+from backend.node.types import ExecutionMode, Vote
 from backend.protocol_rpc.message_handler.base import MessageHandler
 from tests.unit.consensus.test_helpers import (
     AccountsManagerMock,
@@ -1213,17 +1223,17 @@ async def test_exec_accepted_appeal_successful_fail_successful(managed_thread):
         Leader agrees + 4 validators agree.
         Appeal: 7 validators disagree. So appeal succeeds.
         Leader agrees + 10 validators agree.
-        Appeal: 13 validators agree. So appeal fails.
-        Appeal: 25 validators disagree. So appeal succeeds.
+        Appeal: 7 validators agree + 6 validators disagree. So appeal fails.
+        Appeal: the 13 validators of the failed appeal reuse their votes + 12 new validators disagree. So appeal succeeds.
         Leader agrees + 34 validators agree.
         """
         if len(created_nodes) < 5:
             return Vote.AGREE
         elif (len(created_nodes) >= 5) and (len(created_nodes) < 5 + 7):
             return Vote.DISAGREE
-        elif (len(created_nodes) >= 5 + 7) and (len(created_nodes) < 5 + 7 + 11 + 13):
+        elif (len(created_nodes) >= 5 + 7) and (len(created_nodes) < 5 + 7 + 11 + 7):
             return Vote.AGREE
-        elif (len(created_nodes) >= 5 + 7 + 11 + 13) and (
+        elif (len(created_nodes) >= 5 + 7 + 11 + 7) and (
             len(created_nodes) < 5 + 7 + 11 + 13 + 25
         ):
             return Vote.DISAGREE
@@ -1472,3 +1482,533 @@ async def test_exec_accepted_appeal_successful_fail_successful(managed_thread):
 
     assert new_leader_address != old_leader_address
     assert new_leader_address in validator_set_addresses
+
+
+@pytest.mark.asyncio
+async def test_workers_run_contracts_independently():
+    """
+    Tests that a slow transaction only blocks the transactions of its own contract,
+    that transactions of a contract are executed in order and only once, and that idle workers are removed
+    """
+    consensus = ConsensusAlgorithm(MagicMock(), Mock(MessageHandler))
+
+    executed = []
+    release_slow = asyncio.Event()
+
+    async def exec_transaction_mock(transaction, *args, **kwargs):
+        if transaction.hash == "slow":
+            await release_slow.wait()
+        executed.append(transaction.hash)
+
+    consensus.exec_transaction = exec_transaction_mock
+
+    def make_transaction(hash: str, to_address: str) -> Transaction:
+        transaction = init_dummy_transaction()
+        transaction.hash = hash
+        transaction.to_address = to_address
+        return transaction
+
+    with patch("backend.consensus.base.ChainSnapshot"), patch(
+        "backend.consensus.base.TransactionsProcessor"
+    ), patch("backend.consensus.base.DEFAULT_WORKER_IDLE_TIME", 0.1):
+        consensus.enqueue_transaction(make_transaction("slow", "contract_a"))
+        consensus.enqueue_transaction(make_transaction("after_slow", "contract_a"))
+        consensus.enqueue_transaction(make_transaction("fast", "contract_b"))
+
+        await asyncio.sleep(0.05)
+        assert executed == ["fast"]
+
+        # Queued again while in flight, e.g. by a reconciliation scan
+        consensus.enqueue_transaction(make_transaction("slow", "contract_a"))
+
+        release_slow.set()
+        await asyncio.sleep(0.05)
+        assert executed == ["fast", "slow", "after_slow"]
+
+        await asyncio.gather(*consensus.workers.values())
+        assert executed == ["fast", "slow", "after_slow"]
+        assert consensus.workers == {}
+        assert consensus.queues == {}
+        assert consensus.in_flight == set()
+
+
+@pytest.mark.asyncio
+async def test_committing_state_early_decision():
+    """
+    Test that the committing state stops waiting for validators once the majority agrees,
+    and that the late validators are only logged
+    """
+    transaction = init_dummy_transaction()
+    nodes = get_nodes_specs(5)
+    msg_handler_mock = Mock(MessageHandler)
+    release_slow_validators = asyncio.Event()
+
+    def validator_node(node: dict, slow: bool):
+        validator = node_factory(
+            node, None, None, None, msg_handler_mock, None, Vote.AGREE
+        )
+        receipt = validator.exec_transaction.return_value
+
+        async def exec_transaction(transaction):
+            if slow:
+                await release_slow_validators.wait()
+            return receipt
+
+        validator.exec_transaction = exec_transaction
+        return validator
+
+    context = TransactionContext(
+        transaction=transaction,
+        transactions_processor=TransactionsProcessorMock(
+            [transaction_to_dict(transaction)]
+        ),
+        snapshot=SnapshotMock(nodes),
+        accounts_manager=AccountsManagerMock(),
+        contract_snapshot_factory=contract_snapshot_factory,
+        node_factory=None,
+        msg_handler=msg_handler_mock,
+    )
+    # The leader and the 2 fast validators make 3 votes out of 5
+    context.num_validators = 5
+    context.votes = {nodes[0]["address"]: Vote.AGREE.value}
+    context.validator_nodes = [
+        validator_node(nodes[1], slow=True),
+        validator_node(nodes[2], slow=False),
+        validator_node(nodes[3], slow=True),
+        validator_node(nodes[4], slow=False),
+    ]
+
+    await asyncio.wait_for(CommittingState.exec_until_decided(context), 1)
+
+    assert [validator.address for validator in context.validator_nodes] == [
+        nodes[2]["address"],
+        nodes[4]["address"],
+    ]
+    assert len(context.validation_results) == 2
+    assert len(late_validations) == 2
+    msg_handler_mock.send_message.assert_not_called()
+
+    release_slow_validators.set()
+    while late_validations:
+        await asyncio.sleep(0.01)
+    assert msg_handler_mock.send_message.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_committing_state_early_decision_session():
+    """
+    Test that the validators of an early decision read contracts through a session of their own,
+    which outlives the decision until the late validators finish, and that failing validators are not revealed
+    """
+    transaction = init_dummy_transaction()
+    nodes = get_nodes_specs(5)
+    msg_handler_mock = Mock(MessageHandler)
+    release_slow_validator = asyncio.Event()
+    validation_session = Mock()
+    validator_snapshots = []
+
+    def early_node_factory(
+        node, mode, contract_snapshot, receipt, msg_handler, contract_snapshot_factory
+    ):
+        validator_snapshots.append(contract_snapshot)
+        validator = node_factory(
+            node,
+            mode,
+            contract_snapshot,
+            receipt,
+            msg_handler,
+            contract_snapshot_factory,
+            Vote.AGREE,
+        )
+        receipt = validator.exec_transaction.return_value
+
+        async def exec_transaction(transaction):
+            if node is nodes[1]:
+                raise Exception("validator failed")
+            if node is nodes[2]:
+                await release_slow_validator.wait()
+            return receipt
+
+        validator.exec_transaction = exec_transaction
+        return validator
+
+    context = TransactionContext(
+        transaction=transaction,
+        transactions_processor=TransactionsProcessorMock(
+            [transaction_to_dict(transaction)]
+        ),
+        snapshot=SnapshotMock(nodes),
+        accounts_manager=AccountsManagerMock(),
+        contract_snapshot_factory=contract_snapshot_factory,
+        node_factory=early_node_factory,
+        msg_handler=msg_handler_mock,
+    )
+    context.early_decision = True
+    context.get_session = Mock(return_value=validation_session)
+    context.num_validators = 5
+    context.votes = {nodes[0]["address"]: Vote.AGREE.value}
+    context.remaining_validators = nodes[1:]
+    context.contract_snapshot_supplier = lambda: None
+
+    with patch(
+        "backend.consensus.base.contract_snapshot_factory",
+        side_effect=lambda address, session, transaction: (address, session),
+    ):
+        await asyncio.wait_for(CommittingState().handle(context), 1)
+
+    assert validator_snapshots == [(transaction.to_address, validation_session)] * 4
+    # The failing validator is not revealed, and the slow one finishes after the decision
+    assert [validator.address for validator in context.validator_nodes] == [
+        nodes[3]["address"],
+        nodes[4]["address"],
+    ]
+    # The committee keeps the validators whose votes were not revealed, for appeals
+    assert context.consensus_data.unrevealed_validators == [
+        nodes[1]["address"],
+        nodes[2]["address"],
+    ]
+    assert len(late_validations) == 1
+    validation_session.close.assert_not_called()
+
+    release_slow_validator.set()
+    while late_validations:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0)
+    validation_session.close.assert_called_once()
+    assert context.validation_session is None
+
+
+@pytest.mark.asyncio
+async def test_exec_transaction_with_async_session():
+    """
+    Test that a worker with async sessions runs the transactions processor, the accounts manager, the chain snapshot
+    and the contract snapshots on one async session, awaiting their queries, and commits it once
+    """
+    transaction = init_dummy_transaction()
+    nodes = get_nodes_specs(5)
+    msg_handler_mock = Mock(MessageHandler)
+    async_sessions = []
+    contract_snapshot_sessions = []
+
+    def get_async_session():
+        async_session = AsyncSession()
+        async_session.commit = AsyncMock()
+        async_sessions.append(async_session)
+        return async_session
+
+    def query():
+        # Like the asyncpg driver, only works when the call runs through `AsyncSession.run_sync`
+        await_only(asyncio.sleep(0))
+
+    class AsyncTransactionsProcessor(TransactionsProcessorMock):
+        def __init__(self, session):
+            super().__init__([transaction_to_dict(transaction)])
+            self.session = session
+            self.flushed = False
+
+        def update_transaction_status(self, transaction_hash, status):
+            query()
+            super().update_transaction_status(transaction_hash, status)
+
+        @asynccontextmanager
+        async def async_write_behind(self):
+            yield self
+            await run_sync(self.session, self.flush)
+
+        def flush(self):
+            query()
+            self.flushed = True
+
+    class AsyncContractSnapshot:
+        def __init__(self, session):
+            query()
+            contract_snapshot_sessions.append(session)
+
+        def update_contract_state(self, state):
+            query()
+
+    def chain_snapshot(session):
+        query()
+        return SnapshotMock(nodes)
+
+    transactions_processors = []
+    consensus = ConsensusAlgorithm(None, msg_handler_mock, get_async_session)
+    consensus.early_decision = True
+    consensus.pipelined_validation = False
+    exec_transaction = consensus.exec_transaction
+    consensus.exec_transaction = lambda *args: exec_transaction(
+        *args,
+        node_factory=lambda *node_args: node_factory(*node_args, Vote.AGREE),
+    )
+
+    with patch(
+        "backend.consensus.base.TransactionsProcessor",
+        side_effect=lambda session: transactions_processors.append(
+            AsyncTransactionsProcessor(session)
+        )
+        or transactions_processors[-1],
+    ), patch("backend.consensus.base.ChainSnapshot", side_effect=chain_snapshot), patch(
+        "backend.consensus.base.AccountsManager",
+        side_effect=lambda session: AccountsManagerMock(),
+    ), patch(
+        "backend.consensus.base.contract_snapshot_factory",
+        side_effect=lambda address, session, transaction: AsyncContractSnapshot(
+            session
+        ),
+    ):
+        await consensus._exec_transaction_with_async_session(transaction)
+        while late_validations:
+            await asyncio.sleep(0.01)
+
+    [async_session, validation_session] = async_sessions
+    [transactions_processor] = transactions_processors
+    assert transactions_processor.session is async_session.sync_session
+    assert transactions_processor.updated_transaction_status_history[
+        transaction.hash
+    ] == [
+        TransactionStatus.PROPOSING,
+        TransactionStatus.COMMITTING,
+        TransactionStatus.REVEALING,
+        TransactionStatus.ACCEPTED,
+    ]
+    assert transactions_processor.flushed
+    async_session.commit.assert_awaited_once()
+    # The leader and the contract state update use the session of the transaction,
+    # the validators of the early decision their own session
+    assert contract_snapshot_sessions == [
+        async_session.sync_session,
+        *[validation_session.sync_session] * 4,
+        async_session.sync_session,
+    ]
+    validation_session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_run_in_session_on_async_session():
+    """
+    Test that the database calls of the workers (e.g. releasing transactions) run through `run_sync`
+    on the consensus loop, and on a synchronous session on other loops
+    """
+    async_session = AsyncSession()
+    async_session.commit = AsyncMock()
+    session = MagicMock()
+    consensus = ConsensusAlgorithm(
+        Mock(return_value=session), Mock(MessageHandler), lambda: async_session
+    )
+    sessions = []
+
+    def release(session):
+        sessions.append(session)
+        if session is async_session.sync_session:
+            # Like the asyncpg driver, only works when the call runs through `AsyncSession.run_sync`
+            await_only(asyncio.sleep(0))
+
+    consensus.consensus_loop = asyncio.get_running_loop()
+    await consensus._run_in_session(release)
+    async_session.commit.assert_awaited_once()
+
+    consensus.consensus_loop = None
+    await consensus._run_in_session(release)
+    session.__enter__.return_value.commit.assert_called_once()
+
+    assert sessions == [
+        async_session.sync_session,
+        session.__enter__.return_value,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_proposing_state_pipelined_validation():
+    """
+    Test that pipelined validators start before the leader finishes, and get its receipt to vote
+    """
+    transaction = init_dummy_transaction()
+    nodes = get_nodes_specs(3)
+    msg_handler_mock = Mock(MessageHandler)
+    validators_started = asyncio.Event()
+    leader_receipts = []
+
+    def pipelined_node_factory(
+        node,
+        mode,
+        contract_snapshot,
+        receipt,
+        msg_handler,
+        contract_snapshot_factory,
+        leader_results=None,
+    ):
+        created_node = node_factory(
+            node,
+            mode,
+            contract_snapshot,
+            receipt,
+            msg_handler,
+            contract_snapshot_factory,
+            Vote.AGREE,
+        )
+        assert leader_results is not None
+        own_receipt = created_node.exec_transaction.return_value
+
+        async def exec_transaction(transaction):
+            if mode == ExecutionMode.LEADER:
+                # The validators run while the leader is executing
+                await validators_started.wait()
+                leader_results.post(0, b"\x00leader result")
+            else:
+                validators_started.set()
+                assert await leader_results.get(0) == b"\x00leader result"
+                leader_receipts.append(await leader_results.get_receipt())
+            return own_receipt
+
+        created_node.exec_transaction = exec_transaction
+        return created_node
+
+    context = TransactionContext(
+        transaction=transaction,
+        transactions_processor=TransactionsProcessorMock(
+            [transaction_to_dict(transaction)]
+        ),
+        snapshot=SnapshotMock(nodes),
+        accounts_manager=AccountsManagerMock(),
+        contract_snapshot_factory=contract_snapshot_factory,
+        node_factory=pipelined_node_factory,
+        msg_handler=msg_handler_mock,
+    )
+    context.remaining_validators = nodes[1:]
+    context.contract_snapshot_supplier = lambda: None
+
+    leader_receipt = await asyncio.wait_for(
+        ProposingState.exec_pipelined(
+            context, nodes[0], nodes[1:], context.contract_snapshot_supplier
+        ),
+        1,
+    )
+    assert len(context.validation_tasks) == 2
+
+    await asyncio.wait_for(CommittingState().handle(context), 1)
+
+    assert len(context.validation_results) == 2
+    assert context.validation_tasks is None
+    assert leader_receipts == [leader_receipt, leader_receipt]
+
+
+@pytest.mark.asyncio
+async def test_committing_state_appeal_reuses_validator_receipts():
+    """
+    Test that validators selected again for an appeal reuse their receipt of the previous round,
+    and only the new validators execute the transaction
+    """
+    transaction = init_dummy_transaction()
+    nodes = get_nodes_specs(5)
+    msg_handler_mock = Mock(MessageHandler)
+    created_nodes = {}
+
+    def counting_node_factory(
+        node, mode, contract_snapshot, receipt, msg_handler, contract_snapshot_factory
+    ):
+        created_nodes[node["address"]] = node_factory(
+            node,
+            mode,
+            contract_snapshot,
+            receipt,
+            msg_handler,
+            contract_snapshot_factory,
+            Vote.DISAGREE,
+        )
+        return created_nodes[node["address"]]
+
+    def previous_receipt(node, mode):
+        return node_factory(
+            node, mode, None, None, msg_handler_mock, None, Vote.AGREE
+        ).exec_transaction.return_value
+
+    leader_receipt = previous_receipt(nodes[0], ExecutionMode.LEADER)
+    transaction.appealed = True
+    transaction.consensus_data = ConsensusData(
+        votes={},
+        leader_receipt=leader_receipt,
+        validators=[
+            previous_receipt(node, ExecutionMode.VALIDATOR) for node in nodes[1:3]
+        ],
+    )
+
+    context = TransactionContext(
+        transaction=transaction,
+        transactions_processor=TransactionsProcessorMock(
+            [transaction_to_dict(transaction)]
+        ),
+        snapshot=SnapshotMock(nodes),
+        accounts_manager=AccountsManagerMock(),
+        contract_snapshot_factory=contract_snapshot_factory,
+        node_factory=counting_node_factory,
+        msg_handler=msg_handler_mock,
+    )
+    context.consensus_data.leader_receipt = leader_receipt
+    context.remaining_validators = nodes[1:]
+    context.num_validators = len(context.remaining_validators)
+    context.contract_snapshot_supplier = lambda: None
+
+    await CommittingState().handle(context)
+
+    for node in nodes[1:3]:
+        created_nodes[node["address"]].exec_transaction.assert_not_called()
+    for node in nodes[3:]:
+        created_nodes[node["address"]].exec_transaction.assert_awaited_once()
+    assert [result.vote for result in context.validation_results] == [
+        Vote.AGREE,
+        Vote.AGREE,
+        Vote.DISAGREE,
+        Vote.DISAGREE,
+    ]
+    assert [result.node_config["address"] for result in context.validation_results] == [
+        node["address"] for node in nodes[1:]
+    ]
+
+    # Receipts of validators that voted on another leader receipt are not reused
+    created_nodes.clear()
+    context.consensus_data.leader_receipt = previous_receipt(
+        nodes[0], ExecutionMode.LEADER
+    )
+    context.consensus_data.leader_receipt.result = b"\x00other result"
+
+    await CommittingState().handle(context)
+
+    for node in nodes[1:]:
+        created_nodes[node["address"]].exec_transaction.assert_awaited_once()
+
+
+def test_appeal_validators_include_unrevealed_validators():
+    """
+    Test that appeals are sized from the whole committee of an early decision,
+    including the validators whose votes were not revealed
+    """
+    nodes = get_nodes_specs(20)
+    msg_handler_mock = Mock(MessageHandler)
+
+    def receipt(node, mode):
+        return node_factory(
+            node, mode, None, None, msg_handler_mock, None, Vote.AGREE
+        ).exec_transaction.return_value
+
+    # 5 validators were selected, the votes of 2 of them were not revealed
+    consensus_data = ConsensusData(
+        votes={},
+        leader_receipt=receipt(nodes[0], ExecutionMode.LEADER),
+        validators=[receipt(node, ExecutionMode.VALIDATOR) for node in nodes[1:3]],
+        unrevealed_validators=[node["address"] for node in nodes[3:5]],
+    )
+    assert (
+        ConsensusData.from_dict(consensus_data.to_dict()).unrevealed_validators
+        == consensus_data.unrevealed_validators
+    )
+
+    extra_validators = ConsensusAlgorithm.get_extra_validators(
+        SnapshotMock(nodes), consensus_data, 0
+    )
+    assert len(extra_validators) == 5 + 2
+    assert not {validator["address"] for validator in extra_validators} & {
+        node["address"] for node in nodes[:5]
+    }
+    assert ConsensusAlgorithm.get_validators_from_consensus_data(
+        nodes, consensus_data
+    ) == sorted(nodes[1:5], key=lambda node: nodes.index(node))
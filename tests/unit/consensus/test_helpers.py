@@ -220,7 +220,7 @@ async def _appeal_window(
                     )
                 except ValueError as e:
                     print(e, transaction)
-                    context.transactions_processor.set_transaction_appeal(
+                    await context.transactions_processor.set_transaction_appeal(
                         context.transaction.hash, False
                     )
                     context.transaction.appealed = False
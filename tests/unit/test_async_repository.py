@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+
+from backend.database_handler.async_repository import AsyncRepository, run_sync
+
+
+class Repository:
+    def __init__(self, session=None):
+        self.session = session
+        self.balances = {}
+
+    def update_balance(self, address: str, balance: int):
+        self.balances[address] = balance
+
+    def get_balance(self, address: str) -> int:
+        return self.balances.get(address, 0)
+
+    def query(self) -> str:
+        # Like the asyncpg driver, only works when the call runs through `AsyncSession.run_sync`
+        return await_only(asyncio.sleep(0, result="result"))
+
+
+@pytest.mark.asyncio
+async def test_async_repository_without_session():
+    repository = AsyncRepository(Repository())
+
+    await repository.update_balance("0x1", 10)
+    assert await repository.get_balance("0x1") == 10
+    assert AsyncRepository.of(repository) is repository
+
+
+@pytest.mark.asyncio
+async def test_async_repository_runs_calls_on_async_session():
+    session = AsyncSession()
+    repository = AsyncRepository(Repository(session.sync_session))
+
+    await repository.update_balance("0x1", 10)
+    assert await repository.get_balance("0x1") == 10
+    assert await repository.query() == "result"
+
+
+@pytest.mark.asyncio
+async def test_run_sync_serializes_calls_on_async_session():
+    session = AsyncSession()
+    calls = []
+
+    def query(name: str) -> str:
+        calls.append(("start", name))
+        await_only(asyncio.sleep(0.01))
+        calls.append(("end", name))
+        return name
+
+    assert await asyncio.gather(
+        run_sync(session.sync_session, query, "leader"),
+        run_sync(session.sync_session, query, "validator"),
+    ) == ["leader", "validator"]
+    assert calls == [
+        ("start", "leader"),
+        ("end", "leader"),
+        ("start", "validator"),
+        ("end", "validator"),
+    ]
+    # Without AsyncSession, the function runs directly
+    assert await run_sync(None, str.upper, "a") == "A"
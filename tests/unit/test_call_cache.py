@@ -0,0 +1,37 @@
+from backend.protocol_rpc.call_cache import CallResultsCache
+
+ADDRESS = "0xAcec3A6d871C25F591aBd4fC24054e524BBbF794"
+VERSION_1 = 1
+VERSION_2 = 2
+
+
+def test_call_results_cache_is_keyed_by_contract_version():
+    cache = CallResultsCache(max_size=10)
+    cache.put(ADDRESS, VERSION_1, b"calldata", None, "result")
+
+    assert cache.get(ADDRESS, VERSION_1, b"calldata", None) == "result"
+    assert cache.get(ADDRESS.lower(), VERSION_1, b"calldata", None) == "result"
+    assert cache.get(ADDRESS, VERSION_1, b"other calldata", None) is None
+    assert cache.get(ADDRESS, VERSION_1, b"calldata", "0x1234") is None
+
+    # The contract changed
+    assert cache.get(ADDRESS, VERSION_2, b"calldata", None) is None
+    assert cache.get(ADDRESS, VERSION_1, b"calldata", None) is None
+
+
+def test_call_results_cache_evicts_least_recently_used():
+    cache = CallResultsCache(max_size=2)
+    cache.put(ADDRESS, VERSION_1, b"1", None, "result 1")
+    cache.put(ADDRESS, VERSION_1, b"2", None, "result 2")
+    assert cache.get(ADDRESS, VERSION_1, b"1", None) == "result 1"
+
+    cache.put(ADDRESS, VERSION_1, b"3", None, "result 3")
+
+    assert cache.get(ADDRESS, VERSION_1, b"1", None) == "result 1"
+    assert cache.get(ADDRESS, VERSION_1, b"2", None) is None
+
+
+def test_call_results_cache_disabled():
+    cache = CallResultsCache(max_size=0)
+    cache.put(ADDRESS, VERSION_1, b"calldata", None, "result")
+    assert cache.get(ADDRESS, VERSION_1, b"calldata", None) is None
@@ -0,0 +1,62 @@
+import dataclasses
+
+import pytest
+
+import backend.node.genvm.origin.calldata as calldata
+from backend.node.types import Address
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+def test_calldata_round_trip():
+    value = {
+        "null": None,
+        "bools": [True, False],
+        "ints": [0, 1, 127, 128, 2**70, -1, -128, -(2**70)],
+        "str": "héllo",
+        "bytes": b"\x00\xff" * 100,
+        "address": Address(b"\x01" * 20),
+        "nested": {"b": [[]], "a": {}},
+    }
+
+    decoded = calldata.decode(calldata.encode(value))
+
+    assert decoded["bytes"] == value["bytes"]
+    assert decoded["address"] == value["address"]
+    assert {k: v for k, v in decoded.items() if k not in ("bytes", "address")} == {
+        k: v for k, v in value.items() if k not in ("bytes", "address")
+    }
+
+
+def test_calldata_encoding():
+    assert calldata.encode(None) == bytes([calldata.SPECIAL_NULL])
+    assert calldata.encode(True) == bytes([calldata.SPECIAL_TRUE])
+    assert calldata.encode(16) == bytes([0x81, 0x01])
+    assert calldata.encode(-1) == bytes([calldata.TYPE_NINT])
+    # Keys are sorted, whatever their order in the dict
+    assert calldata.encode({"b": 1, "a": 2}) == calldata.encode({"a": 2, "b": 1})
+    # Tuples and dataclasses are encoded as arrays and maps
+    assert calldata.encode((1, 2)) == calldata.encode([1, 2])
+    assert calldata.encode(Point(1, 2)) == calldata.encode({"x": 1, "y": 2})
+    assert calldata.encode([1], default=lambda x: x * 2 if type(x) is int else x) == (
+        calldata.encode([2])
+    )
+
+
+def test_calldata_decode_errors():
+    with pytest.raises(Exception, match="unexpected end"):
+        calldata.decode(calldata.encode("hello")[:-1])
+    with pytest.raises(Exception, match="unparsed end"):
+        calldata.decode(calldata.encode(1) + b"\x00")
+
+
+def test_calldata_decode_iter():
+    items = list(range(-5, 300))
+    assert list(calldata.decode_iter(calldata.encode(items))) == items
+
+    with pytest.raises(Exception, match="expected array"):
+        list(calldata.decode_iter(calldata.encode({})))
@@ -0,0 +1,69 @@
+from unittest.mock import Mock
+
+from backend.database_handler.contract_snapshot import (
+    CachedContract,
+    ContractSnapshotCache,
+    LazyEncodedState,
+)
+
+VERSION_1 = 1
+VERSION_2 = 2
+
+
+def test_contract_snapshot_cache_is_keyed_by_version():
+    cache = ContractSnapshotCache()
+    contract = CachedContract({"code": "code"})
+    cache.put("0x1", VERSION_1, contract)
+
+    assert cache.get("0x1", VERSION_1) is contract
+    assert cache.get("0x1", VERSION_2) is None
+    assert cache.get("0x2", VERSION_1) is None
+
+    cache.invalidate("0x1")
+    assert cache.get("0x1", VERSION_1) is None
+
+
+def test_contract_snapshot_cache_evicts_least_recently_used():
+    cache = ContractSnapshotCache(max_size=2)
+    contracts = [CachedContract({"code": str(i)}) for i in range(3)]
+    cache.put("0x0", VERSION_1, contracts[0])
+    cache.put("0x1", VERSION_1, contracts[1])
+    assert cache.get("0x0", VERSION_1) is contracts[0]
+
+    cache.put("0x2", VERSION_1, contracts[2])
+
+    assert cache.get("0x0", VERSION_1) is contracts[0]
+    assert cache.get("0x1", VERSION_1) is None
+    assert cache.get("0x2", VERSION_1) is contracts[2]
+
+
+def test_lazy_encoded_state_shares_loaded_slots():
+    loaded_slots = {"c2xvdA==": "dmFsdWU=", "bWlzc2luZw==": None}
+    # Slots already loaded by another snapshot don't need the session
+    encoded_state = LazyEncodedState("0x1", VERSION_1, None, loaded_slots)
+
+    assert encoded_state.get("c2xvdA==") == "dmFsdWU="
+    assert encoded_state.get("bWlzc2luZw==") is None
+
+    # Writes of a snapshot are not seen by the others
+    encoded_state["c2xvdA=="] = "b3RoZXI="
+    assert loaded_slots["c2xvdA=="] == "dmFsdWU="
+
+
+def test_lazy_encoded_state_reads_slots_of_its_version():
+    session = Mock()
+    session.execute.return_value.scalar_one_or_none.return_value = b"value"
+    loaded_slots = {}
+    encoded_state = LazyEncodedState("0x1", VERSION_1, session, loaded_slots)
+
+    assert encoded_state.get("c2xvdA==") == "dmFsdWU="
+    assert loaded_slots == {"c2xvdA==": "dmFsdWU="}
+
+    # Values written by newer versions of the contract are skipped
+    statement = session.execute.call_args.args[0].compile()
+    assert "contract_storage.version <= :version_1" in str(statement)
+    assert statement.params["version_1"] == VERSION_1
+
+    session.execute.return_value.scalar_one_or_none.return_value = None
+    assert encoded_state.get("b3RoZXI=") is None
+    assert loaded_slots == {"c2xvdA==": "dmFsdWU=", "b3RoZXI=": None}
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from backend.node.genvm.origin.base_host import ResultCode, host_loop
+from tests.common.genvm_host import GenVMClient, StorageHost, socket_pair
+
+
+@pytest.mark.asyncio
+async def test_host_loop_storage_round_trips():
+    host_sock, genvm_sock = socket_pair()
+    host = StorageHost(host_sock)
+    host_task = asyncio.create_task(host_loop(host))
+    client = GenVMClient(genvm_sock)
+
+    account = b"\x01" * 20
+    await client.storage_write(account, b"slot", 0, b"hello")
+    assert await client.storage_read(account, b"slot", 0, 5) == b"hello"
+    assert await client.storage_read(account, b"slot", 3, 4) == b"lo\x00\x00"
+
+    # Larger than the receive buffer
+    large = bytes(range(256)) * 1024
+    await client.storage_write(account, b"large", 0, large)
+    assert await client.storage_read(account, b"large", 0, len(large)) == large
+
+    await client.consume_result(b"done")
+    await asyncio.wait_for(host_task, 5)
+    assert host.result == (ResultCode.RETURN, b"done")
+
+    host_sock.close()
+    genvm_sock.close()
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from backend.node.genvm.base import LeaderResultsChannel
+
+
+@pytest.mark.asyncio
+async def test_leader_results_wait_for_the_leader():
+    channel = LeaderResultsChannel()
+    result = asyncio.ensure_future(channel.get(1))
+    receipt = asyncio.ensure_future(channel.get_receipt())
+    await asyncio.sleep(0)
+    assert not result.done()
+
+    channel.post(0, b"\x00first")
+    channel.post(1, b"\x00second")
+    assert await result == b"\x00second"
+    assert await channel.get(0) == b"\x00first"
+
+    assert not receipt.done()
+    channel.finish("receipt")
+    assert await receipt == "receipt"
+
+
+@pytest.mark.asyncio
+async def test_leader_results_missing_result():
+    channel = LeaderResultsChannel()
+    result = asyncio.ensure_future(channel.get(0))
+    await asyncio.sleep(0)
+
+    channel.finish("receipt")
+
+    with pytest.raises(Exception, match="without the non-deterministic result"):
+        await result
+    with pytest.raises(Exception, match="no non-deterministic result"):
+        await channel.get(1)
+
+
+@pytest.mark.asyncio
+async def test_leader_results_leader_failed():
+    channel = LeaderResultsChannel()
+    result = asyncio.ensure_future(channel.get(0))
+    await asyncio.sleep(0)
+
+    channel.fail(ValueError("leader failed"))
+
+    with pytest.raises(ValueError, match="leader failed"):
+        await result
+    with pytest.raises(ValueError, match="leader failed"):
+        await channel.get_receipt()
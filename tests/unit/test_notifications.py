@@ -0,0 +1,61 @@
+import os
+import asyncio
+import time
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from backend.database_handler.notifications import NotificationListener
+
+
+@pytest.mark.asyncio
+async def test_listener_falls_back_to_timeout_without_database():
+    """Test that the listener behaves like a sleep when it can't connect"""
+    engine = Mock()
+    engine.raw_connection.side_effect = Exception("no database")
+
+    listener = NotificationListener(engine, ["channel"])
+
+    start = time.monotonic()
+    received = await listener.wait(0.05)
+
+    assert received == set()
+    assert not listener.connected
+    assert time.monotonic() - start >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_listener_wakes_up_on_notification():
+    """Test that a notification on the connection wakes up the waiter before the timeout"""
+    read_fd, write_fd = os.pipe()
+
+    notification = Mock()
+    notification.channel = "channel"
+    notification.payload = "0x1"
+    driver_connection = MagicMock()
+    driver_connection.fileno.return_value = read_fd
+    driver_connection.notifies = []
+
+    def poll():
+        os.read(read_fd, 1)
+        driver_connection.notifies.append(notification)
+
+    driver_connection.poll.side_effect = poll
+    engine = Mock()
+    engine.raw_connection.return_value.driver_connection = driver_connection
+
+    listener = NotificationListener(engine, ["channel"])
+    asyncio.get_running_loop().call_later(0.01, os.write, write_fd, b"x")
+
+    start = time.monotonic()
+    received = await listener.wait(5)
+
+    assert received == {"channel"}
+    assert listener.pop_payloads("channel") == ["0x1"]
+    assert listener.pop_payloads("channel") == []
+    assert listener.connected
+    assert time.monotonic() - start < 5
+
+    listener.close()
+    os.close(read_fd)
+    os.close(write_fd)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from backend.node.schema_cache import ContractSchemaCache
+
+
+def _cache(**kwargs) -> ContractSchemaCache:
+    return ContractSchemaCache(get_version=lambda: "version", **kwargs)
+
+
+def test_schema_cache_computes_each_schema_once():
+    cache = _cache()
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.01)
+        return '{"methods": {}}'
+
+    async def main():
+        return await asyncio.gather(
+            *[cache.get(b"code", compute) for _ in range(5)],
+            cache.get(b"code", compute),
+        )
+
+    assert asyncio.run(main()) == ['{"methods": {}}'] * 6
+    assert asyncio.run(cache.get(b"code", compute)) == '{"methods": {}}'
+    assert len(computed) == 1
+
+
+def test_schema_cache_waiter_cancellation():
+    """Test that a cancelled waiter doesn't cancel the computation shared with the other requests"""
+    cache = _cache()
+
+    async def main():
+        computing = asyncio.Event()
+        release = asyncio.Event()
+
+        async def compute():
+            computing.set()
+            await release.wait()
+            return "schema"
+
+        first = asyncio.ensure_future(cache.get(b"code", compute))
+        await computing.wait()
+        cancelled = asyncio.ensure_future(cache.get(b"code", compute))
+        waiting = asyncio.ensure_future(cache.get(b"code", compute))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await first == "schema"
+        assert await waiting == "schema"
+        assert cancelled.cancelled()
+
+    asyncio.run(main())
+
+
+def test_schema_cache_does_not_cache_failures():
+    cache = _cache()
+
+    async def fail():
+        raise Exception("execution failed")
+
+    async def compute():
+        return "schema"
+
+    with pytest.raises(Exception, match="execution failed"):
+        asyncio.run(cache.get(b"code", fail))
+    assert asyncio.run(cache.get(b"code", compute)) == "schema"
+
+
+def test_schema_cache_is_keyed_by_genvm_version():
+    version = "1"
+    cache = ContractSchemaCache(get_version=lambda: version)
+
+    async def compute():
+        return f"schema {version}"
+
+    assert asyncio.run(cache.get(b"code", compute)) == "schema 1"
+    version = "2"
+    assert asyncio.run(cache.get(b"code", compute)) == "schema 2"
+
+
+def test_schema_cache_on_disk(tmp_path):
+    async def compute():
+        return "schema"
+
+    async def fail():
+        raise Exception("not cached")
+
+    assert asyncio.run(_cache(directory=tmp_path).get(b"code", compute)) == "schema"
+    # A new process finds the schema on disk
+    assert asyncio.run(_cache(directory=tmp_path).get(b"code", fail)) == "schema"
+
+
+def test_schema_cache_evicts_least_recently_used():
+    cache = _cache(max_size=1)
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        return "schema"
+
+    asyncio.run(cache.get(b"code 1", compute))
+    asyncio.run(cache.get(b"code 2", compute))
+    asyncio.run(cache.get(b"code 1", compute))
+    assert len(computed) == 3
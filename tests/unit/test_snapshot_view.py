@@ -0,0 +1,45 @@
+import base64
+
+from backend.database_handler.contract_snapshot import ContractSnapshot
+from backend.node.base import _SnapshotView
+from backend.node.types import Address
+
+CONTRACT_ADDRESS = "0x" + "01" * 20
+SLOT = b"\x02" * 32
+
+
+def _snapshot(encoded_state: dict[str, str]) -> ContractSnapshot:
+    snapshot = ContractSnapshot(None, None)
+    snapshot.contract_address = CONTRACT_ADDRESS
+    snapshot.contract_code = ""
+    snapshot.encoded_state = encoded_state
+    return snapshot
+
+
+def _slot_id(slot: bytes) -> str:
+    return base64.b64encode(slot).decode("ascii")
+
+
+def test_storage_read_does_not_change_state():
+    snapshot = _snapshot({})
+    view = _SnapshotView(snapshot, None, readonly=True)
+
+    assert view.storage_read(Address(CONTRACT_ADDRESS), SLOT, 4, 3) == b"\x00" * 3
+    assert snapshot.encoded_state == {}
+
+
+def test_storage_write_is_returned_by_flush():
+    snapshot = _snapshot({_slot_id(SLOT): base64.b64encode(b"abc").decode("ascii")})
+    view = _SnapshotView(snapshot, None, readonly=False)
+    address = Address(CONTRACT_ADDRESS)
+
+    view.storage_write(address, SLOT, 2, b"xyz")
+    view.storage_write(address, SLOT, 6, memoryview(b"!"))
+    assert view.storage_read(address, SLOT, 0, 8) == b"abxyz\x00!\x00"
+
+    assert view.flush() == {
+        _slot_id(SLOT): base64.b64encode(b"abxyz\x00!").decode("ascii")
+    }
+    assert not view.dirty_slots
+    # Snapshots can be shared, writes are only kept by the view
+    assert base64.b64decode(snapshot.encoded_state[_slot_id(SLOT)]) == b"abc"
@@ -1,5 +1,12 @@
 from dataclasses import asdict
 from backend.domain.types import LLMProvider, Validator
+from backend.node.types import (
+    ExecutionMode,
+    ExecutionResultStatus,
+    Receipt,
+    Vote,
+    get_state_digest,
+)
 
 
 def test_validator_to_dict():
@@ -26,3 +33,44 @@ def test_validator_to_dict():
         "plugin": "plugin",
         "plugin_config": {"plugin_config": "plugin_config"},
     }
+
+
+def test_receipt_loads_referenced_state_lazily():
+    loaded = []
+
+    def load_state(state_hash: str) -> dict[str, str]:
+        loaded.append(state_hash)
+        return {"slot": "value"}
+
+    receipt = Receipt(
+        result=b"\x00",
+        calldata=b"",
+        gas_used=0,
+        mode=ExecutionMode.LEADER,
+        contract_state={"slot": "value"},
+        node_config={},
+        eq_outputs={},
+        execution_result=ExecutionResultStatus.SUCCESS,
+        vote=Vote.AGREE,
+    )
+    receipt_dict = receipt.to_dict()
+    del receipt_dict["contract_state"]
+    receipt_dict["contract_state_hash"] = "0x1234"
+
+    loaded_receipt = Receipt.from_dict(receipt_dict, load_state)
+    assert loaded_receipt.to_dict() == receipt_dict
+    assert loaded == []
+
+    assert loaded_receipt.get_contract_state() == {"slot": "value"}
+    assert loaded_receipt.get_contract_state() == {"slot": "value"}
+    assert loaded == ["0x1234"]
+
+
+def test_state_digest():
+    state = {"c2xvdDE=": "dmFsdWUx", "c2xvdDI=": "dmFsdWUy"}
+
+    assert get_state_digest(state) == get_state_digest(dict(reversed(state.items())))
+    assert get_state_digest(state) != get_state_digest({"c2xvdDE=": "dmFsdWUx"})
+    assert get_state_digest(state) != get_state_digest(
+        {"c2xvdDE=": "dmFsdWUy", "c2xvdDI=": "dmFsdWUx"}
+    )
@@ -0,0 +1,30 @@
+from backend.database_handler.validators_registry import ValidatorsCache
+
+
+def test_validators_cache_reuses_loaded_validators():
+    cache = ValidatorsCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [{"address": "0x1", "stake": 1}]
+
+    validators = cache.get(load)
+    assert cache.get(load) is validators
+    assert len(loads) == 1
+
+    cache.invalidate()
+    assert cache.get(load) is not validators
+    assert len(loads) == 2
+
+
+def test_validators_cache_ignores_loads_invalidated_while_running():
+    cache = ValidatorsCache()
+
+    def load():
+        # E.g. another thread commits a validator change during the query
+        cache.invalidate()
+        return []
+
+    assert cache.get(load) == []
+    assert cache.validators is None
@@ -1,6 +1,12 @@
-from backend.consensus.vrf import get_validators_for_transaction
+from backend.consensus.vrf import (
+    StakeIndex,
+    get_stake_index,
+    get_validators_for_transaction,
+)
 from unittest.mock import Mock
 
+import numpy as np
+
 
 def list_of_dicts_to_set(list_of_dicts: list[dict]) -> set:
     return set(map(lambda x: tuple(x.items()), list_of_dicts))
@@ -49,20 +55,38 @@ def test_get_validators_for_transaction_2():
 
 def test_get_validators_for_transaction_3():
     """
-    Tests that the gathering of probabilities is correct for passing to the random selector
+    Tests that the gathering of probabilities is correct and that validators are drawn by their stake
     """
     nodes = [{"stake": 1}, {"stake": 2}, {"stake": 3}]
 
-    def choice_mock(a, p, size, replace):
-        assert p == [1 / 6, 2 / 6, 3 / 6]
-        assert size == 3
-        assert replace is False
-        return sorted(a, key=lambda x: -x["stake"])
+    assert list(StakeIndex(nodes).probabilities) == [1 / 6, 2 / 6, 3 / 6]
 
+    # Same random draw for every validator: the largest stake is drawn first
     rng = Mock()
-    rng.choice.side_effect = choice_mock
+    rng.standard_exponential.side_effect = lambda size: np.ones(size)
 
     validators = get_validators_for_transaction(nodes, 10, rng=rng)
 
-    rng.choice.assert_called_once()
+    rng.standard_exponential.assert_called_once_with(3)
     assert validators == [{"stake": 3}, {"stake": 2}, {"stake": 1}]
+
+
+def test_get_validators_for_transaction_exclude():
+    """
+    Tests that excluded validators are never selected, and that the stake index is reused
+    """
+    nodes = [
+        {"address": "0x1", "stake": 1},
+        {"address": "0x2", "stake": 100},
+        {"address": "0x3", "stake": 1},
+    ]
+
+    for _ in range(20):
+        validators = get_validators_for_transaction(nodes, 10, exclude=["0x2"])
+        assert sorted(validator["address"] for validator in validators) == [
+            "0x1",
+            "0x3",
+        ]
+
+    assert get_stake_index(nodes) is get_stake_index(nodes)
+    assert get_validators_for_transaction(nodes, 1, exclude=["0x1", "0x2", "0x3"]) == []
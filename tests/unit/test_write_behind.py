@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend.database_handler.models import Transactions
+from backend.database_handler.transactions_processor import (
+    TransactionsProcessor,
+    TransactionStatus,
+)
+
+
+def test_write_behind_discards_writes_on_error():
+    """Test that a failing consensus doesn't write its buffered intermediate statuses"""
+    session = MagicMock(Session)
+    transactions_processor = TransactionsProcessor(session)
+
+    with pytest.raises(Exception, match="consensus failed"):
+        with transactions_processor.write_behind():
+            transactions_processor.update_transaction_status(
+                "0x1", TransactionStatus.PROPOSING
+            )
+            transactions_processor.set_transaction_result("0x1", {"step": 1})
+            raise Exception("consensus failed")
+
+    # The buffered writes are discarded instead of being flushed
+    session.query.return_value.filter_by.assert_not_called()
+    assert transactions_processor.write_buffer == {}
+    assert not transactions_processor.buffering
+
+    # Nothing was written, there are no statuses to restore
+    session.rollback.assert_called_once()
+    session.query.return_value.filter.return_value.update.assert_not_called()
+    session.commit.assert_not_called()
+
+
+def test_write_behind_restores_previous_statuses_on_error():
+    """
+    Test that transactions whose intermediate status was written before consensus failed get back the status
+    they had before, e.g. an appealed transaction goes back to ACCEPTED
+    """
+    session = MagicMock(Session)
+    session.query.return_value.filter.return_value.all.return_value = [
+        ("0x1", TransactionStatus.ACCEPTED)
+    ]
+    transactions_processor = TransactionsProcessor(session)
+
+    with pytest.raises(Exception, match="consensus failed"):
+        with transactions_processor.write_behind():
+            transactions_processor.update_transaction_status(
+                "0x1", TransactionStatus.COMMITTING
+            )
+            # E.g. flushed by a read
+            transactions_processor.flush()
+            transactions_processor.update_transaction_status(
+                "0x1", TransactionStatus.REVEALING
+            )
+            raise Exception("consensus failed")
+
+    session.rollback.assert_called_once()
+    session.query.return_value.filter.return_value.update.assert_called_once_with(
+        {Transactions.status: TransactionStatus.ACCEPTED},
+        synchronize_session=False,
+    )
+    assert transactions_processor.previous_statuses == {}
+    assert session.commit.call_count == 2
+
+
+def test_write_behind_flushes_on_exit():
+    """Test that the buffered writes are written and committed when the consensus finishes"""
+    session = MagicMock(Session)
+    transactions_processor = TransactionsProcessor(session)
+
+    with transactions_processor.write_behind():
+        transactions_processor.update_transaction_status(
+            "0x1", TransactionStatus.PROPOSING
+        )
+        session.commit.assert_not_called()
+
+    session.query.return_value.filter_by.return_value.update.assert_called_once_with(
+        {Transactions.status: TransactionStatus.PROPOSING}
+    )
+    session.rollback.assert_not_called()
+    session.commit.assert_called_once()